@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+Offline benchmarks for the orchestrator, run against the in-process fakes.
+
+Measures pipeline trigger throughput, per-stage orchestration overhead,
+alert dispatch latency and peak memory for 1 to 10k pipelines, and exits
+non-zero when a result regresses past benchmarks/baseline.json.
+
+    python benchmarks/run_benchmarks.py                    # run and compare
+    python benchmarks/run_benchmarks.py --sizes 1 10 100   # smaller run
+    python benchmarks/run_benchmarks.py --update-baseline  # record new baseline
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from orchestrator.fakes import FakeDataFactoryClient, FakeSlackClient, FakeSMTP, FakeWorkspaceClient, FaultProfile
+from orchestrator.trigger_pipeline import PipelineOrchestrator
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000]
+# The stage scheduler scans pending stages on every completion, so keep DAG scenarios moderate
+MAX_STAGES = 1000
+
+# Metrics where larger is better; every other metric regresses upwards
+HIGHER_IS_BETTER = {'pipelines_per_second', 'delivered_per_second'}
+# Scenario parameters recorded alongside the metrics, not compared
+NOT_COMPARED = {'stages'}
+# Absolute slack per unit, so tiny values (e.g. 40 KB of memory) don't flag on noise
+ABSOLUTE_SLACK = {'_mb': 1.0, '_us': 50.0, '_ms_per_stage': 1.0}
+
+
+def benchmark_config(workdir, args):
+    return {
+        'adf': {
+            'subscription_id': 'bench-subscription',
+            'resource_group': 'bench-rg',
+            'factory_name': 'bench-factory',
+            'pipeline_name': 'bench_pipeline',
+            'batch': {'max_concurrency': args.concurrency, 'rate_per_second': 1000000, 'max_attempts': 5},
+        },
+        'databricks': {
+            'workspace_url': 'https://bench.invalid',
+            'cluster_id': 'bench-cluster',
+            'token': 'bench',
+            'notebook_path': '/bench/notebook',
+        },
+        'execution': {'max_concurrency': args.concurrency, 'fail_fast': False},
+        'monitoring': {'wait_for_completion': True, 'min_poll_interval': 0.01, 'max_poll_interval': 0.1},
+        'retry': {
+            'max_attempts': 3, 'initial_delay': 0.01, 'max_delay': 0.1, 'exponential_base': 2,
+            'budget': {'min_retries': 1000000, 'max_retries': 1000000},
+            'circuit_breaker': {'failure_threshold': 1000000},
+        },
+        'alerts': {
+            'dispatch': {'enabled': True, 'queue_size': 100000, 'flush_timeout': 120},
+            'email': {
+                'enabled': True, 'smtp_server': 'smtp.invalid', 'smtp_port': 587,
+                'sender': 'bench@example.com', 'recipients': ['ops@example.com'],
+                'username': 'bench', 'password': 'bench', 'pool_size': 2,
+                'on_failure': True, 'on_success': True,
+            },
+            'slack': {
+                'enabled': True, 'webhook_url': 'bench', 'channel': '#bench',
+                'on_failure': True, 'on_success': True,
+            },
+        },
+        'logging': {'mode': 'queue', 'level': 'WARNING', 'output_file': str(Path(workdir) / 'bench.log')},
+    }
+
+
+def make_orchestrator(workdir, args):
+    config_path = Path(workdir) / 'pipeline_config.yaml'
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(benchmark_config(workdir, args), f)
+    orchestrator = PipelineOrchestrator(str(config_path))
+    orchestrator.alert_manager.slack_client = FakeSlackClient(FaultProfile(latency=args.alert_latency))
+    return orchestrator
+
+
+def install_fakes(orchestrator, args):
+    """Give each scenario fresh service fakes, so runs from earlier scenarios don't slow status queries."""
+    api = FaultProfile(latency=args.api_latency, error_rate=args.error_rate,
+                       throttle_rate=args.throttle_rate, retry_after=0.01, seed=42)
+    orchestrator.adf_client = FakeDataFactoryClient(api)
+    orchestrator.databricks_client = FakeWorkspaceClient(api)
+
+
+def measure(func):
+    """Run ``func`` and return ``(result, seconds, peak_bytes)``."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_trigger(orchestrator, size):
+    pipelines = [f"pipeline_{i}" for i in range(size)]
+    result, elapsed, peak = measure(lambda: orchestrator.trigger_adf_pipelines(pipelines))
+    return {
+        'pipelines_per_second': len(result.runs) / elapsed,
+        'failed': len(result.failures),
+        'peak_memory_mb': peak / 1024 / 1024,
+    }
+
+
+def bench_stages(orchestrator, size, api_latency):
+    size = min(size, MAX_STAGES)
+    orchestrator.config['stages'] = [
+        {'name': f"stage_{i}", 'type': 'adf', 'pipeline_name': f"pipeline_{i}"} for i in range(size)
+    ]
+    orchestrator.config['alerts']['email']['on_success'] = False
+    _, elapsed, peak = measure(orchestrator.execute_pipeline)
+    # Wall time the fakes spent "in the service": one trigger per stage, spread over the workers
+    waves = -(-size // orchestrator.config['execution']['max_concurrency'])
+    overhead = max(0.0, elapsed - waves * api_latency) / size
+    return {
+        'stages': size,
+        'overhead_ms_per_stage': overhead * 1000,
+        'peak_memory_mb': peak / 1024 / 1024,
+    }
+
+
+def bench_alerts(orchestrator, size):
+    manager = orchestrator.alert_manager
+    latencies = []
+
+    def send_all():
+        for i in range(size):
+            start = time.perf_counter()
+            manager.send_alert(f"Benchmark alert {i}", f"Pipeline pipeline_{i} finished", is_error=False)
+            latencies.append(time.perf_counter() - start)
+        manager.flush()
+
+    _, elapsed, peak = measure(send_all)
+    latencies.sort()
+    return {
+        'send_p50_us': statistics.median(latencies) * 1e6,
+        'send_p95_us': latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0] * 1e6,
+        'delivered_per_second': size / elapsed,
+        'peak_memory_mb': peak / 1024 / 1024,
+    }
+
+
+def run_scenarios(workdir, args, size):
+    orchestrator = make_orchestrator(workdir, args)
+    try:
+        install_fakes(orchestrator, args)
+        trigger = bench_trigger(orchestrator, size)
+        install_fakes(orchestrator, args)
+        stages = bench_stages(orchestrator, size, args.api_latency)
+        alerts = bench_alerts(orchestrator, size)
+    finally:
+        orchestrator.close()
+    return {f"trigger/{size}": trigger, f"stages/{size}": stages, f"alerts/{size}": alerts}
+
+
+def run_benchmarks(args):
+    results = {}
+    smtp = FakeSMTP.install(FaultProfile(latency=args.alert_latency))
+    with tempfile.TemporaryDirectory() as workdir, patch('smtplib.SMTP', smtp):
+        # Warm-up: pays one-off SDK imports and thread start-up outside the measurements
+        run_scenarios(workdir, args, 1)
+        for size in args.sizes:
+            scenarios = run_scenarios(workdir, args, size)
+            for scenario, metrics in scenarios.items():
+                print(scenario, ' '.join(f"{k}={v:.3f}" for k, v in metrics.items()))
+            results.update(scenarios)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for scenario, metrics in baseline.items():
+        for metric, expected in metrics.items():
+            actual = results.get(scenario, {}).get(metric)
+            if actual is None or metric in NOT_COMPARED:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                regressed = actual < expected * (1 - tolerance)
+            else:
+                slack = next((v for suffix, v in ABSOLUTE_SLACK.items() if metric.endswith(suffix)), 0.0)
+                regressed = actual > expected * (1 + tolerance) + slack
+            if regressed:
+                regressions.append(f"{scenario} {metric}: {actual:.3f} vs baseline {expected:.3f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--api-latency', type=float, default=0.002, help="Seconds per fake ADF/Databricks call")
+    parser.add_argument('--alert-latency', type=float, default=0.001, help="Seconds per fake SMTP/Slack call")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Allowed relative change before a metric counts as a regression")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', type=Path, help="Also write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True))
+
+    if args.update_baseline:
+        rounded = {scenario: {k: round(v, 3) for k, v in metrics.items()} for scenario, metrics in results.items()}
+        args.baseline.write_text(json.dumps(rounded, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
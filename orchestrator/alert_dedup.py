@@ -0,0 +1,105 @@
+from collections import OrderedDict
+import hashlib
+import re
+import threading
+from .clock import get_clock
+from .rate_limit import TokenBucket
+
+# Run IDs, GUIDs, timestamps and counters vary between otherwise identical alerts
+_VOLATILE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\b[0-9a-f]{16,}\b|\d+', re.IGNORECASE)
+
+
+def alert_fingerprint(subject, message, is_error):
+    """Identify alerts that differ only in IDs, timestamps or numbers."""
+    normalized = _VOLATILE.sub('#', f"{subject}\n{message}")
+    return hashlib.sha1(f"{is_error}|{normalized}".encode('utf-8')).hexdigest()
+
+
+class AlertDeduplicator:
+    """
+    Suppress repeated alerts and fold them into a periodic digest.
+
+    An alert whose fingerprint was already sent within ``ttl`` seconds is
+    suppressed, as is any alert that exceeds its channel's rate limit. The
+    fingerprint cache and the digest are bounded to ``max_entries``, evicting
+    the oldest entries first, so memory stays flat during an incident storm.
+    """
+
+    def __init__(self, ttl=300, max_entries=1000, rate_limits=None, digest_interval=600):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.digest_interval = digest_interval
+        self._seen = OrderedDict()
+        self._suppressed = OrderedDict()
+        self._suppressed_total = 0
+        self._digest_started = None
+        self._lock = threading.Lock()
+        self._buckets = {
+            channel: TokenBucket(limit['per_minute'] / 60.0, limit.get('burst', limit['per_minute']))
+            for channel, limit in (rate_limits or {}).items()
+        }
+
+    def _expire(self, now):
+        # Drop expired entries and leave room for one more
+        while self._seen:
+            sent_at = next(iter(self._seen.values()))
+            if now - sent_at < self.ttl and len(self._seen) < self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def _suppress(self, fingerprint, subject, message, is_error, channels, now):
+        entry = self._suppressed.get(fingerprint)
+        if entry is None:
+            if len(self._suppressed) >= self.max_entries:
+                self._suppressed.popitem(last=False)
+            entry = self._suppressed[fingerprint] = {
+                'subject': subject, 'message': message, 'is_error': is_error, 'count': 0, 'channels': set()
+            }
+        entry['count'] += 1
+        entry['channels'].update(channels)
+        self._suppressed_total += 1
+        if self._digest_started is None:
+            self._digest_started = now
+
+    def filter(self, subject, message, is_error, channels):
+        """Return the subset of ``channels`` this alert should be sent to."""
+        now = get_clock().monotonic()
+        fingerprint = alert_fingerprint(subject, message, is_error)
+        with self._lock:
+            self._expire(now)
+            if fingerprint in self._seen:
+                self._suppress(fingerprint, subject, message, is_error, channels, now)
+                return []
+            self._seen[fingerprint] = now
+
+            allowed, limited = [], []
+            for channel in channels:
+                bucket = self._buckets.get(channel)
+                (allowed if bucket is None or bucket.try_acquire() else limited).append(channel)
+            if limited:
+                self._suppress(fingerprint, subject, message, is_error, limited, now)
+            return allowed
+
+    def take_digest(self):
+        """
+        Return ``(subject, message, is_error)`` summarising suppressed alerts
+        since the last digest, or None if nothing was suppressed.
+        """
+        with self._lock:
+            if not self._suppressed:
+                return None
+            entries = list(self._suppressed.values())
+            total = self._suppressed_total
+            window = get_clock().monotonic() - self._digest_started
+            self._suppressed.clear()
+            self._suppressed_total = 0
+            self._digest_started = None
+
+        lines = [f"{total} alerts suppressed in the last {int(window // 60)}m{int(window % 60):02d}s:"]
+        for entry in sorted(entries, key=lambda e: e['count'], reverse=True):
+            label = 'ERROR' if entry['is_error'] else 'SUCCESS'
+            first_line = entry['message'].splitlines()[0] if entry['message'] else ''
+            lines.append(f"- {entry['count']}x [{label}] {entry['subject']}: {first_line} "
+                         f"({', '.join(sorted(entry['channels']))})")
+        is_error = any(entry['is_error'] for entry in entries)
+        return f"Alert digest: {total} suppressed", '\n'.join(lines), is_error
@@ -0,0 +1,189 @@
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from .logger import get_logger
+
+logger = get_logger()
+
+_STOP = object()
+
+
+class SMTPConnectionPool:
+    """
+    Reusable authenticated SMTP sessions.
+
+    Sessions are opened (connect, STARTTLS, login) on demand, returned to the
+    pool after each message and reused. A session idle for longer than
+    ``idle_timeout`` is probed with NOOP before reuse, and any session the
+    server has dropped is reopened transparently and the send retried once.
+    """
+
+    def __init__(self, host, port, username=None, password=None, size=2, idle_timeout=60, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+        self.connects = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self.connects += 1
+        logger.debug("smtp_connection_opened", host=self.host, connects=self.connects)
+        return server
+
+    @staticmethod
+    def _discard(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            server, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        if time.monotonic() - last_used > self.idle_timeout:
+            try:
+                status = server.noop()[0]
+            except (smtplib.SMTPException, OSError):
+                status = None
+            if status != 250:
+                self._discard(server)
+                return self._connect()
+        return server
+
+    def _release(self, server):
+        if server is not None:
+            try:
+                self._idle.put_nowait((server, time.monotonic()))
+            except queue.Full:
+                self._discard(server)
+        self._slots.release()
+
+    def send_message(self, msg):
+        server = None
+        try:
+            server = self._acquire()
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError):
+                self._discard(server)
+                server = None
+                server = self._connect()
+                server.send_message(msg)
+        except Exception:
+            if server is not None:
+                self._discard(server)
+                server = None
+            raise
+        finally:
+            self._release(server)
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(server)
+
+
+class AlertDispatcher:
+    """
+    Deliver alerts from background threads, one queue per channel.
+
+    ``submit`` only enqueues, so callers never wait on a mail relay or the
+    Slack API. Each channel drains its own queue, which keeps channels
+    independent (a slow SMTP server does not delay Slack) while preserving
+    per-channel order. Pending alerts are flushed on ``close`` and at
+    interpreter exit.
+    """
+
+    def __init__(self, channels, queue_size=1000, flush_timeout=30):
+        self.flush_timeout = flush_timeout
+        self.dropped = 0
+        self._queues = {}
+        self._threads = []
+        self._closed = False
+        for name, handler in channels.items():
+            channel_queue = queue.Queue(maxsize=queue_size)
+            thread = threading.Thread(
+                target=self._drain, args=(name, handler, channel_queue),
+                name=f'alerts-{name}', daemon=True
+            )
+            thread.start()
+            self._queues[name] = channel_queue
+            self._threads.append(thread)
+        atexit.register(self.close)
+
+    def _drain(self, name, handler, channel_queue):
+        while True:
+            item = channel_queue.get()
+            try:
+                if item is _STOP:
+                    return
+                args, kwargs = item
+                handler(*args, **kwargs)
+            except Exception as e:
+                logger.error("alert_dispatch_failed", channel=name, error=str(e))
+            finally:
+                channel_queue.task_done()
+
+    def submit(self, *args, channels=None, **kwargs):
+        """Queue an alert for every channel (or only ``channels``) without blocking."""
+        if self._closed:
+            logger.warning("alert_dispatcher_closed", args=args)
+            return
+        for name, channel_queue in self._queues.items():
+            if channels is not None and name not in channels:
+                continue
+            try:
+                channel_queue.put_nowait((args, kwargs))
+            except queue.Full:
+                self.dropped += 1
+                logger.warning("alert_queue_full", channel=name, dropped=self.dropped)
+
+    def pending(self):
+        return sum(channel_queue.unfinished_tasks for channel_queue in self._queues.values())
+
+    def flush(self, timeout=None):
+        """Wait until every queued alert has been handled. Returns True if drained."""
+        deadline = time.monotonic() + (self.flush_timeout if timeout is None else timeout)
+        for channel_queue in self._queues.values():
+            with channel_queue.all_tasks_done:
+                while channel_queue.unfinished_tasks:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.warning("alert_flush_timeout", pending=self.pending())
+                        return False
+                    channel_queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Flush pending alerts and stop the channel threads."""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        for channel_queue in self._queues.values():
+            try:
+                channel_queue.put(_STOP, timeout=1)
+            except queue.Full:
+                pass
+        for thread in self._threads:
+            thread.join(timeout=1)
+        atexit.unregister(self.close)
@@ -1,16 +1,67 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+from functools import cached_property
+import threading
+import time
+from .alert_dedup import AlertDeduplicator
+from .alert_dispatcher import AlertDispatcher, SMTPConnectionPool
+from .clock import get_clock
 from .logger import get_logger
+from .telemetry import get_telemetry
 
 logger = get_logger()
 
+ALERT_CHANNELS = ('email', 'slack')
+
 class AlertManager:
     def __init__(self, config):
         self.config = config
-        self.slack_client = WebClient(token=config['alerts']['slack']['webhook_url']) if config['alerts']['slack']['enabled'] else None
+        dispatch_config = config['alerts'].get('dispatch', {})
+        self.dispatcher = None
+        if dispatch_config.get('enabled', False):
+            self.dispatcher = AlertDispatcher(
+                {
+                    'email': self.send_email_alert,
+                    'slack': lambda subject, message, is_error=False: self.send_slack_alert(message, is_error),
+                },
+                queue_size=dispatch_config.get('queue_size', 1000),
+                flush_timeout=dispatch_config.get('flush_timeout', 30)
+            )
+
+        dedup_config = config['alerts'].get('dedup', {})
+        self.deduplicator = None
+        self._digest_timer = None
+        self._digest_due = None
+        self._digest_lock = threading.Lock()
+        if dedup_config.get('enabled', False):
+            self.deduplicator = AlertDeduplicator(
+                ttl=dedup_config.get('ttl', 300),
+                max_entries=dedup_config.get('max_entries', 1000),
+                rate_limits=dedup_config.get('rate_limits'),
+                digest_interval=dedup_config.get('digest_interval', 600)
+            )
+
+    @cached_property
+    def smtp_pool(self):
+        """Pooled SMTP sessions, used when alerts.email.pool_size is set."""
+        email_config = self.config['alerts']['email']
+        return SMTPConnectionPool(
+            email_config['smtp_server'],
+            email_config['smtp_port'],
+            username=email_config.get('username'),
+            password=email_config.get('password'),
+            size=email_config['pool_size'],
+            idle_timeout=email_config.get('pool_idle_timeout', 60)
+        )
+
+    @cached_property
+    def slack_client(self):
+        """Slack client, created (and slack_sdk imported) on first use."""
+        if not self.config['alerts']['slack']['enabled']:
+            return None
+        import slack_sdk
+        return slack_sdk.WebClient(token=self.config['alerts']['slack']['webhook_url'])
 
     def send_email_alert(self, subject, message, is_error=False):
         """Send email alert if enabled and conditions are met."""
@@ -21,6 +72,7 @@ class AlertManager:
            (not is_error and not self.config['alerts']['email']['on_success']):
             return
 
+        start = time.perf_counter()
         try:
             msg = MIMEMultipart()
             msg['From'] = self.config['alerts']['email']['sender']
@@ -29,14 +81,19 @@ class AlertManager:
 
             msg.attach(MIMEText(message, 'plain'))
 
-            with smtplib.SMTP(self.config['alerts']['email']['smtp_server'], self.config['alerts']['email']['smtp_port']) as server:
-                server.starttls()
-                server.login(self.config['alerts']['email']['username'], self.config['alerts']['email']['password'])
-                server.send_message(msg)
+            if self.config['alerts']['email'].get('pool_size'):
+                self.smtp_pool.send_message(msg)
+            else:
+                with smtplib.SMTP(self.config['alerts']['email']['smtp_server'], self.config['alerts']['email']['smtp_port']) as server:
+                    server.starttls()
+                    server.login(self.config['alerts']['email']['username'], self.config['alerts']['email']['password'])
+                    server.send_message(msg)
 
             logger.info("email_alert_sent", subject=subject, recipients=self.config['alerts']['email']['recipients'])
+            self._record_send('email', start, 'success')
         except Exception as e:
             logger.error("email_alert_failed", error=str(e), subject=subject)
+            self._record_send('email', start, 'error')
 
     def send_slack_alert(self, message, is_error=False):
         """Send Slack alert if enabled and conditions are met."""
@@ -47,16 +104,100 @@ class AlertManager:
            (not is_error and not self.config['alerts']['slack']['on_success']):
             return
 
+        from slack_sdk.errors import SlackApiError
+        start = time.perf_counter()
         try:
             response = self.slack_client.chat_postMessage(
                 channel=self.config['alerts']['slack']['channel'],
                 text=f"[{'ERROR' if is_error else 'SUCCESS'}] {message}"
             )
             logger.info("slack_alert_sent", message=message, channel=self.config['alerts']['slack']['channel'])
+            self._record_send('slack', start, 'success')
         except SlackApiError as e:
             logger.error("slack_alert_failed", error=str(e), message=message)
+            self._record_send('slack', start, 'error')
+
+    @staticmethod
+    def _record_send(channel, start, outcome):
+        get_telemetry().observe('datamove_alert_send_seconds', time.perf_counter() - start,
+                                channel=channel, outcome=outcome)
 
     def send_alert(self, subject, message, is_error=False):
         """Send alerts through all configured channels."""
-        self.send_email_alert(subject, message, is_error)
-        self.send_slack_alert(message, is_error) 
\ No newline at end of file
+        if self._digest_due is not None and get_clock().monotonic() >= self._digest_due:
+            self.send_digest()
+        sending = self._sending_channels(is_error)
+        if not sending:
+            return
+        channels = sending
+        if self.deduplicator:
+            # Only channels that would send count against rate limits and digests
+            channels = self.deduplicator.filter(subject, message, is_error, sending)
+            if len(channels) < len(sending):
+                suppressed = [c for c in sending if c not in channels]
+                logger.info("alert_suppressed", subject=subject, channels=suppressed)
+                for channel in suppressed:
+                    get_telemetry().increment('datamove_alerts_suppressed_total', channel=channel)
+                self._schedule_digest()
+            if not channels:
+                return
+        self._deliver(subject, message, is_error, channels)
+
+    def _sending_channels(self, is_error):
+        """Channels that are enabled and configured to send this kind of alert."""
+        channels = []
+        for channel in ALERT_CHANNELS:
+            channel_config = self.config['alerts'].get(channel, {})
+            if channel_config.get('enabled') and channel_config.get('on_failure' if is_error else 'on_success'):
+                channels.append(channel)
+        return channels
+
+    def _deliver(self, subject, message, is_error, channels):
+        if self.dispatcher:
+            # Delivered in the background; channels are sent to in parallel
+            self.dispatcher.submit(subject, message, is_error, channels=channels)
+            return
+        if 'email' in channels:
+            self.send_email_alert(subject, message, is_error)
+        if 'slack' in channels:
+            self.send_slack_alert(message, is_error)
+
+    def _schedule_digest(self):
+        with self._digest_lock:
+            if self._digest_timer is not None or self._digest_due is not None:
+                return
+            clock = get_clock()
+            if clock.virtual:
+                # No timer thread on a virtual clock: the digest goes with the next alert once it is due
+                self._digest_due = clock.monotonic() + self.deduplicator.digest_interval
+                return
+            self._digest_timer = threading.Timer(self.deduplicator.digest_interval, self.send_digest)
+            self._digest_timer.daemon = True
+            self._digest_timer.start()
+
+    def send_digest(self):
+        """Send one alert summarising everything suppressed since the last digest."""
+        with self._digest_lock:
+            if self._digest_timer is not None:
+                self._digest_timer.cancel()
+                self._digest_timer = None
+            self._digest_due = None
+        digest = self.deduplicator.take_digest() if self.deduplicator else None
+        if digest:
+            subject, message, is_error = digest
+            self._deliver(subject, message, is_error, ALERT_CHANNELS)
+
+    def flush(self, timeout=None):
+        """Wait for alerts queued by the background dispatcher to be delivered."""
+        if self.dispatcher:
+            return self.dispatcher.flush(timeout)
+        return True
+
+    def close(self):
+        """Deliver pending alerts and release channel connections."""
+        if self.deduplicator:
+            self.send_digest()
+        if self.dispatcher:
+            self.dispatcher.close()
+        if 'smtp_pool' in self.__dict__:
+            self.smtp_pool.close() 
\ No newline at end of file
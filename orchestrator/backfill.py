@@ -0,0 +1,124 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+import contextvars
+import threading
+from .clock import get_clock
+from .logger import get_logger
+from .retry_logic import FATAL, classify_error
+
+logger = get_logger()
+
+CHUNK_SIZES = ('day', 'week', 'month')
+
+
+class DateChunk(namedtuple('DateChunk', ['start', 'end'])):
+    """Inclusive date range processed by one notebook run."""
+
+    @property
+    def label(self):
+        return f"{self.start.isoformat()}..{self.end.isoformat()}"
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _next_boundary(day, chunk):
+    if chunk == 'day':
+        return day + timedelta(days=1)
+    if chunk == 'week':
+        return day + timedelta(days=7 - day.weekday())
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+
+def date_chunks(start_date, end_date, chunk='month'):
+    """
+    Split ``[start_date, end_date]`` into ranges aligned to day, ISO week or
+    calendar month boundaries, so every chunk covers whole target partitions.
+    The first and last chunk are clipped to the requested range.
+    """
+    if chunk not in CHUNK_SIZES:
+        raise ValueError(f"Unknown backfill chunk size '{chunk}'; expected one of {', '.join(CHUNK_SIZES)}")
+    start, end = _as_date(start_date), _as_date(end_date)
+    if end < start:
+        raise ValueError(f"Backfill end date {end} is before start date {start}")
+
+    chunks = []
+    while start <= end:
+        boundary = _next_boundary(start, chunk)
+        chunks.append(DateChunk(start, min(end, boundary - timedelta(days=1))))
+        start = boundary
+    return chunks
+
+
+class BackfillResult:
+    """Outcome of a backfill: run IDs per chunk, failed chunks and timing."""
+
+    def __init__(self):
+        self.runs = {}
+        self.failures = []
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        return {
+            'completed': len(self.runs),
+            'failed': len(self.failures),
+            'attempts': self.attempts,
+            'elapsed_seconds': round(self.elapsed, 3),
+        }
+
+
+class Backfill:
+    """
+    Process date chunks as independent runs with bounded concurrency.
+
+    ``run_chunk`` starts the run for one chunk and returns once it has
+    finished, raising if it failed. Up to ``max_in_flight`` chunks run at a
+    time; a failed chunk is retried up to ``max_attempts`` times, waiting
+    ``retry_delay`` seconds between attempts, unless the error is fatal. One
+    failing chunk does not stop the others.
+    """
+
+    def __init__(self, run_chunk, max_in_flight=4, max_attempts=2, retry_delay=60.0):
+        self.run_chunk = run_chunk
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+
+    def _run_one(self, chunk, result):
+        for attempt in range(1, self.max_attempts + 1):
+            with self._lock:
+                result.attempts += 1
+            try:
+                return self.run_chunk(chunk)
+            except Exception as e:
+                logger.warning("backfill_chunk_failed", chunk=chunk.label, attempt=attempt, error=str(e))
+                if attempt == self.max_attempts or classify_error(e) == FATAL:
+                    raise
+                get_clock().sleep(self.retry_delay)
+
+    def run(self, chunks):
+        """Run every chunk and return a BackfillResult."""
+        result = BackfillResult()
+        start = get_clock().monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='backfill') as pool:
+            # Each chunk runs in a copy of the caller's context (deadline, active span)
+            futures = {
+                pool.submit(contextvars.copy_context().run, self._run_one, chunk, result): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result.runs[chunk] = future.result()
+                    logger.info("backfill_chunk_complete", chunk=chunk.label, run_id=result.runs[chunk])
+                except Exception as e:
+                    result.failures.append((chunk, e))
+        result.elapsed = get_clock().monotonic() - start
+        logger.info("backfill_complete", **result.summary())
+        return result
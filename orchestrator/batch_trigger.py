@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from .clock import get_clock
+from .logger import get_logger
+from .rate_limit import TokenBucket
+from .retry_logic import FATAL, THROTTLED, classify_error, get_retry_after
+
+logger = get_logger()
+
+
+class BatchResult:
+    """Outcome of a batch trigger: run IDs, failures and aggregate throughput."""
+
+    def __init__(self):
+        self.runs = []
+        self.failures = []
+        self.throttled = 0
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        """Successfully triggered runs per second."""
+        return len(self.runs) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return {
+            'triggered': len(self.runs),
+            'failed': len(self.failures),
+            'attempts': self.attempts,
+            'throttled': self.throttled,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'runs_per_second': round(self.throughput, 3),
+        }
+
+
+class BatchTrigger:
+    """
+    Trigger many runs through one callable with bounded concurrency.
+
+    Calls are paced by a token bucket. When the service throttles (HTTP 429),
+    every worker pauses until the requested Retry-After has elapsed and the
+    bucket rate is halved; each success then raises the rate additively back
+    towards the configured ceiling (AIMD), so the batch settles just under
+    the service's actual limit.
+    """
+
+    def __init__(self, trigger_func, max_concurrency=16, rate_per_second=5.0, burst=None,
+                 max_attempts=5, min_rate=0.5, default_backoff=5.0):
+        self.trigger_func = trigger_func
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_rate = float(rate_per_second)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.max_attempts = max(1, int(max_attempts))
+        self.default_backoff = default_backoff
+        self.bucket = TokenBucket(self.max_rate, burst)
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def _wait_if_paused(self):
+        while True:
+            with self._lock:
+                delay = self._paused_until - get_clock().monotonic()
+            if delay <= 0:
+                return
+            get_clock().sleep(delay)
+
+    def _on_throttled(self, error, attempt):
+        delay = get_retry_after(error)
+        if delay is None:
+            delay = min(self.default_backoff * 2 ** (attempt - 1), 60.0)
+        with self._lock:
+            self._paused_until = max(self._paused_until, get_clock().monotonic() + delay)
+            new_rate = max(self.min_rate, self.bucket.rate / 2)
+        self.bucket.set_rate(new_rate)
+        logger.warning("batch_throttled", retry_after=delay, rate_per_second=new_rate)
+
+    def _on_success(self):
+        rate = self.bucket.rate
+        if rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, rate + self.max_rate / 20))
+
+    def _trigger_one(self, item, result):
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            self._wait_if_paused()
+            self.bucket.acquire()
+            with self._lock:
+                result.attempts += 1
+            try:
+                run_id = self.trigger_func(item)
+            except Exception as e:
+                error = e
+                error_class = classify_error(e)
+                if error_class == THROTTLED:
+                    with self._lock:
+                        result.throttled += 1
+                    self._on_throttled(e, attempt)
+                    continue
+                if error_class == FATAL:
+                    break
+                # 5xx responses, connection errors and timeouts; no pause after the last attempt
+                if attempt < self.max_attempts:
+                    get_clock().sleep(min(self.default_backoff * 2 ** (attempt - 1), 60.0))
+            else:
+                self._on_success()
+                return run_id
+        raise error
+
+    def run(self, items):
+        """Trigger every item and return a BatchResult."""
+        result = BatchResult()
+        start = get_clock().monotonic()
+
+        def worker(item):
+            try:
+                run_id = self._trigger_one(item, result)
+            except Exception as e:
+                logger.error("batch_item_failed", item=item, error=str(e))
+                with self._lock:
+                    result.failures.append((item, e))
+            else:
+                with self._lock:
+                    result.runs.append((item, run_id))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='batch') as pool:
+            list(pool.map(worker, items))
+
+        result.elapsed = get_clock().monotonic() - start
+        logger.info("batch_complete", **result.summary())
+        return result
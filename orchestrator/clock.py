@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import threading
+import time
+
+
+class SystemClock:
+    """Wall-clock time; the default."""
+
+    virtual = False
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    async def asleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class _Lane:
+    def __init__(self, now):
+        self.now = now
+
+
+class VirtualClock:
+    """
+    Simulated time for dry runs and tests: sleeping advances the clock instead of waiting.
+
+    Time is kept per lane. Code runs on the clock's base lane unless it is
+    inside ``lane(start)``, which gives a block its own timeline starting at
+    ``start``; the StageExecutor runs each stage in a lane, so stages that
+    would overlap in reality each see time pass from their own start.
+    ``time()`` is ``epoch`` plus the lane's monotonic time.
+    """
+
+    virtual = True
+
+    def __init__(self, start=0.0, epoch=1704067200.0):
+        self.epoch = epoch
+        self._base = _Lane(start)
+        self._lane = contextvars.ContextVar('datamove_clock_lane', default=None)
+        self._lock = threading.Lock()
+        self.sleeps = 0
+        self.slept = 0.0
+
+    def _current(self):
+        return self._lane.get() or self._base
+
+    def time(self):
+        return self.epoch + self.monotonic()
+
+    def monotonic(self):
+        return self._current().now
+
+    def sleep(self, seconds):
+        seconds = max(0.0, seconds)
+        self._current().now += seconds
+        with self._lock:
+            self.sleeps += 1
+            self.slept += seconds
+
+    async def asleep(self, seconds):
+        self.sleep(seconds)
+        # Still yield, so other tasks on the loop get to run
+        await asyncio.sleep(0)
+
+    def advance_to(self, moment):
+        """Move the current lane forward to ``moment`` (never backwards)."""
+        lane = self._current()
+        lane.now = max(lane.now, moment)
+
+    @contextmanager
+    def lane(self, start=None):
+        """Run the block on its own timeline, from ``start`` (default: now). Yields the lane (``.now``)."""
+        lane = _Lane(self.monotonic() if start is None else start)
+        token = self._lane.set(lane)
+        try:
+            yield lane
+        finally:
+            self._lane.reset(token)
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Install ``clock`` process-wide and return the previous one."""
+    global _clock
+    previous, _clock = _clock, clock or SystemClock()
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    """Run the block on ``clock`` (e.g. a VirtualClock), restoring the previous clock afterwards."""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
@@ -0,0 +1,181 @@
+from collections import Counter
+from datetime import datetime, timezone
+import math
+import threading
+from .clock import get_clock
+from .logger import get_logger
+
+logger = get_logger()
+
+RUNNING_STATES = {'RUNNING', 'RESIZING'}
+STARTING_STATES = {'PENDING', 'RESTARTING'}
+# Can't be started until termination finishes
+STOPPING_STATES = {'TERMINATING'}
+FINISHED_TASK_STATES = {'TERMINATED', 'SKIPPED', 'INTERNAL_ERROR'}
+
+
+def _state_name(state):
+    # The SDK returns a State enum; the fakes return plain strings
+    return getattr(state, 'value', state)
+
+
+def _run_clusters(run):
+    """Clusters an active run is using, one entry per unfinished task."""
+    tasks = getattr(run, 'tasks', None)
+    if not tasks:
+        # Single-task runs in the legacy format carry the cluster on the run itself
+        return [getattr(getattr(run, 'cluster_instance', None), 'cluster_id', None)]
+    return [getattr(getattr(task, 'cluster_instance', None), 'cluster_id', None) for task in tasks
+            if _state_name(getattr(getattr(task, 'state', None), 'life_cycle_state', None)) not in FINISHED_TASK_STATES]
+
+
+class ClusterPool:
+    """
+    Spread Databricks runs over a set of all-purpose clusters and keep them warm.
+
+    Each run goes to the least-loaded running cluster with a free slot
+    (``max_runs_per_cluster``), then to one that is already starting, and
+    only then starts a terminated cluster. Load is the number of active job
+    tasks on each cluster, read from ``jobs.list_runs`` at most every
+    ``state_ttl`` seconds, plus the runs assigned here since. Clusters still
+    terminating are not used until they have stopped.
+
+    The peak load seen in each UTC hour of the day is remembered, so
+    ``prewarm_for`` can start enough clusters ahead of a scheduled window.
+    ``terminate_idle`` stops clusters with no runs for ``idle_timeout``
+    seconds, keeping the ``min_warm`` most recently used ones running.
+    Clusters backed by an instance pool start faster still.
+    """
+
+    def __init__(self, databricks_client, cluster_ids, max_runs_per_cluster=4, idle_timeout=1800,
+                 min_warm=1, prewarm_lead=600, state_ttl=30, clock=None):
+        if not cluster_ids:
+            raise ValueError("Cluster pool needs at least one cluster ID")
+        self.databricks_client = databricks_client
+        self.cluster_ids = list(cluster_ids)
+        self.max_runs_per_cluster = max(1, int(max_runs_per_cluster))
+        self.idle_timeout = idle_timeout
+        self.min_warm = min_warm
+        self.prewarm_lead = prewarm_lead
+        self.state_ttl = state_ttl
+        self.clock = clock or (lambda: get_clock().time())
+        now = self.clock()
+        self.states = {cluster_id: None for cluster_id in self.cluster_ids}
+        self.active = Counter()
+        self.assigned = Counter()
+        self.last_used = {cluster_id: now for cluster_id in self.cluster_ids}
+        self.hourly_peaks = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self, force=False):
+        now = self.clock()
+        if not force and self._refreshed_at is not None and now - self._refreshed_at < self.state_ttl:
+            return
+        for cluster_id in self.cluster_ids:
+            self.states[cluster_id] = _state_name(self.databricks_client.clusters.get(cluster_id).state)
+        active = Counter()
+        # Multi-task and submitted runs only name their cluster on each task
+        for run in self.databricks_client.jobs.list_runs(active_only=True, expand_tasks=True):
+            for cluster_id in _run_clusters(run):
+                if cluster_id in self.states:
+                    active[cluster_id] += 1
+        for cluster_id in active:
+            self.last_used[cluster_id] = now
+        self.active = active
+        self.assigned = Counter()
+        self._refreshed_at = now
+
+    def _load(self, cluster_id):
+        return self.active[cluster_id] + self.assigned[cluster_id]
+
+    def _record_demand(self, now):
+        hour = datetime.fromtimestamp(now, timezone.utc).hour
+        in_flight = sum(self._load(cluster_id) for cluster_id in self.cluster_ids)
+        self.hourly_peaks[hour] = max(self.hourly_peaks.get(hour, 0), in_flight)
+
+    def _stopped(self):
+        unavailable = RUNNING_STATES | STARTING_STATES | STOPPING_STATES
+        return [cluster_id for cluster_id in self.cluster_ids if self.states[cluster_id] not in unavailable]
+
+    def _start(self, cluster_id, reason):
+        self.databricks_client.clusters.start(cluster_id)
+        self.states[cluster_id] = 'PENDING'
+        logger.info("cluster_starting", cluster_id=cluster_id, reason=reason)
+
+    def acquire(self):
+        """Pick the cluster for the next run and count the run against it."""
+        with self._lock:
+            self._refresh()
+            now = self.clock()
+
+            def least_loaded(states, with_capacity=True):
+                candidates = [cluster_id for cluster_id in self.cluster_ids
+                              if self.states[cluster_id] in states
+                              and (not with_capacity or self._load(cluster_id) < self.max_runs_per_cluster)]
+                return min(candidates, key=self._load, default=None)
+
+            cluster_id = least_loaded(RUNNING_STATES) or least_loaded(STARTING_STATES)
+            if cluster_id is None:
+                stopped = self._stopped()
+                if stopped:
+                    cluster_id = stopped[0]
+                    self._start(cluster_id, reason='demand')
+                else:
+                    # Every cluster is full: queue behind the least busy one
+                    cluster_id = least_loaded(RUNNING_STATES | STARTING_STATES, with_capacity=False)
+            if cluster_id is None:
+                # Every cluster is terminating; look again on the next attempt
+                self._refreshed_at = None
+                raise RuntimeError("No cluster in the pool can take a run: all are terminating")
+
+            self.assigned[cluster_id] += 1
+            self.last_used[cluster_id] = now
+            self._record_demand(now)
+            logger.info("cluster_selected", cluster_id=cluster_id, state=self.states[cluster_id],
+                        load=self._load(cluster_id))
+            return cluster_id
+
+    def expected_runs(self, moment):
+        """Peak concurrent runs seen in the UTC hour of ``moment``."""
+        return self.hourly_peaks.get(moment.astimezone(timezone.utc).hour, 0)
+
+    def prewarm(self, count):
+        """Make sure at least ``count`` clusters are running or starting. Returns the clusters started."""
+        with self._lock:
+            self._refresh(force=True)
+            warm = [c for c in self.cluster_ids if self.states[c] in RUNNING_STATES | STARTING_STATES]
+            stopped = self._stopped()
+            started = stopped[:max(0, min(count, len(self.cluster_ids)) - len(warm))]
+            for cluster_id in started:
+                self._start(cluster_id, reason='prewarm')
+                # Count as used now, so it isn't terminated as idle before the window starts
+                self.last_used[cluster_id] = self.clock()
+            return started
+
+    def prewarm_for(self, moment):
+        """Start enough clusters for the load expected at ``moment`` (at least one)."""
+        count = max(1, math.ceil(self.expected_runs(moment) / self.max_runs_per_cluster))
+        return self.prewarm(count)
+
+    def terminate_idle(self):
+        """Terminate clusters idle for ``idle_timeout``, keeping ``min_warm`` running. Returns the clusters stopped."""
+        with self._lock:
+            self._refresh()
+            now = self.clock()
+            running = [c for c in self.cluster_ids if self.states[c] in RUNNING_STATES]
+            running.sort(key=lambda c: self.last_used[c], reverse=True)
+            stopped = []
+            for cluster_id in running[self.min_warm:]:
+                if self._load(cluster_id) == 0 and now - self.last_used[cluster_id] >= self.idle_timeout:
+                    self.databricks_client.clusters.delete(cluster_id)
+                    self.states[cluster_id] = 'TERMINATING'
+                    stopped.append(cluster_id)
+                    logger.info("cluster_terminated_idle", cluster_id=cluster_id,
+                                idle_seconds=round(now - self.last_used[cluster_id]))
+            return stopped
+
+    def stats(self):
+        with self._lock:
+            return {cluster_id: {'state': self.states[cluster_id], 'load': self._load(cluster_id)}
+                    for cluster_id in self.cluster_ids}
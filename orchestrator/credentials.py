@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from .logger import get_logger
+from .telemetry import get_telemetry
+
+logger = get_logger()
+
+
+class PersistentTokenCredential:
+    """
+    Azure credential wrapper that caches access tokens on disk.
+
+    Tokens are stored per scope in a JSON file readable only by the current
+    user and reused by later processes until ``refresh_margin`` seconds before
+    they expire. The wrapped credential is only built on a cache miss, so a
+    short-lived invocation with a valid cached token never constructs
+    ``DefaultAzureCredential`` or runs its credential chain.
+
+    A request with ``claims`` (a CAE claims challenge, sent after the cached
+    token was revoked) always goes to the wrapped credential, and the new
+    token replaces the cached one. CAE and non-CAE tokens are cached apart.
+
+    Entries are keyed by ``identity`` too, so principals sharing a cache
+    file never get each other's tokens. It defaults to ``AZURE_CLIENT_ID``,
+    which selects the service principal or managed identity that
+    ``DefaultAzureCredential`` signs in as.
+    """
+
+    def __init__(self, credential_factory, cache_path, refresh_margin=300, identity=None):
+        self.credential_factory = credential_factory
+        self.cache_path = Path(cache_path).expanduser()
+        self.refresh_margin = refresh_margin
+        self.identity = identity if identity is not None else os.environ.get('AZURE_CLIENT_ID', '')
+        self._credential = None
+        self._tokens = None
+        self._lock = threading.Lock()
+
+    @property
+    def credential(self):
+        if self._credential is None:
+            self._credential = self.credential_factory()
+        return self._credential
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("token_cache_unreadable", path=str(self.cache_path), error=str(e))
+            return {}
+
+    def _save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(self.cache_path.suffix + '.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._tokens, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _cache_key(self, scopes, kwargs):
+        return '|'.join([self.identity, kwargs.get('tenant_id') or '', 'cae' if kwargs.get('enable_cae') else '',
+                         *sorted(scopes)])
+
+    def get_token(self, *scopes, **kwargs):
+        from azure.core.credentials import AccessToken
+
+        key = self._cache_key(scopes, kwargs)
+        with self._lock:
+            if self._tokens is None:
+                self._tokens = self._load()
+            cached = None if kwargs.get('claims') else self._tokens.get(key)
+            if cached and cached['expires_on'] - self.refresh_margin > time.time():
+                get_telemetry().increment('datamove_token_cache_total', result='hit')
+                return AccessToken(cached['token'], cached['expires_on'])
+
+            get_telemetry().increment('datamove_token_cache_total', result='miss')
+            with get_telemetry().span('credential.get_token', scopes=' '.join(scopes)):
+                token = self.credential.get_token(*scopes, **kwargs)
+            self._tokens[key] = {'token': token.token, 'expires_on': token.expires_on}
+            # Drop anything that has already expired while we're rewriting the file
+            self._tokens = {k: v for k, v in self._tokens.items() if v['expires_on'] > time.time()}
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning("token_cache_write_failed", path=str(self.cache_path), error=str(e))
+            logger.info("access_token_acquired", scopes=list(scopes), expires_on=token.expires_on)
+            return token
+
+    def close(self):
+        if self._credential is not None and hasattr(self._credential, 'close'):
+            self._credential.close()
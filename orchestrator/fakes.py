@@ -0,0 +1,371 @@
+# In-process stand-ins for the ADF, Databricks, SMTP and Slack clients. They
+# implement just the calls the orchestrator makes, with configurable latency,
+# error rate and throttling, so the simulator, benchmarks and tests exercise
+# the real orchestration code paths without network access. They ship in the
+# package because `python -m orchestrator.simulator` runs against them.
+from collections import Counter
+from itertools import count
+from types import SimpleNamespace
+import random
+import threading
+import uuid
+from .clock import get_clock
+
+
+class FakeHttpError(Exception):
+    """Error shaped like azure-core/databricks HTTP errors (status code plus response headers)."""
+
+    def __init__(self, status_code, message=None, retry_after=None):
+        super().__init__(message or f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class FaultProfile:
+    """
+    Latency and failures injected into every fake call.
+
+    Each call sleeps ``latency`` seconds (plus up to ``jitter``), then fails
+    with HTTP 429 (carrying ``retry_after``) with probability
+    ``throttle_rate``, or with HTTP 503 with probability ``error_rate``.
+    A ``seed`` makes the failure sequence reproducible. ``operations``
+    counts the calls made to each operation.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.calls = 0
+        self.failures = 0
+        self.operations = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def apply(self, operation):
+        with self._lock:
+            self.calls += 1
+            self.operations[operation] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._random.random()
+            throttled = roll < self.throttle_rate
+            failed = not throttled and roll < self.throttle_rate + self.error_rate
+            if throttled or failed:
+                self.failures += 1
+        if delay:
+            get_clock().sleep(delay)
+        if throttled:
+            raise FakeHttpError(429, f"{operation}: too many requests", retry_after=self.retry_after)
+        if failed:
+            raise FakeHttpError(503, f"{operation}: service unavailable")
+
+
+class _FakeRuns:
+    """
+    Runs that finish ``run_duration`` seconds (plus up to ``run_jitter``)
+    after they start, failing with ``failure_rate``.
+    """
+
+    def __init__(self, run_duration, failure_rate, seed, run_jitter=0.0):
+        self.run_duration = run_duration
+        self.run_jitter = run_jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def start(self, run_id, **attributes):
+        with self._lock:
+            succeeded = self._random.random() >= self.failure_rate
+            duration = self.run_duration + (self._random.uniform(0, self.run_jitter) if self.run_jitter else 0.0)
+            self._runs[run_id] = dict(attributes, started=get_clock().monotonic(), duration=duration,
+                                      succeeded=succeeded)
+
+    def state(self, run_id):
+        """Return ``(finished, succeeded, attributes)`` for a run."""
+        with self._lock:
+            run = self._runs[run_id]
+        finished = get_clock().monotonic() - run['started'] >= run['duration']
+        return finished, run['succeeded'], run
+
+    def ids(self):
+        with self._lock:
+            return list(self._runs)
+
+
+class _FakePipelines:
+    def __init__(self, client):
+        self._client = client
+
+    def create_run(self, resource_group_name, factory_name, pipeline_name, parameters=None, **kwargs):
+        self._client.profile.apply('pipelines.create_run')
+        run_id = str(uuid.uuid4())
+        self._client.runs.start(run_id, pipeline_name=pipeline_name, parameters=parameters, options=kwargs)
+        return SimpleNamespace(run_id=run_id)
+
+
+class _FakePipelineRuns:
+    page_size = 100
+
+    def __init__(self, client):
+        self._client = client
+
+    def _pipeline_run(self, run_id):
+        finished, succeeded, run = self._client.runs.state(run_id)
+        status = ('Succeeded' if succeeded else 'Failed') if finished else 'InProgress'
+        return SimpleNamespace(
+            run_id=run_id, pipeline_name=run['pipeline_name'], parameters=run['parameters'], status=status,
+            message='' if succeeded or not finished else 'Activity failed'
+        )
+
+    def get(self, resource_group_name, factory_name, run_id):
+        self._client.profile.apply('pipeline_runs.get')
+        return self._pipeline_run(run_id)
+
+    def query_by_factory(self, resource_group_name, factory_name, filter_parameters):
+        self._client.profile.apply('pipeline_runs.query_by_factory')
+        names = None
+        for query_filter in getattr(filter_parameters, 'filters', None) or []:
+            if query_filter.operand == 'PipelineName':
+                names = set(getattr(query_filter, 'values_property', None) or getattr(query_filter, 'values', None) or [])
+        runs = [self._pipeline_run(run_id) for run_id in self._client.runs.ids()]
+        if names is not None:
+            runs = [run for run in runs if run.pipeline_name in names]
+        offset = int(getattr(filter_parameters, 'continuation_token', None) or 0)
+        page = runs[offset:offset + self.page_size]
+        next_offset = offset + self.page_size
+        return SimpleNamespace(value=page, continuation_token=str(next_offset) if next_offset < len(runs) else None)
+
+
+class FakeDataFactoryClient:
+    """Stand-in for ``DataFactoryManagementClient`` (pipelines and pipeline_runs)."""
+
+    def __init__(self, profile=None, run_duration=0.0, failure_rate=0.0, seed=None, run_jitter=0.0):
+        self.profile = profile or FaultProfile()
+        self.runs = _FakeRuns(run_duration, failure_rate, seed, run_jitter)
+        self.pipelines = _FakePipelines(self)
+        self.pipeline_runs = _FakePipelineRuns(self)
+
+
+def _task_cluster(tasks):
+    return getattr((tasks or [None])[0], 'existing_cluster_id', None)
+
+
+class _FakeJobs:
+    def __init__(self, client):
+        self._client = client
+        self._jobs = {}
+        self._job_ids = count(1000)
+        self._run_ids = count(1)
+        self._runs_by_token = {}
+        self._lock = threading.Lock()
+
+    def create(self, name=None, tasks=None, tags=None, **settings):
+        self._client.profile.apply('jobs.create')
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = SimpleNamespace(
+                job_id=job_id,
+                settings=SimpleNamespace(name=name, tasks=tasks, tags=dict(tags or {}), **settings)
+            )
+        return SimpleNamespace(job_id=job_id)
+
+    def get(self, job_id):
+        self._client.profile.apply('jobs.get')
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            error = FakeHttpError(404, f"Job {job_id} does not exist")
+            error.error_code = 'RESOURCE_DOES_NOT_EXIST'
+            raise error
+        return job
+
+    def list(self, name=None, **kwargs):
+        self._client.profile.apply('jobs.list')
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return iter([job for job in jobs if name is None or job.settings.name == name])
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _start_run(self, idempotency_token=None, **attributes):
+        with self._lock:
+            # Like the Jobs API: a repeated token returns the run it already started
+            if idempotency_token is not None and idempotency_token in self._runs_by_token:
+                return SimpleNamespace(run_id=self._runs_by_token[idempotency_token])
+            run_id = next(self._run_ids)
+            if idempotency_token is not None:
+                self._runs_by_token[idempotency_token] = run_id
+        self._client.runs.start(run_id, **attributes)
+        return SimpleNamespace(run_id=run_id)
+
+    def run_now(self, job_id, notebook_params=None, idempotency_token=None, **kwargs):
+        self._client.profile.apply('jobs.run_now')
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                error = FakeHttpError(400, f"Job {job_id} does not exist")
+                error.error_code = 'INVALID_PARAMETER_VALUE'
+                raise error
+        return self._start_run(idempotency_token, job_id=job_id, notebook_params=notebook_params,
+                               cluster_id=_task_cluster(job.settings.tasks), options=kwargs)
+
+    def submit(self, run_name=None, tasks=None, idempotency_token=None, **kwargs):
+        self._client.profile.apply('jobs.submit')
+        return self._start_run(idempotency_token, run_name=run_name, tasks=tasks,
+                               cluster_id=_task_cluster(tasks), options=kwargs)
+
+    def list_runs(self, active_only=False, expand_tasks=False, **kwargs):
+        self._client.profile.apply('jobs.list_runs')
+        runs = []
+        for run_id in self._client.runs.ids():
+            finished, _, run = self._client.runs.state(run_id)
+            if not (active_only and finished):
+                # Like multi-task runs: the cluster is only named on each task
+                tasks = None
+                if expand_tasks:
+                    tasks = [SimpleNamespace(
+                        cluster_instance=SimpleNamespace(cluster_id=run.get('cluster_id')),
+                        state=SimpleNamespace(life_cycle_state='TERMINATED' if finished else 'RUNNING')
+                    )]
+                runs.append(SimpleNamespace(run_id=run_id, cluster_instance=None, tasks=tasks))
+        return iter(runs)
+
+    def get_run(self, run_id):
+        self._client.profile.apply('jobs.get_run')
+        finished, succeeded, _ = self._client.runs.state(run_id)
+        return SimpleNamespace(run_id=run_id, state=SimpleNamespace(
+            life_cycle_state='TERMINATED' if finished else 'RUNNING',
+            result_state=('SUCCESS' if succeeded else 'FAILED') if finished else None,
+            state_message='' if succeeded or not finished else 'Notebook failed'
+        ))
+
+
+class _FakeClusters:
+    """All-purpose clusters that reach RUNNING ``start_duration`` seconds after ``start``."""
+
+    def __init__(self, client, start_duration):
+        self._client = client
+        self.start_duration = start_duration
+        self._started = {}
+        self.starts = 0
+        self.terminations = 0
+        self._lock = threading.Lock()
+
+    def add(self, cluster_id, running=False):
+        with self._lock:
+            self._started[cluster_id] = get_clock().monotonic() - self.start_duration if running else None
+
+    def get(self, cluster_id):
+        self._client.profile.apply('clusters.get')
+        with self._lock:
+            started = self._started[cluster_id]
+        if started is None:
+            state = 'TERMINATED'
+        else:
+            state = 'RUNNING' if get_clock().monotonic() - started >= self.start_duration else 'PENDING'
+        return SimpleNamespace(cluster_id=cluster_id, state=state)
+
+    def start(self, cluster_id):
+        self._client.profile.apply('clusters.start')
+        with self._lock:
+            if self._started.get(cluster_id) is None:
+                self._started[cluster_id] = get_clock().monotonic()
+                self.starts += 1
+
+    def delete(self, cluster_id):
+        """Terminate the cluster (the Clusters API's ``delete`` does not remove it)."""
+        self._client.profile.apply('clusters.delete')
+        with self._lock:
+            self._started[cluster_id] = None
+            self.terminations += 1
+
+
+class FakeWorkspaceClient:
+    """Stand-in for the Databricks ``WorkspaceClient`` (the ``jobs`` and ``clusters`` APIs)."""
+
+    def __init__(self, profile=None, run_duration=0.0, failure_rate=0.0, seed=None, cluster_start_duration=0.0,
+                 run_jitter=0.0):
+        self.profile = profile or FaultProfile()
+        self.runs = _FakeRuns(run_duration, failure_rate, seed, run_jitter)
+        self.jobs = _FakeJobs(self)
+        self.clusters = _FakeClusters(self, cluster_start_duration)
+
+
+class FakeSMTP:
+    """
+    Drop-in for ``smtplib.SMTP``; install with ``FakeSMTP.install(profile)``.
+
+    Messages are recorded in ``FakeSMTP.sent`` and connections counted in
+    ``FakeSMTP.connections``.
+    """
+
+    profile = FaultProfile()
+    sent = []
+    connections = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def install(cls, profile=None):
+        """Return a subclass with its own profile and counters."""
+        return type('FakeSMTP', (cls,), {
+            'profile': profile or FaultProfile(), 'sent': [], 'connections': 0, '_lock': threading.Lock()
+        })
+
+    def __init__(self, host='', port=0, timeout=None, **kwargs):
+        self.profile.apply('smtp.connect')
+        with self._lock:
+            type(self).connections += 1
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.quit()
+
+    def starttls(self, *args, **kwargs):
+        return 220, b'ready'
+
+    def login(self, username, password):
+        return 235, b'authenticated'
+
+    def noop(self):
+        return (250, b'ok') if not self.closed else (421, b'closed')
+
+    def send_message(self, msg, *args, **kwargs):
+        self.profile.apply('smtp.send_message')
+        with self._lock:
+            self.sent.append(msg)
+        return {}
+
+    def quit(self):
+        self.closed = True
+        return 221, b'bye'
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSlackClient:
+    """Stand-in for ``slack_sdk.WebClient``; failures surface as ``SlackApiError``."""
+
+    def __init__(self, profile=None):
+        self.profile = profile or FaultProfile()
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        try:
+            self.profile.apply('chat.postMessage')
+        except FakeHttpError as e:
+            from slack_sdk.errors import SlackApiError
+            raise SlackApiError(str(e), {'ok': False, 'error': 'ratelimited' if e.status_code == 429 else 'fatal_error'})
+        with self._lock:
+            self.messages.append({'channel': channel, 'text': text})
+        return {'ok': True, 'channel': channel}
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from .logger import get_logger
+
+logger = get_logger()
+
+SETTINGS_HASH_TAG = 'datamove_settings_hash'
+MISSING_JOB_ERROR_CODES = {'RESOURCE_DOES_NOT_EXIST', 'INVALID_PARAMETER_VALUE', 'NOT_FOUND'}
+
+
+def settings_hash(name, tasks, **settings):
+    """Stable hash of a job definition, independent of per-run parameters."""
+    payload = {
+        'name': name,
+        'tasks': [task.as_dict() if hasattr(task, 'as_dict') else task for task in tasks],
+    }
+    # Only settings that were given, so adding an optional setting doesn't change existing hashes
+    payload.update({key: value for key, value in settings.items() if value is not None})
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def is_missing_job(error):
+    return getattr(error, 'error_code', None) in MISSING_JOB_ERROR_CODES or \
+        getattr(error, 'status_code', None) == 404
+
+
+class JobDefinitionCache:
+    """
+    Reuse Databricks job definitions instead of creating one per execution.
+
+    Definitions are keyed by a hash of their settings and tagged with it in the
+    workspace. The mapping from hash to job ID is kept in memory and, when
+    ``index_path`` is set, in a JSON index on disk so later processes skip the
+    lookup too. Each cached job is checked against the workspace once per
+    process; a job that was deleted or edited there is replaced.
+    """
+
+    def __init__(self, databricks_client, index_path=None):
+        self.databricks_client = databricks_client
+        self.index_path = Path(index_path) if index_path else None
+        self._index = self._load_index()
+        self._verified = set()
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        if not self.index_path:
+            return {}
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("job_index_unreadable", path=str(self.index_path), error=str(e))
+            return {}
+
+    def _save_index(self):
+        if not self.index_path:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(self.index_path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def _workspace_job_matches(self, job_id, digest):
+        try:
+            job = self.databricks_client.jobs.get(job_id)
+        except Exception as e:
+            if is_missing_job(e):
+                return False
+            raise
+        tags = (job.settings.tags if job.settings else None) or {}
+        return tags.get(SETTINGS_HASH_TAG) == digest
+
+    def _find_in_workspace(self, name, digest):
+        for job in self.databricks_client.jobs.list(name=name):
+            tags = (job.settings.tags if job.settings else None) or {}
+            if tags.get(SETTINGS_HASH_TAG) == digest:
+                return job.job_id
+        return None
+
+    def get_or_create(self, name, tasks, **settings):
+        """
+        Return the job ID for these settings, creating the job only if needed.
+
+        Extra job settings (e.g. ``max_concurrent_runs``) are passed to
+        ``jobs.create`` and are part of the settings hash.
+        """
+        settings = {key: value for key, value in settings.items() if value is not None}
+        digest = settings_hash(name, tasks, **settings)
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry and digest in self._verified:
+                return entry['job_id']
+
+            if entry and self._workspace_job_matches(entry['job_id'], digest):
+                self._verified.add(digest)
+                logger.info("databricks_job_reused", job_id=entry['job_id'], settings_hash=digest[:12])
+                return entry['job_id']
+
+            job_id = self._find_in_workspace(name, digest)
+            if job_id is None:
+                job = self.databricks_client.jobs.create(
+                    name=name,
+                    tasks=tasks,
+                    tags={SETTINGS_HASH_TAG: digest},
+                    **settings
+                )
+                job_id = job.job_id
+                logger.info("databricks_job_created", job_id=job_id, settings_hash=digest[:12])
+            else:
+                logger.info("databricks_job_adopted", job_id=job_id, settings_hash=digest[:12])
+
+            self._index[digest] = {'job_id': job_id, 'name': name, 'created_at': time.time()}
+            self._verified.add(digest)
+            self._save_index()
+            return job_id
+
+    def invalidate(self, job_id):
+        """Forget a job, e.g. after run_now reports it no longer exists."""
+        with self._lock:
+            for digest, entry in list(self._index.items()):
+                if entry['job_id'] == job_id:
+                    del self._index[digest]
+                    self._verified.discard(digest)
+            self._save_index()
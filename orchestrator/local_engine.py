@@ -0,0 +1,287 @@
+from datetime import date, datetime, timedelta, timezone
+import importlib
+import importlib.util
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from .logger import get_logger
+
+logger = get_logger()
+
+# Columns added by the transformation, as in pipelines/databricks_notebook.py
+PARTITION_COLUMNS = ['year', 'month', 'day']
+DERIVED_COLUMNS = ['processed_date'] + PARTITION_COLUMNS
+ENGINES = ('auto', 'duckdb', 'pyarrow')
+OUTPUT_FORMATS = ('parquet', 'delta')
+
+# pip package behind each optional module
+PACKAGES = {'pyarrow': 'pyarrow', 'duckdb': 'duckdb', 'deltalake': 'deltalake'}
+
+
+class LocalEngineUnavailable(RuntimeError):
+    """Raised when an optional package a local run needs is not installed."""
+
+
+def _import(module):
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        package = PACKAGES[module.split('.')[0]]
+        raise LocalEngineUnavailable(f"Local transforms need '{package}' (pip install {package})") from e
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def available(engine='auto', output_format='parquet'):
+    """Whether the packages for ``engine`` and ``output_format`` are installed."""
+    modules = ['pyarrow']
+    if engine == 'duckdb':
+        modules.append('duckdb')
+    if output_format == 'delta':
+        modules.append('deltalake')
+    return all(_installed(module) for module in modules)
+
+
+def is_delta_table(path):
+    return (Path(path) / '_delta_log').is_dir()
+
+
+def input_size(path):
+    """
+    Bytes of data files under a local ``path``.
+
+    None when the path is not on the local file system (``dbfs:/``,
+    ``abfss://``, a mount that only exists on the cluster), so the caller
+    can't tell how big it is. Metadata such as ``_delta_log`` is skipped;
+    for a Delta table files of older versions are counted too.
+    """
+    if not path or '://' in str(path) or str(path).startswith('dbfs:'):
+        return None
+    path = Path(path).expanduser()
+    if path.is_file():
+        return path.stat().st_size
+    if not path.is_dir():
+        return None
+    total = 0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files if not f.startswith(('_', '.')))
+    return total
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+class LocalTransform:
+    """
+    Full-mode run of the notebook transformation in-process, without Spark.
+
+    The source (a Parquet directory or a Delta table) is scanned as a
+    pyarrow dataset, restricted to ``start_date``..``end_date`` when both
+    are given. Duplicate rows are removed, ``processed_date`` and the
+    year/month/day partition columns are added, and the result is written
+    as hive-partitioned Parquet or, with delta-rs, as a Delta table.
+
+    With DuckDB the query runs vectorised over the dataset, spills to disk
+    when it doesn't fit in memory, and its result streams into the writer
+    ``batch_size`` rows at a time. The pyarrow engine de-duplicates with an
+    in-memory hash aggregate, so it suits inputs that fit in memory.
+
+    Overwrites follow the notebook: a date range is replaced as a whole;
+    otherwise only the partitions present in the new data are replaced
+    (``partition_overwrite`` "dynamic") or the whole target ("static").
+    """
+
+    def __init__(self, source_path, target_path, start_date=None, end_date=None, partition_overwrite='dynamic',
+                 output_format='parquet', engine='auto', batch_size=65536):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown local engine '{engine}'; expected one of {', '.join(ENGINES)}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'; expected one of {', '.join(OUTPUT_FORMATS)}")
+        self.source_path = str(source_path)
+        self.target_path = str(target_path)
+        self.date_range = None
+        if start_date and end_date:
+            self.date_range = (date.fromisoformat(str(start_date)), date.fromisoformat(str(end_date)))
+        self.partition_overwrite = partition_overwrite
+        self.output_format = output_format
+        self.engine = engine
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_parameters(cls, parameters, **options):
+        """Build from notebook parameters (`source_path`, `target_path`, `start_date`, `end_date`, ...)."""
+        return cls(
+            parameters['source_path'],
+            parameters['target_path'],
+            start_date=parameters.get('start_date') or None,
+            end_date=parameters.get('end_date') or None,
+            partition_overwrite=parameters.get('partition_overwrite', 'dynamic'),
+            **options
+        )
+
+    def resolved_engine(self):
+        if self.engine == 'auto':
+            return 'duckdb' if _installed('duckdb') else 'pyarrow'
+        return self.engine
+
+    def _dataset(self):
+        ds = _import('pyarrow.dataset')
+        if is_delta_table(self.source_path):
+            return _import('deltalake').DeltaTable(self.source_path).to_pyarrow_dataset()
+        return ds.dataset(self.source_path, format='parquet', partitioning='hive')
+
+    def _date_filter(self, dataset):
+        if self.date_range is None:
+            return None
+        pa = _import('pyarrow')
+        ds = _import('pyarrow.dataset')
+        # Compare in the column's own type, as Spark casts the range literals
+        date_type = dataset.schema.field('date').type
+        start, end = (pa.scalar(value).cast(date_type) for value in self.date_range)
+        return (ds.field('date') >= start) & (ds.field('date') <= end)
+
+    def _as_dates(self, dates):
+        """The date column in a type ``pc.year`` accepts: strings are parsed, as Spark casts them."""
+        pa = _import('pyarrow')
+        pc = _import('pyarrow.compute')
+        if not (pa.types.is_string(dates.type) or pa.types.is_large_string(dates.type)):
+            return dates
+        try:
+            return pc.cast(dates, pa.timestamp('us'))
+        except pa.ArrowInvalid as e:
+            raise ValueError(f"Source {self.source_path} has 'date' values that are not ISO dates: {e}") from e
+
+    def touched_partitions(self, dataset):
+        """Distinct (year, month, day) of the rows to write; only the date column is read."""
+        pa = _import('pyarrow')
+        pc = _import('pyarrow.compute')
+        dates = self._as_dates(dataset.to_table(columns=['date'], filter=self._date_filter(dataset))['date'])
+        parts = pa.table({'year': pc.year(dates), 'month': pc.month(dates), 'day': pc.day(dates)}).drop_null()
+        distinct = parts.group_by(PARTITION_COLUMNS).aggregate([])
+        return sorted(tuple(row[c] for c in PARTITION_COLUMNS) for row in distinct.to_pylist())
+
+    def _duckdb_reader(self, dataset, columns, processed_at):
+        duckdb = _import('duckdb')
+        connection = duckdb.connect()
+        # Scanned lazily: the date filter and column selection are pushed down to the Parquet reader
+        connection.register('source', dataset)
+        where, params = '', []
+        if self.date_range is not None:
+            where, params = ' WHERE "date" >= ? AND "date" <= ?', list(self.date_range)
+        # String dates were already checked by touched_partitions
+        date_type = dataset.schema.field('date').type
+        dates = 'CAST("date" AS TIMESTAMP)' if str(date_type) in ('string', 'large_string') else '"date"'
+        query = (
+            'SELECT *, ?::TIMESTAMPTZ AS processed_date, '
+            f'year({dates}) AS year, month({dates}) AS month, day({dates}) AS day '
+            f'FROM (SELECT DISTINCT {", ".join(_quote(c) for c in columns)} FROM source{where})'
+        )
+        result = connection.execute(query, [processed_at] + params)
+        # fetch_record_batch is deprecated; DuckDB before 1.4 only has that
+        to_arrow_reader = getattr(result, 'to_arrow_reader', None) or result.fetch_record_batch
+        return to_arrow_reader(self.batch_size), connection
+
+    def _pyarrow_reader(self, dataset, columns, processed_at):
+        pa = _import('pyarrow')
+        pc = _import('pyarrow.compute')
+        table = dataset.to_table(columns=columns, filter=self._date_filter(dataset), batch_size=self.batch_size)
+        # A hash aggregate with no aggregations keeps one row per distinct combination of values
+        table = table.group_by(columns).aggregate([]).select(columns)
+        dates = self._as_dates(table['date'])
+        table = table.append_column('processed_date', pa.repeat(pa.scalar(processed_at), table.num_rows))
+        for name, part in (('year', pc.year), ('month', pc.month), ('day', pc.day)):
+            table = table.append_column(name, part(dates))
+        return table.to_reader(max_chunksize=self.batch_size)
+
+    def _clear_range(self):
+        """Remove the target's partitions for every day in the date range (replaceWhere)."""
+        start, end = self.date_range
+        day = start
+        while day <= end:
+            shutil.rmtree(Path(self.target_path, f"year={day.year}", f"month={day.month}", f"day={day.day}"),
+                          ignore_errors=True)
+            day += timedelta(days=1)
+
+    def _write_parquet(self, reader):
+        ds = _import('pyarrow.dataset')
+        if self.date_range is not None:
+            self._clear_range()
+            behavior = 'overwrite_or_ignore'
+        elif self.partition_overwrite == 'static':
+            shutil.rmtree(self.target_path, ignore_errors=True)
+            behavior = 'overwrite_or_ignore'
+        else:
+            # Each partition directory written to is emptied first; others are left alone
+            behavior = 'delete_matching'
+        ds.write_dataset(
+            reader, self.target_path,
+            format='parquet',
+            partitioning=PARTITION_COLUMNS,
+            partitioning_flavor='hive',
+            existing_data_behavior=behavior,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet"
+        )
+
+    def _write_delta(self, reader, partitions):
+        deltalake = _import('deltalake')
+        options = {}
+        if is_delta_table(self.target_path):
+            if self.date_range is not None:
+                start, end = self.date_range
+                options['predicate'] = f"\"date\" >= '{start.isoformat()}' AND \"date\" <= '{end.isoformat()}'"
+            elif self.partition_overwrite != 'static':
+                options['predicate'] = " OR ".join(
+                    "(" + " AND ".join(f"{c} = {v}" for c, v in zip(PARTITION_COLUMNS, values)) + ")"
+                    for values in partitions
+                )
+        deltalake.write_deltalake(self.target_path, reader, partition_by=PARTITION_COLUMNS, mode='overwrite',
+                                  **options)
+
+    def run(self):
+        """Transform and write. Returns the engine used, rows written, partitions touched and seconds taken."""
+        pa = _import('pyarrow')
+        start = time.perf_counter()
+        engine = self.resolved_engine()
+        dataset = self._dataset()
+        if 'date' not in dataset.schema.names:
+            raise ValueError(f"Source {self.source_path} has no 'date' column")
+        # Derived columns already in the source are replaced, as withColumn does
+        columns = [c for c in dataset.schema.names if c not in DERIVED_COLUMNS]
+        partitions = self.touched_partitions(dataset)
+        result = {'engine': engine, 'rows': 0, 'partitions': len(partitions)}
+        if not partitions and self.date_range is None and self.partition_overwrite != 'static':
+            # Dynamic overwrite with no new data leaves the target unchanged
+            result['seconds'] = round(time.perf_counter() - start, 3)
+            return result
+
+        processed_at = datetime.now(timezone.utc)
+        connection = None
+        if engine == 'duckdb':
+            reader, connection = self._duckdb_reader(dataset, columns, processed_at)
+        else:
+            reader = self._pyarrow_reader(dataset, columns, processed_at)
+
+        def counted(batches):
+            for batch in batches:
+                result['rows'] += batch.num_rows
+                yield batch
+
+        try:
+            reader = pa.RecordBatchReader.from_batches(reader.schema, counted(reader))
+            if self.output_format == 'delta':
+                self._write_delta(reader, partitions)
+            else:
+                self._write_parquet(reader)
+        finally:
+            if connection is not None:
+                connection.close()
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        logger.info("local_transform_written", target_path=self.target_path, output_format=self.output_format,
+                    **result)
+        return result
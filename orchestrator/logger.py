@@ -1,45 +1,334 @@
 import structlog
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+import traceback
+from datetime import datetime, timezone
 from pathlib import Path
 
-def setup_logger(config):
-    """Configure structured logging for the pipeline."""
-    
-    # Create logs directory if it doesn't exist
-    log_path = Path(config['logging']['output_file'])
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Configure structlog
+# Handlers installed by setup_logger, so repeated calls don't stack duplicates
+_installed = {'key': None, 'handlers': [], 'listener': None}
+_install_lock = threading.Lock()
+
+# Both modes share one structlog configuration that reads the mode and level
+# on every event, because loggers cached by structlog keep the processors and
+# logger they were first bound to. Queue mode uses one process-wide queue.
+# With nothing installed (mode None) events are dropped.
+_log_queue = queue.SimpleQueue()
+_route = {'mode': None, 'level': None}
+_print_lock = threading.Lock()
+_METHOD_LEVELS = {
+    'debug': logging.DEBUG, 'info': logging.INFO, 'msg': logging.INFO,
+    'warning': logging.WARNING, 'warn': logging.WARNING,
+    'error': logging.ERROR, 'exception': logging.ERROR,
+    'critical': logging.CRITICAL, 'fatal': logging.CRITICAL,
+}
+
+
+class _DeferredFlushMixin:
+    """Skip the per-record flush; the queue listener flushes once per batch."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        logging.StreamHandler.flush(self)
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class BufferedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+
+class _BufferedFileMixin(_DeferredFlushMixin):
+    buffer_size = 64 * 1024
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+
+class BufferedRotatingFileHandler(_BufferedFileMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class BufferedTimedRotatingFileHandler(_BufferedFileMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class _PassthroughQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records untouched.
+
+    The stock QueueHandler formats each record on the calling thread; here
+    formatting happens on the listener thread.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_json_renderer = structlog.processors.JSONRenderer()
+_stack_info_renderer = structlog.processors.StackInfoRenderer()
+
+
+def _render_event(event_dict):
+    """Render an event dict to its JSON line, the same way in both modes."""
+    timestamp = event_dict.get('timestamp')
+    if isinstance(timestamp, float):
+        event_dict['timestamp'] = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    event_dict = _stack_info_renderer(None, None, event_dict)
+    event_dict = structlog.processors.format_exc_info(None, None, event_dict)
+    return _json_renderer(None, None, event_dict)
+
+
+class RoutingLogger:
+    """
+    structlog logger that sends each event to the current mode's output.
+
+    In queue mode it only puts ``(level, event_dict)`` on the queue, which
+    bypasses the stdlib logging machinery (caller lookup, LogRecord
+    creation, handler locks) on the calling thread entirely. In sync mode
+    it renders and prints the event directly.
+    """
+
+    def _emitter(level):
+        def emit(self, event_dict):
+            mode = _route['mode']
+            if mode == 'queue':
+                _log_queue.put((level, event_dict))
+            elif mode == 'sync':
+                line = _render_event(event_dict)
+                with _print_lock:
+                    print(line, file=sys.stdout, flush=True)
+        return emit
+
+    debug = _emitter(logging.DEBUG)
+    info = msg = _emitter(logging.INFO)
+    warning = warn = _emitter(logging.WARNING)
+    error = exception = _emitter(logging.ERROR)
+    critical = fatal = _emitter(logging.CRITICAL)
+    del _emitter
+
+
+def _filter_by_level(logger, method_name, event_dict):
+    mode = _route['mode']
+    if mode is None:
+        raise structlog.DropEvent
+    # Sync mode prints every structlog event, as it always has
+    if mode == 'queue' and _METHOD_LEVELS.get(method_name, logging.INFO) < _route['level']:
+        raise structlog.DropEvent
+    return event_dict
+
+
+def _capture_exc_info(logger, method_name, event_dict):
+    # exc_info=True must be resolved on the raising thread, not the listener
+    if event_dict.get('exc_info') is True:
+        event_dict['exc_info'] = sys.exc_info()
+    return event_dict
+
+
+def _enqueue_event(logger, method_name, event_dict):
+    return (event_dict,), {}
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    Drain up to ``batch_size`` entries at a time and flush handlers once per batch.
+
+    Entries are either structlog ``(level, event_dict)`` pairs, which are
+    rendered to JSON here, or LogRecords from stdlib loggers.
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def _to_record(self, entry):
+        if isinstance(entry, logging.LogRecord):
+            return entry
+        level, event_dict = entry
+        return logging.LogRecord('structlog', level, '', 0, _render_event(event_dict), None, None)
+
+    def _flush_handlers(self):
+        for handler in self.handlers:
+            getattr(handler, 'flush_batch', handler.flush)()
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            entry = q.get()
+            stop = entry is self._sentinel
+            batch = [] if stop else [entry]
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    entry = q.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(entry)
+            for entry in batch:
+                try:
+                    self.handle(self._to_record(entry))
+                except Exception:
+                    # One unrenderable entry must not take down the listener thread
+                    traceback.print_exc(file=sys.stderr)
+            self._flush_handlers()
+            if stop:
+                return
+
+
+def _level_number(level):
+    return level if isinstance(level, int) else logging.getLevelName(str(level).upper())
+
+
+def _build_file_handler(config):
+    rotation = config['logging'].get('rotation', {})
+    output_file = config['logging']['output_file']
+    if rotation.get('when', 'size') == 'time':
+        handler = BufferedTimedRotatingFileHandler(
+            output_file,
+            when=rotation.get('interval', 'midnight'),
+            backupCount=rotation.get('backup_count', 7),
+            delay=True
+        )
+    else:
+        handler = BufferedRotatingFileHandler(
+            output_file,
+            maxBytes=rotation.get('max_bytes', 50 * 1024 * 1024),
+            backupCount=rotation.get('backup_count', 5),
+            delay=True
+        )
+    handler.buffer_size = config['logging'].get('buffer_size', handler.buffer_size)
+    return handler
+
+
+def _configure_structlog():
+    # Only cheap processors run on the calling thread; in queue mode rendering happens in the listener
     structlog.configure(
         processors=[
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer()
+            _filter_by_level,
+            structlog.contextvars.merge_contextvars,
+            # Raw epoch here; _render_event turns it into an ISO string
+            structlog.processors.TimeStamper(fmt=None, utc=True),
+            _capture_exc_info,
+            _enqueue_event,
         ],
         context_class=dict,
-        logger_factory=structlog.PrintLoggerFactory(),
-        wrapper_class=structlog.BoundLogger,
+        logger_factory=lambda *args: RoutingLogger(),
+        # Levels are checked by _filter_by_level, which sees later level and mode changes
+        wrapper_class=structlog.make_filtering_bound_logger(logging.DEBUG),
         cache_logger_on_first_use=True,
     )
-    
+
+
+def _install_queue_logging(config, root_logger):
+    """Send structlog events and stdlib records to the queue drained by a background listener."""
+    _configure_structlog()
+
+    file_handler = _build_file_handler(config)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    console_handler = BufferedStreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    listener = BatchingQueueListener(
+        _log_queue, file_handler, console_handler,
+        batch_size=config['logging'].get('batch_size', 256)
+    )
+    listener.start()
+    _route.update(mode='queue', level=_level_number(config['logging']['level']))
+
+    # Records from stdlib loggers (SDKs, urllib3, ...) share the same queue
+    queue_handler = _PassthroughQueueHandler(_log_queue)
+    root_logger.addHandler(queue_handler)
+    return [queue_handler], listener
+
+
+def _install_sync_logging(config, root_logger):
+    """Print structlog events on the calling thread and write stdlib records directly."""
+    _configure_structlog()
+    _route.update(mode='sync', level=_level_number(config['logging']['level']))
+
     # Set up file handler
     file_handler = logging.FileHandler(config['logging']['output_file'])
     file_handler.setFormatter(logging.Formatter('%(message)s'))
-    
+
     # Set up console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(logging.Formatter('%(message)s'))
-    
+
+    root_logger.addHandler(file_handler)
+    root_logger.addHandler(console_handler)
+    return [file_handler, console_handler], None
+
+
+def shutdown_logging():
+    """Flush queued records and remove the handlers installed by setup_logger."""
+    with _install_lock:
+        root_logger = logging.getLogger()
+        for handler in _installed['handlers']:
+            root_logger.removeHandler(handler)
+        _route.update(mode=None, level=None)
+        if _installed['listener'] is not None:
+            _installed['listener'].stop()
+            for handler in _installed['listener'].handlers:
+                handler.close()
+        else:
+            for handler in _installed['handlers']:
+                handler.close()
+        _installed.update(key=None, handlers=[], listener=None)
+
+
+def setup_logger(config):
+    """
+    Configure structured logging for the pipeline.
+
+    ``logging.mode: queue`` hands records to a background listener that writes
+    them in batches to a rotating file; the default ``sync`` mode writes
+    directly. Calling this again with the same settings is a no-op, so
+    constructing several orchestrators in one process does not duplicate
+    output.
+    """
+    key = (
+        config['logging'].get('mode', 'sync'),
+        config['logging']['output_file'],
+        config['logging']['level'],
+        repr(config['logging'].get('rotation')),
+    )
+    with _install_lock:
+        installed = _installed['key'] == key
+    if installed:
+        return structlog.get_logger()
+    shutdown_logging()
+
+    # Create logs directory if it doesn't exist
+    log_path = Path(config['logging']['output_file'])
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(config['logging']['level'])
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
-    
+
+    with _install_lock:
+        if config['logging'].get('mode', 'sync') == 'queue':
+            handlers, listener = _install_queue_logging(config, root_logger)
+        else:
+            handlers, listener = _install_sync_logging(config, root_logger)
+        _installed.update(key=key, handlers=handlers, listener=listener)
+
     return structlog.get_logger()
 
 def get_logger():
     """Get the configured logger instance."""
-    return structlog.get_logger() 
\ No newline at end of file
+    return structlog.get_logger()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,57 @@
+import threading
+from .clock import get_clock
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    ``acquire`` blocks until a token is available, so callers are smoothed to
+    the configured rate while still allowing short bursts.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = get_clock().monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def set_rate(self, rate):
+        """Change the refill rate, keeping tokens accrued at the old rate."""
+        with self._lock:
+            self._refill(get_clock().monotonic())
+            self._rate = max(float(rate), 1e-6)
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self._rate)
+            self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available without blocking. Returns True on success."""
+        with self._lock:
+            self._refill(get_clock().monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` are available and take them."""
+        while True:
+            with self._lock:
+                self._refill(get_clock().monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self._rate
+            get_clock().sleep(wait_time)
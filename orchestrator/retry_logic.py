@@ -1,9 +1,573 @@
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import Retrying
+from contextlib import contextmanager
 from functools import wraps
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import contextvars
+import random
+import threading
+import time
+import uuid
+from .clock import get_clock
 from .logger import get_logger
+from .telemetry import get_telemetry
 
 logger = get_logger()
 
+THROTTLE_STATUS_CODES = {429}
+
+# Error classes returned by classify_error
+THROTTLED = 'throttled'
+TRANSIENT = 'transient'
+FATAL = 'fatal'
+
+# Databricks reports failures through error codes rather than HTTP statuses
+THROTTLE_ERROR_CODES = {'REQUEST_LIMIT_EXCEEDED', 'TOO_MANY_REQUESTS'}
+TRANSIENT_ERROR_CODES = {'TEMPORARILY_UNAVAILABLE', 'INTERNAL_ERROR', 'DEADLINE_EXCEEDED'}
+FATAL_ERROR_CODES = {
+    'INVALID_PARAMETER_VALUE', 'INVALID_STATE', 'RESOURCE_DOES_NOT_EXIST', 'RESOURCE_ALREADY_EXISTS',
+    'PERMISSION_DENIED', 'UNAUTHENTICATED', 'BAD_REQUEST', 'NOT_FOUND', 'MALFORMED_REQUEST',
+}
+# Exceptions that can never succeed on retry (auth and validation failures)
+FATAL_EXCEPTION_NAMES = {
+    'ClientAuthenticationError', 'CredentialUnavailableError', 'AuthenticationRequiredError',
+    'ValueError', 'TypeError', 'KeyError', 'CircuitOpenError',
+}
+
+
+def get_status_code(error):
+    """Return the HTTP status code carried by an SDK exception, if any."""
+    status = getattr(error, 'status_code', None)
+    if not isinstance(status, int):
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def get_retry_after(error):
+    """
+    Return the delay in seconds requested by the server via Retry-After.
+
+    Understands delta-seconds, HTTP-dates and Azure's ``x-ms-retry-after-ms``.
+    Returns None when the error carries no such hint.
+    """
+    retry_after_secs = getattr(error, 'retry_after_secs', None)
+    if isinstance(retry_after_secs, (int, float)):
+        return max(0.0, float(retry_after_secs))
+
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('x-ms-retry-after-ms') or headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get('Retry-After') or headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_throttled(error):
+    """True if the error is a rate-limit response from the service."""
+    return get_status_code(error) in THROTTLE_STATUS_CODES
+
+def classify_error(error):
+    """
+    Classify an exception as THROTTLED, TRANSIENT or FATAL.
+
+    Throttling (429) and server-side failures (5xx, 408, connection errors)
+    are worth retrying; other 4xx responses and auth/validation errors are
+    not. Anything unrecognised is treated as transient.
+    """
+    status = get_status_code(error)
+    if status in THROTTLE_STATUS_CODES:
+        return THROTTLED
+    if status is not None:
+        if status >= 500 or status == 408:
+            return TRANSIENT
+        if 400 <= status < 500:
+            return FATAL
+
+    error_code = getattr(error, 'error_code', None)
+    if error_code in THROTTLE_ERROR_CODES:
+        return THROTTLED
+    if error_code in TRANSIENT_ERROR_CODES:
+        return TRANSIENT
+    if error_code in FATAL_ERROR_CODES:
+        return FATAL
+
+    if any(cls.__name__ in FATAL_EXCEPTION_NAMES for cls in type(error).__mro__):
+        return FATAL
+    return TRANSIENT
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+    def __init__(self, service, retry_in):
+        self.service = service
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {service}; next attempt allowed in {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Per-service circuit breaker.
+
+    After ``failure_threshold`` consecutive retryable failures the circuit
+    opens and calls fail immediately with CircuitOpenError. Once
+    ``reset_timeout`` seconds have passed a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit. A fatal error
+    still proves the service answered, so it closes the circuit too, and a
+    trial that ends any other way (cancelled, past its deadline) is released
+    so the next call can try again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, service, failure_threshold=5, reset_timeout=60):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead. Returns True if it is the half-open trial."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            waited = get_clock().monotonic() - self._opened_at
+            if self.state == self.OPEN and waited >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            raise CircuitOpenError(self.service, max(0.0, self.reset_timeout - waited))
+
+    def release_trial(self):
+        """Let another trial through if the current one ended without recording an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("circuit_closed", service=self.service)
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.error("circuit_opened", service=self.service, failures=self._failures)
+                self.state = self.OPEN
+                self._opened_at = get_clock().monotonic()
+                self._trial_in_flight = False
+
+
+class RetryBudget:
+    """
+    Shared cap on retries, as a fraction of first attempts.
+
+    Every first attempt deposits ``ratio`` tokens (up to ``max_tokens``) and
+    every retry spends one, with ``min_tokens`` available from the start. When
+    a dependency is down the budget drains and calls fail after their first
+    attempt instead of multiplying load with retries.
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=10, max_tokens=100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+# Monotonic time by which the current stage must finish; copied into asyncio
+# tasks automatically and into stage threads by the StageExecutor
+_deadline = contextvars.ContextVar('datamove_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call cannot finish before the enclosing deadline."""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Bound everything inside the block, including nested calls, to ``seconds``.
+
+    Nested deadlines can only shorten the enclosing one. ``None`` leaves the
+    current deadline unchanged.
+    """
+    if seconds is None:
+        yield _deadline.get()
+        return
+    expires_at = get_clock().monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield expires_at
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """Seconds left before the current deadline, or None if there is none."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - get_clock().monotonic()
+
+
+# Counters of the enclosing `counting_retries` blocks, e.g. one stage's inside a whole run's
+_retry_counters = contextvars.ContextVar('datamove_retry_counters', default=())
+
+
+@contextmanager
+def counting_retries():
+    """Count the retries of every policy call made inside the block, in ``counter['retries']``."""
+    counter = {'retries': 0}
+    token = _retry_counters.set(_retry_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _retry_counters.reset(token)
+
+
+class DecorrelatedJitter:
+    """
+    Decorrelated jitter backoff: each delay is drawn uniformly from
+    ``[base, 3 * previous delay]`` and capped, so callers that failed together
+    spread out instead of retrying in lockstep.
+    """
+
+    def __init__(self, base, cap):
+        self.base = base
+        self.cap = cap
+        self._previous = base
+
+    def next_delay(self):
+        delay = min(self.cap, random.uniform(self.base, self._previous * 3))
+        self._previous = delay
+        return delay
+
+
+class RetryPolicy:
+    """
+    Retry behaviour for one orchestrator, built from the `retry` config section.
+
+    Retries throttled and transient errors with exponential backoff (or
+    decorrelated jitter when ``jitter='decorrelated'``), waiting at least as
+    long as any Retry-After the service asked for, and fails fast on errors
+    classified as fatal. All calls share one RetryBudget, and each service
+    gets its own CircuitBreaker. A retry that would sleep past the current
+    ``deadline`` is not attempted.
+    """
+
+    def __init__(self, max_attempts=3, initial_delay=1, max_delay=60, exponential_base=2,
+                 max_retry_after=300, budget=None, failure_threshold=5, reset_timeout=60, jitter='none'):
+        if jitter not in ('none', 'decorrelated'):
+            raise ValueError(f"Unknown retry jitter '{jitter}'")
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.exponential_base = exponential_base
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.jitter = jitter
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        retry_config = config['retry']
+        budget_config = retry_config.get('budget', {})
+        breaker_config = retry_config.get('circuit_breaker', {})
+        return cls(
+            max_attempts=retry_config['max_attempts'],
+            initial_delay=retry_config['initial_delay'],
+            max_delay=retry_config['max_delay'],
+            exponential_base=retry_config['exponential_base'],
+            max_retry_after=retry_config.get('max_retry_after', 300),
+            budget=RetryBudget(
+                ratio=budget_config.get('ratio', 0.2),
+                min_tokens=budget_config.get('min_retries', 10),
+                max_tokens=budget_config.get('max_retries', 100)
+            ),
+            failure_threshold=breaker_config.get('failure_threshold', 5),
+            reset_timeout=breaker_config.get('reset_timeout', 60),
+            jitter=retry_config.get('jitter', 'none')
+        )
+
+    def breaker(self, service):
+        with self._breakers_lock:
+            if service not in self._breakers:
+                self._breakers[service] = CircuitBreaker(service, self.failure_threshold, self.reset_timeout)
+            return self._breakers[service]
+
+    def _backoff(self):
+        """Return a function mapping (error, attempt number) to the delay before the next attempt."""
+        jitter = DecorrelatedJitter(self.initial_delay, self.max_delay) if self.jitter == 'decorrelated' else None
+
+        def next_delay(error, attempt):
+            if jitter is not None:
+                delay = jitter.next_delay()
+            else:
+                delay = min(self.max_delay, self.initial_delay * self.exponential_base ** (attempt - 1))
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_retry_after))
+            return delay
+        return next_delay
+
+    def _should_retry(self, error):
+        error_class = classify_error(error)
+        if error_class == FATAL:
+            return False
+        if self.budget is not None and not self.budget.try_spend():
+            logger.warning("retry_budget_exhausted", error=str(error))
+            return False
+        return True
+
+    @staticmethod
+    def _past_deadline(delay):
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            logger.warning("retry_deadline_exceeded", next_delay=delay, remaining=max(0.0, remaining))
+            return True
+        return False
+
+    def _on_failure(self, service, name, breaker, error, attempt):
+        error_class = classify_error(error)
+        if breaker:
+            # A fatal error is the service answering; only retryable ones count against it
+            if error_class == FATAL:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+        get_telemetry().increment('datamove_call_failures_total', service=service or '', error_class=error_class)
+        logger.error(
+            "operation_failed",
+            function=name,
+            service=service,
+            error=str(error),
+            error_class=error_class,
+            attempt=attempt
+        )
+
+    @contextmanager
+    def _instrumented(self, service, name):
+        """Span and latency/retry metrics covering one call, including all its attempts."""
+        telemetry = get_telemetry()
+        stats = {'attempts': 0}
+        outcome = 'error'
+        start = time.perf_counter()
+        with telemetry.span(f"{service}.{name}" if service else name, service=service or '', function=name) as span:
+            try:
+                yield stats
+                outcome = 'success'
+            finally:
+                span.set_attribute('attempts', stats['attempts'])
+                telemetry.observe('datamove_call_duration_seconds', time.perf_counter() - start,
+                                  service=service or '', function=name, outcome=outcome)
+                if stats['attempts'] > 1:
+                    telemetry.increment('datamove_retries_total', stats['attempts'] - 1,
+                                        service=service or '', function=name)
+                    for counter in _retry_counters.get():
+                        counter['retries'] += stats['attempts'] - 1
+
+    def call(self, service, func, *args, **kwargs):
+        """Call ``func`` under this policy, attributing failures to ``service``."""
+        name = getattr(func, '__name__', repr(func))
+        with self._instrumented(service, name) as stats:
+            return self._call(service, name, stats, func, *args, **kwargs)
+
+    def _call(self, service, name, stats, func, *args, **kwargs):
+        breaker = self.breaker(service) if service else None
+        next_delay = self._backoff()
+        if self.budget is not None:
+            self.budget.deposit()
+
+        def attempt():
+            stats['attempts'] += 1
+            trial = breaker.before_call() if breaker else False
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._on_failure(service, name, breaker, e, retrying.statistics.get('attempt_number'))
+                raise
+            finally:
+                if trial:
+                    breaker.release_trial()
+            if breaker:
+                breaker.record_success()
+            return result
+
+        planned = {}
+
+        def wait(retry_state):
+            # tenacity calls `stop` before `wait` up to 8.2 and after it since 8.3;
+            # whichever runs first draws the delay for this attempt
+            if planned.get('attempt') != retry_state.attempt_number:
+                planned['attempt'] = retry_state.attempt_number
+                planned['delay'] = next_delay(retry_state.outcome.exception(), retry_state.attempt_number)
+            return planned['delay']
+
+        def should_retry(retry_state):
+            # Check the attempt limit first so the final failure doesn't spend budget
+            return retry_state.outcome.failed and retry_state.attempt_number < self.max_attempts and \
+                self._should_retry(retry_state.outcome.exception())
+
+        def stop(retry_state):
+            return retry_state.attempt_number >= self.max_attempts or \
+                self._past_deadline(wait(retry_state))
+
+        retrying = Retrying(
+            stop=stop,
+            wait=wait,
+            retry=should_retry,
+            # Backoff sleeps go through the clock, so a VirtualClock skips them
+            sleep=lambda seconds: get_clock().sleep(seconds),
+            reraise=True
+        )
+        return retrying(attempt)
+
+    async def acall(self, service, func, *args, **kwargs):
+        """
+        Await ``func(*args, **kwargs)`` under this policy.
+
+        Each attempt is bounded by the remaining deadline. Cancellation is
+        never retried or logged as a failure; it propagates straight to the
+        caller.
+        """
+        name = getattr(func, '__name__', repr(func))
+        with self._instrumented(service, name) as stats:
+            return await self._acall(service, name, stats, func, *args, **kwargs)
+
+    async def _acall(self, service, name, stats, func, *args, **kwargs):
+        breaker = self.breaker(service) if service else None
+        next_delay = self._backoff()
+        if self.budget is not None:
+            self.budget.deposit()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            stats['attempts'] = attempt
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"Deadline passed before {name} could run")
+            trial = breaker.before_call() if breaker else False
+            try:
+                if remaining is None:
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await asyncio.wait_for(func(*args, **kwargs), remaining)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, TimeoutError) and remaining is not None and remaining_time() <= 0:
+                    raise DeadlineExceeded(f"{name} did not finish before the deadline") from e
+                self._on_failure(service, name, breaker, e, attempt)
+                error = e
+            else:
+                if breaker:
+                    breaker.record_success()
+                return result
+            finally:
+                if trial:
+                    breaker.release_trial()
+
+            if attempt >= self.max_attempts or not self._should_retry(error):
+                raise error
+            delay = next_delay(error, attempt)
+            if self._past_deadline(delay):
+                raise error
+            await get_clock().asleep(delay)
+
+    def wrap(self, func, service=None):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await self.acall(service, func, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(service, func, *args, **kwargs)
+        return wrapper
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+def retrying(service, idempotency_key=None):
+    """
+    Method decorator that retries under the instance's ``retry_policy``.
+
+    Unlike ``with_retry``, the policy is looked up on ``self`` at call time,
+    so it is built from each orchestrator's own config and shared between
+    its methods. Coroutine methods are retried with ``RetryPolicy.acall``.
+
+    ``idempotency_key`` names a keyword argument that must stay the same
+    across attempts; if the caller doesn't pass one, a key is generated
+    once, before the first attempt.
+    """
+    def with_key(kwargs):
+        if idempotency_key and not kwargs.get(idempotency_key):
+            kwargs = dict(kwargs, **{idempotency_key: new_idempotency_key()})
+        return kwargs
+
+    def decorator(method):
+        if asyncio.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                return await self.retry_policy.acall(service, method, self, *args, **with_key(kwargs))
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.retry_policy.call(service, method, self, *args, **with_key(kwargs))
+        return wrapper
+    return decorator
+
+
 def with_retry(config):
     """
     Decorator that implements retry logic with exponential backoff.
@@ -14,28 +578,12 @@ def with_retry(config):
             - initial_delay: Initial delay between retries in seconds
             - max_delay: Maximum delay between retries in seconds
             - exponential_base: Base for exponential backoff
+            - jitter: 'none' or 'decorrelated' (optional)
+
+    Coroutine functions are wrapped with the async retry loop.
     """
+    policy = RetryPolicy.from_config(config)
+
     def decorator(func):
-        @wraps(func)
-        @retry(
-            stop=stop_after_attempt(config['retry']['max_attempts']),
-            wait=wait_exponential(
-                multiplier=config['retry']['initial_delay'],
-                max=config['retry']['max_delay'],
-                exp_base=config['retry']['exponential_base']
-            ),
-            reraise=True
-        )
-        def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                logger.error(
-                    "operation_failed",
-                    function=func.__name__,
-                    error=str(e),
-                    attempt=wrapper.retry.statistics.attempt_number
-                )
-                raise
-        return wrapper
-    return decorator 
\ No newline at end of file
+        return policy.wrap(func)
+    return decorator
@@ -0,0 +1,318 @@
+from datetime import datetime, timezone
+import argparse
+import json
+import math
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from .clock import get_clock
+from .logger import get_logger
+
+logger = get_logger()
+
+# Stage name under which whole-pipeline runs are recorded
+PIPELINE_STAGE = '*'
+QUANTILES = (50, 95, 99)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    service TEXT,
+    execution_id TEXT,
+    run_id TEXT,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    retries INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT NOT NULL,
+    baseline REAL,
+    regressed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_history_stage ON history (pipeline, stage, started_at);
+CREATE INDEX IF NOT EXISTS idx_history_started ON history (started_at);
+"""
+
+WINDOW_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_window(text):
+    """Seconds in a window such as ``90s``, ``30m``, ``12h``, ``7d`` or ``2w``."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*', str(text))
+    if not match:
+        raise ValueError(f"Invalid time window '{text}'; use e.g. 30m, 12h or 7d")
+    return float(match.group(1)) * WINDOW_UNITS[match.group(2) or 's']
+
+
+def percentile(values, q):
+    """``q``-th percentile of sorted ``values``, interpolating between the closest ranks."""
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class RunHistory:
+    """
+    Append-only history of stage and pipeline durations, in a local SQLite file.
+
+    Every stage run adds one row with its duration, retry count and outcome;
+    whole pipeline runs are recorded under the stage name ``*``. Rows are
+    indexed by (pipeline, stage, start time), so latency percentiles over a
+    time window read only the matching rows.
+
+    Each new row is compared with the successful runs of the same stage in
+    the preceding ``baseline_window`` seconds: with at least
+    ``min_samples`` of them, a duration above both their p95 and
+    ``regression_factor`` times their median is flagged as a regression.
+    """
+
+    def __init__(self, path, baseline_window=14 * 86400, min_samples=5, regression_factor=2.0, clock=None):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.baseline_window = baseline_window
+        self.min_samples = min_samples
+        self.regression_factor = regression_factor
+        # Durations are measured on get_clock(), so start times must be too
+        self.clock = clock or (lambda: get_clock().time())
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _durations(self, pipeline, stage, since, until=None, outcome='success', limit=None):
+        sql = "SELECT duration FROM history WHERE pipeline = ? AND stage = ? AND started_at >= ?"
+        params = [pipeline, stage, since]
+        if until is not None:
+            sql += " AND started_at < ?"
+            params.append(until)
+        if outcome is not None:
+            sql += " AND outcome = ?"
+            params.append(outcome)
+        if limit:
+            sql += " ORDER BY started_at DESC LIMIT ?"
+            params.append(limit)
+        return sorted(row['duration'] for row in self._execute(sql, params))
+
+    def baseline(self, pipeline, stage, before=None):
+        """Median and p95 of recent successful runs before ``before``, or None with too few samples."""
+        before = self.clock() if before is None else before
+        durations = self._durations(pipeline, stage, before - self.baseline_window, before, limit=1000)
+        if len(durations) < self.min_samples:
+            return None
+        return {'p50': percentile(durations, 50), 'p95': percentile(durations, 95), 'count': len(durations)}
+
+    def record(self, pipeline, stage, duration, outcome, service=None, retries=0, execution_id=None, run_id=None,
+               started_at=None):
+        """
+        Append one run. Returns the row as a dict, with ``regressed`` set when
+        it was much slower than its baseline.
+        """
+        started_at = self.clock() - duration if started_at is None else started_at
+        baseline = self.baseline(pipeline, stage, before=started_at)
+        regressed = baseline is not None and \
+            duration > max(baseline['p95'], self.regression_factor * baseline['p50'])
+        row = {
+            'pipeline': pipeline, 'stage': stage, 'service': service, 'execution_id': execution_id,
+            'run_id': None if run_id is None else str(run_id), 'started_at': started_at,
+            'duration': duration, 'retries': retries, 'outcome': outcome,
+            'baseline': baseline['p50'] if baseline else None, 'regressed': int(regressed),
+        }
+        self._execute(
+            f"INSERT INTO history ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+            tuple(row.values())
+        )
+        if regressed:
+            logger.warning("duration_regression", pipeline=pipeline, stage=stage, duration=round(duration, 3),
+                           baseline_p50=round(baseline['p50'], 3), baseline_p95=round(baseline['p95'], 3))
+        return row
+
+    def percentiles(self, since, until=None, pipeline=None, stage=None, outcome='success', quantiles=QUANTILES):
+        """
+        Latency percentiles per (pipeline, stage) for runs started in ``[since, until)``.
+
+        Each entry has ``count``, ``p<q>`` for each quantile, ``mean``,
+        ``max``, the total ``retries`` and the ``failures`` in the window
+        (percentiles only cover runs with ``outcome``).
+        """
+        sql = "SELECT pipeline, stage, duration, retries, outcome FROM history WHERE started_at >= ?"
+        params = [since]
+        if until is not None:
+            sql += " AND started_at < ?"
+            params.append(until)
+        for column, value in (('pipeline', pipeline), ('stage', stage)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        groups = {}
+        for row in self._execute(sql, params):
+            group = groups.setdefault((row['pipeline'], row['stage']), {'durations': [], 'retries': 0, 'failures': 0})
+            group['retries'] += row['retries']
+            if outcome is None or row['outcome'] == outcome:
+                group['durations'].append(row['duration'])
+            else:
+                group['failures'] += 1
+        results = []
+        for (pipeline_name, stage_name), group in sorted(groups.items()):
+            durations = sorted(group['durations'])
+            entry = {'pipeline': pipeline_name, 'stage': stage_name, 'count': len(durations)}
+            for q in quantiles:
+                entry[f'p{q}'] = percentile(durations, q)
+            entry['mean'] = sum(durations) / len(durations) if durations else None
+            entry['max'] = durations[-1] if durations else None
+            entry['retries'] = group['retries']
+            entry['failures'] = group['failures']
+            results.append(entry)
+        return results
+
+    def regressions(self, since, until=None, pipeline=None):
+        """Runs flagged as much slower than their baseline, newest first."""
+        sql = "SELECT * FROM history WHERE regressed = 1 AND started_at >= ?"
+        params = [since]
+        if until is not None:
+            sql += " AND started_at < ?"
+            params.append(until)
+        if pipeline is not None:
+            sql += " AND pipeline = ?"
+            params.append(pipeline)
+        return [dict(row) for row in self._execute(sql + " ORDER BY started_at DESC", params)]
+
+    def expected_durations(self, pipeline, window=None, quantile=50):
+        """Typical successful duration of each stage, to seed ``RunTracker.expected_durations``."""
+        since = self.clock() - (window or self.baseline_window)
+        return {
+            entry['stage']: entry[f'p{quantile}']
+            for entry in self.percentiles(since, pipeline=pipeline, quantiles=(quantile,))
+            if entry['stage'] != PIPELINE_STAGE and entry['count']
+        }
+
+    def hourly_peaks(self, since, until=None, service=None, pipeline=None):
+        """
+        Peak number of stage runs in flight in each UTC hour of the day.
+
+        Same shape as ``ClusterPool.hourly_peaks``, for sizing clusters
+        ahead of the hours that are usually busy.
+        """
+        sql = "SELECT started_at, duration FROM history WHERE stage != ? AND started_at >= ?"
+        params = [PIPELINE_STAGE, since]
+        if until is not None:
+            sql += " AND started_at < ?"
+            params.append(until)
+        for column, value in (('service', service), ('pipeline', pipeline)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        events = []
+        for row in self._execute(sql, params):
+            events.append((row['started_at'], 1))
+            events.append((row['started_at'] + row['duration'], -1))
+        # Ends sort before starts at the same instant, so back-to-back runs don't overlap
+        events.sort()
+
+        def hour_of(moment):
+            return datetime.fromtimestamp(moment, timezone.utc).hour
+
+        peaks = {}
+        level = 0
+        previous = None
+        for moment, delta in events:
+            if level > 0 and previous is not None:
+                # The level held through every hour boundary crossed since the last event
+                boundary = (math.floor(previous / 3600) + 1) * 3600
+                for _ in range(24):
+                    if boundary >= moment:
+                        break
+                    peaks[hour_of(boundary)] = max(peaks.get(hour_of(boundary), 0), level)
+                    boundary += 3600
+            level += delta
+            if delta > 0:
+                peaks[hour_of(moment)] = max(peaks.get(hour_of(moment), 0), level)
+            previous = moment
+        return peaks
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _format_seconds(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+def _print_table(rows, columns):
+    widths = {c: max(len(c), *(len(str(row[c])) for row in rows)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns).rstrip())
+    for row in rows:
+        print('  '.join(str(row[c]).ljust(widths[c]) for c in columns).rstrip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the run history: latency percentiles, regressions, load.")
+    parser.add_argument('--config', default='pipelines/pipeline_config.yaml',
+                        help="pipeline config to read `run_history.path` from")
+    parser.add_argument('--db', help="history database (overrides --config)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('percentiles', "p50/p95/p99 per pipeline and stage"),
+                            ('regressions', "runs much slower than their baseline"),
+                            ('capacity', "peak stage runs in flight per UTC hour")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--since', default='7d', help="window start, as a duration ago (default 7d)")
+        command.add_argument('--until', help="window end, as a duration ago (default now)")
+        command.add_argument('--pipeline')
+        command.add_argument('--json', action='store_true', help="print JSON instead of a table")
+        if name == 'percentiles':
+            command.add_argument('--stage')
+        if name == 'capacity':
+            command.add_argument('--service', help="adf or databricks (default both)")
+    args = parser.parse_args(argv)
+
+    path = args.db
+    if path is None:
+        import yaml
+        with open(args.config, 'r') as f:
+            config = yaml.safe_load(f)
+        path = config.get('run_history', {}).get('path', '.datamove/history.db')
+    history = RunHistory(path)
+    now = history.clock()
+    since = now - parse_window(args.since)
+    until = now - parse_window(args.until) if args.until else None
+
+    try:
+        if args.command == 'percentiles':
+            rows = history.percentiles(since, until, pipeline=args.pipeline, stage=args.stage)
+            columns = ['pipeline', 'stage', 'count', 'p50', 'p95', 'p99', 'max', 'retries', 'failures']
+        elif args.command == 'regressions':
+            rows = history.regressions(since, until, pipeline=args.pipeline)
+            for row in rows:
+                row['started'] = datetime.fromtimestamp(row['started_at'], timezone.utc).isoformat(timespec='seconds')
+            columns = ['started', 'pipeline', 'stage', 'duration', 'baseline', 'retries', 'outcome']
+        else:
+            peaks = history.hourly_peaks(since, until, service=args.service, pipeline=args.pipeline)
+            rows = [{'hour_utc': hour, 'peak_runs': peak} for hour, peak in sorted(peaks.items())]
+            columns = ['hour_utc', 'peak_runs']
+    finally:
+        history.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2, default=str))
+    elif not rows:
+        print("No runs in this window")
+    else:
+        for row in rows:
+            for column in ('p50', 'p95', 'p99', 'max', 'duration', 'baseline'):
+                if column in row:
+                    row[column] = _format_seconds(row[column])
+        _print_table(rows, columns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+from datetime import datetime, timedelta, timezone
+import threading
+from .clock import get_clock
+from .logger import get_logger
+from .retry_logic import FATAL, classify_error
+
+logger = get_logger()
+
+ADF_TERMINAL_STATES = {'Succeeded', 'Failed', 'Cancelled'}
+DATABRICKS_TERMINAL_STATES = {'TERMINATED', 'SKIPPED', 'INTERNAL_ERROR'}
+
+
+def _query_filter(model, operand, operator, values):
+    # azure-mgmt-datafactory renamed `values` to `values_property` in later releases
+    try:
+        return model(operand=operand, operator=operator, values_property=values)
+    except TypeError:
+        return model(operand=operand, operator=operator, values=values)
+
+
+class RunFailedError(Exception):
+    """Raised when a tracked run finishes in a non-successful state."""
+
+    def __init__(self, run):
+        self.run = run
+        super().__init__(f"{run.service} run {run.run_id} finished with status {run.status}: {run.message or ''}".rstrip(': '))
+
+
+class RunTimeoutError(TimeoutError):
+    """Raised when a tracked run does not finish before the wait timeout."""
+
+
+class RunPollError(Exception):
+    """Raised when a tracked run's status cannot be read: a fatal error, or too many failures in a row."""
+
+    def __init__(self, run, error):
+        self.run = run
+        super().__init__(f"Could not poll {run.service} run {run.run_id}: {error}")
+
+
+class TrackedRun:
+    def __init__(self, service, run_id, stage=None, pipeline_name=None):
+        self.service = service
+        self.run_id = run_id
+        self.stage = stage or service
+        self.pipeline_name = pipeline_name
+        self.started_at = get_clock().monotonic()
+        self.next_poll_at = self.started_at
+        self.status = None
+        self.succeeded = None
+        self.message = None
+        self.error = None
+        self.finished = threading.Event()
+
+    @property
+    def elapsed(self):
+        return get_clock().monotonic() - self.started_at
+
+
+class RunTracker:
+    """
+    Watch many in-flight ADF and Databricks runs together.
+
+    A single background poller serves every tracked run. Each cycle issues at
+    most one ``pipeline_runs.query_by_factory`` call covering all ADF runs
+    that are due, and one ``jobs.list_runs(active_only=True)`` call for all
+    due Databricks runs; ``jobs.get_run`` is only called for runs that have
+    dropped out of the active list, to read their final result.
+
+    Poll intervals adapt per stage: with no history the interval grows with
+    the run's age, and once a stage has completed before the tracker polls
+    sparsely until the expected finish time and then tightens up.
+
+    A poll that fails with a transient error is retried with exponential
+    back-off. A fatal error (auth, a deleted factory, an unknown run), or
+    ``max_poll_failures`` failures in a row, fails the affected runs' waiters
+    with RunPollError instead of leaving them blocked until their timeout.
+    """
+
+    def __init__(self, adf_client=None, resource_group=None, factory_name=None,
+                 databricks_client=None, min_interval=5.0, max_interval=300.0,
+                 poll_fraction=0.1, smoothing=0.3, max_poll_failures=5,
+                 adf_client_factory=None, databricks_client_factory=None):
+        # Clients may be given directly or as factories, so that a tracker
+        # watching only one service never builds the other service's client
+        self._adf_client = adf_client
+        self._adf_client_factory = adf_client_factory
+        self._databricks_client = databricks_client
+        self._databricks_client_factory = databricks_client_factory
+        self.resource_group = resource_group
+        self.factory_name = factory_name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.poll_fraction = poll_fraction
+        self.smoothing = smoothing
+        self.max_poll_failures = max_poll_failures
+        self.expected_durations = {}
+        self.api_calls = 0
+        self._poll_failures = {}
+        self._runs = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._poller = None
+
+    @property
+    def adf_client(self):
+        if self._adf_client is None and self._adf_client_factory:
+            self._adf_client = self._adf_client_factory()
+        return self._adf_client
+
+    @property
+    def databricks_client(self):
+        if self._databricks_client is None and self._databricks_client_factory:
+            self._databricks_client = self._databricks_client_factory()
+        return self._databricks_client
+
+    def next_interval(self, run):
+        """Seconds to wait before polling ``run`` again."""
+        expected = self.expected_durations.get(run.stage)
+        elapsed = run.elapsed
+        if expected is not None and elapsed < expected:
+            # Sleep through most of the expected remaining time in one go
+            interval = (expected - elapsed) * 0.5
+        else:
+            interval = elapsed * self.poll_fraction
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def record_duration(self, stage, duration):
+        """Fold a completed run's duration into the stage's expected duration."""
+        previous = self.expected_durations.get(stage)
+        if previous is None:
+            self.expected_durations[stage] = duration
+        else:
+            self.expected_durations[stage] = previous + self.smoothing * (duration - previous)
+
+    def track_adf(self, run_id, stage=None, pipeline_name=None):
+        return self._track(TrackedRun('adf', run_id, stage, pipeline_name))
+
+    def track_databricks(self, run_id, stage=None):
+        return self._track(TrackedRun('databricks', run_id, stage))
+
+    def _track(self, run):
+        run.next_poll_at = run.started_at + self.next_interval(run)
+        with self._lock:
+            self._runs[(run.service, run.run_id)] = run
+            # On a virtual clock `wait` polls inline instead
+            if not get_clock().virtual and (self._poller is None or not self._poller.is_alive()):
+                self._poller = threading.Thread(target=self._poll_loop, name='run-tracker', daemon=True)
+                self._poller.start()
+        self._wakeup.set()
+        logger.info("run_tracking_started", service=run.service, run_id=run.run_id, stage=run.stage)
+        return run
+
+    def _finish(self, run, status, succeeded, message=None):
+        run.status = status
+        run.succeeded = succeeded
+        run.message = message
+        self.record_duration(run.stage, run.elapsed)
+        with self._lock:
+            self._runs.pop((run.service, run.run_id), None)
+        logger.info("run_finished", service=run.service, run_id=run.run_id, stage=run.stage,
+                    status=status, duration=round(run.elapsed, 3))
+        run.finished.set()
+
+    def _fail(self, run, error):
+        run.error = error
+        with self._lock:
+            self._runs.pop((run.service, run.run_id), None)
+        logger.error("run_tracking_failed", service=run.service, run_id=run.run_id, stage=run.stage, error=str(error))
+        run.finished.set()
+
+    def _forget(self, run):
+        with self._lock:
+            self._runs.pop((run.service, run.run_id), None)
+
+    def _poll_adf(self, runs):
+        from azure.mgmt.datafactory.models import RunFilterParameters, RunQueryFilter
+
+        by_id = {run.run_id: run for run in runs}
+        now = datetime.now(timezone.utc)
+        oldest = max(run.elapsed for run in runs)
+        filters = []
+        pipeline_names = {run.pipeline_name for run in runs}
+        if None not in pipeline_names:
+            # Run IDs are not a supported operand, so narrow by pipeline and match IDs locally
+            filters.append(_query_filter(RunQueryFilter, 'PipelineName', 'In', sorted(pipeline_names)))
+        filter_parameters = RunFilterParameters(
+            last_updated_after=now - timedelta(seconds=oldest + 3600),
+            last_updated_before=now + timedelta(minutes=5),
+            filters=filters
+        )
+        while True:
+            self.api_calls += 1
+            response = self.adf_client.pipeline_runs.query_by_factory(
+                self.resource_group, self.factory_name, filter_parameters
+            )
+            for pipeline_run in response.value or []:
+                run = by_id.get(pipeline_run.run_id)
+                if run is not None and pipeline_run.status in ADF_TERMINAL_STATES:
+                    self._finish(run, pipeline_run.status, pipeline_run.status == 'Succeeded', pipeline_run.message)
+            if not response.continuation_token:
+                break
+            filter_parameters.continuation_token = response.continuation_token
+
+    def _poll_databricks(self, runs):
+        self.api_calls += 1
+        active = {run.run_id for run in self.databricks_client.jobs.list_runs(active_only=True)}
+        for run in runs:
+            if run.run_id in active:
+                continue
+            self.api_calls += 1
+            try:
+                details = self.databricks_client.jobs.get_run(run.run_id)
+            except Exception as e:
+                # A run that was deleted only fails its own waiter
+                if classify_error(e) != FATAL:
+                    raise
+                self._fail(run, e)
+                continue
+            life_cycle = getattr(details.state.life_cycle_state, 'value', details.state.life_cycle_state)
+            if life_cycle not in DATABRICKS_TERMINAL_STATES:
+                continue
+            result = getattr(details.state.result_state, 'value', details.state.result_state)
+            self._finish(run, result or life_cycle, result == 'SUCCESS', details.state.state_message)
+
+    def poll_once(self):
+        """Poll every run that is due and return the seconds until the next one is."""
+        now = get_clock().monotonic()
+        # Runs that fall due shortly are folded into this cycle's batch
+        horizon = now + self.min_interval * 0.5
+        with self._lock:
+            due = [run for run in self._runs.values() if run.next_poll_at <= horizon]
+        for service, poll in (('adf', self._poll_adf), ('databricks', self._poll_databricks)):
+            batch = [run for run in due if run.service == service]
+            if not batch:
+                continue
+            try:
+                poll(batch)
+                self._poll_failures[service] = 0
+            except Exception as e:
+                self._poll_failed(service, batch, e)
+
+        now = get_clock().monotonic()
+        for run in due:
+            if not run.finished.is_set():
+                # Back off exponentially while the service's polls keep failing
+                failures = self._poll_failures.get(run.service, 0)
+                backoff = min(self.max_interval, self.min_interval * 2 ** failures) if failures else 0.0
+                run.next_poll_at = now + max(self.next_interval(run), backoff)
+        with self._lock:
+            if not self._runs:
+                return None
+            return max(0.0, min(run.next_poll_at for run in self._runs.values()) - now)
+
+    def _poll_failed(self, service, batch, error):
+        failures = self._poll_failures[service] = self._poll_failures.get(service, 0) + 1
+        error_class = classify_error(error)
+        logger.error("run_status_poll_failed", service=service, error=str(error), error_class=error_class,
+                     consecutive_failures=failures, runs=len(batch))
+        if error_class == FATAL or failures >= self.max_poll_failures:
+            self._poll_failures[service] = 0
+            for run in batch:
+                if not run.finished.is_set():
+                    self._fail(run, error)
+
+    def _poll_loop(self):
+        while True:
+            delay = self.poll_once()
+            if delay is None:
+                with self._lock:
+                    if not self._runs:
+                        self._poller = None
+                        return
+                continue
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def _wait_virtual(self, run, timeout, clock):
+        """Poll on the caller's thread, sleeping virtual time between polls."""
+        give_up_at = None if timeout is None else clock.monotonic() + timeout
+        while not run.finished.is_set():
+            delay = self.poll_once()
+            if run.finished.is_set():
+                break
+            if give_up_at is not None and clock.monotonic() + (delay or 0.0) > give_up_at:
+                clock.advance_to(give_up_at)
+                return False
+            clock.sleep(delay or self.min_interval)
+        return True
+
+    def wait(self, run, timeout=None):
+        """
+        Block until ``run`` finishes. Raises RunFailedError if it did not succeed,
+        and RunPollError if its status could not be read.
+        """
+        clock = get_clock()
+        finished = self._wait_virtual(run, timeout, clock) if clock.virtual else run.finished.wait(timeout)
+        if not finished:
+            # Nobody is waiting for it any more, so stop polling it
+            self._forget(run)
+            raise RunTimeoutError(f"{run.service} run {run.run_id} did not finish within {timeout}s")
+        if run.error is not None:
+            raise RunPollError(run, run.error) from run.error
+        if not run.succeeded:
+            raise RunFailedError(run)
+        return run
@@ -0,0 +1,311 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import argparse
+import os
+import signal
+import threading
+import time
+from zoneinfo import ZoneInfo
+from .logger import get_logger
+
+logger = get_logger()
+
+# (first, last) value of each cron field: minute, hour, day of month, month, day of week
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# Scheduler actions and the orchestrator call each one makes
+ACTIONS = ('pipeline', 'batch')
+
+
+class ScheduleError(ValueError):
+    """Raised for an invalid cron expression or scheduler job definition."""
+
+
+def _parse_cron_field(field, first, last):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ScheduleError(f"Invalid cron step '{step_text}'")
+        if part == '*':
+            start, end = first, last
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = last
+        if start < first or end > last or start > end:
+            raise ScheduleError(f"Cron field '{field}' is outside {first}-{last}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Standard five-field cron expression (minute hour day-of-month month day-of-week)."""
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ScheduleError(f"Cron expression '{expression}' must have 5 fields")
+        try:
+            parsed = [_parse_cron_field(f, lo, hi + (1 if i == 4 else 0))
+                      for i, (f, (lo, hi)) in enumerate(zip(fields, CRON_FIELDS))]
+        except ValueError as e:
+            raise ScheduleError(f"Invalid cron expression '{expression}': {e}") from e
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Both 0 and 7 mean Sunday
+        self.weekdays = {d % 7 for d in weekdays}
+        # As in cron, a restricted day-of-month OR day-of-week matches when both are given
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment):
+        """First matching minute strictly after ``moment``."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Bounded search: any valid expression matches within a few years
+        for _ in range(100000):
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ScheduleError(f"Cron expression '{self.expression}' never matches")
+
+
+class IntervalSchedule:
+    """Fire every ``seconds`` seconds."""
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ScheduleError("Schedule interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+
+class ScheduledJob:
+    """One entry under `scheduler.jobs`: what to run and when."""
+
+    def __init__(self, name, schedule, action='pipeline', options=None):
+        if action not in ACTIONS:
+            raise ScheduleError(f"Unknown scheduler action '{action}' for job '{name}'")
+        self.name = name
+        self.schedule = schedule
+        self.action = action
+        self.options = dict(options or {})
+        self.next_run = None
+        self.running = threading.Lock()
+        self.runs = 0
+        self.skipped = 0
+        self.last_error = None
+        self.prewarmed_for = None
+
+    @classmethod
+    def from_config(cls, spec):
+        if 'cron' in spec:
+            schedule = CronSchedule(spec['cron'])
+        elif 'interval' in spec:
+            schedule = IntervalSchedule(spec['interval'])
+        else:
+            raise ScheduleError(f"Scheduler job '{spec.get('name')}' needs a `cron` or `interval`")
+        options = {key: value for key, value in spec.items() if key not in ('name', 'cron', 'interval', 'action')}
+        return cls(spec['name'], schedule, spec.get('action', 'pipeline'), options)
+
+
+class PipelineScheduler:
+    """
+    Long-running scheduler that reuses one warm PipelineOrchestrator.
+
+    Jobs from `scheduler.jobs` fire on cron or interval triggers and run on a
+    small thread pool, so SDK clients, cached tokens, pooled SMTP sessions
+    and job definitions are shared by every run. A job that is still running
+    when it next falls due is skipped rather than started twice. The config
+    file is re-read when it changes, between runs, keeping clients whose
+    connection settings are unchanged. With a Databricks cluster pool,
+    clusters are started ahead of pipeline jobs and idle ones are stopped.
+    """
+
+    def __init__(self, config_path, orchestrator_factory=None, clock=None):
+        if orchestrator_factory is None:
+            from .trigger_pipeline import PipelineOrchestrator
+            orchestrator_factory = PipelineOrchestrator
+        self.config_path = config_path
+        self.clock = clock or time.time
+        self.orchestrator = orchestrator_factory(config_path)
+        self._config_mtime = self._read_mtime()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._load_jobs()
+        scheduler_config = self.orchestrator.config.get('scheduler', {})
+        self.pool = ThreadPoolExecutor(
+            max_workers=scheduler_config.get('max_concurrent_jobs', 4),
+            thread_name_prefix='scheduled'
+        )
+
+    def _read_mtime(self):
+        try:
+            return os.stat(self.config_path).st_mtime
+        except OSError:
+            return None
+
+    def _now(self):
+        return datetime.fromtimestamp(self.clock(), self.timezone)
+
+    def _load_jobs(self):
+        scheduler_config = self.orchestrator.config.get('scheduler', {})
+        self.timezone = ZoneInfo(scheduler_config.get('timezone', 'UTC'))
+        self.poll_interval = scheduler_config.get('poll_interval', 1.0)
+        self.reload_interval = scheduler_config.get('reload_interval', 30.0)
+        previous = getattr(self, 'jobs', {})
+        jobs = {}
+        now = self._now()
+        for spec in scheduler_config.get('jobs', []):
+            job = ScheduledJob.from_config(spec)
+            old = previous.get(job.name)
+            if old is not None:
+                # Keep the lock and counters so a reload can't start an overlapping run
+                job.running, job.runs, job.skipped, job.last_error = old.running, old.runs, old.skipped, old.last_error
+            job.next_run = job.schedule.next_after(now)
+            jobs[job.name] = job
+        self.jobs = jobs
+        self._last_reload_check = self.clock()
+        logger.info("scheduler_jobs_loaded", jobs={name: job.next_run.isoformat() for name, job in jobs.items()})
+
+    def _execute(self, job):
+        try:
+            start = time.perf_counter()
+            logger.info("scheduled_run_started", job=job.name, action=job.action)
+            if job.action == 'batch':
+                pipelines = job.options.get('pipelines') or self.orchestrator.config['adf']['batch']['pipelines']
+                self.orchestrator.trigger_adf_pipelines(pipelines)
+            else:
+                self.orchestrator.execute_pipeline()
+            job.last_error = None
+            logger.info("scheduled_run_complete", job=job.name, duration=round(time.perf_counter() - start, 3))
+        except Exception as e:
+            job.last_error = str(e)
+            logger.error("scheduled_run_failed", job=job.name, error=str(e))
+        finally:
+            job.running.release()
+
+    def _any_running(self):
+        return any(job.running.locked() for job in self.jobs.values())
+
+    def maybe_reload(self):
+        """Reload the config if the file changed and no job is running. Returns True if reloaded."""
+        if self.clock() - self._last_reload_check < self.reload_interval:
+            return False
+        self._last_reload_check = self.clock()
+        mtime = self._read_mtime()
+        if mtime is None or mtime == self._config_mtime or self._any_running():
+            return False
+        self._config_mtime = mtime
+        try:
+            changed = self.orchestrator.reload_config()
+            self._load_jobs()
+        except Exception as e:
+            # Keep running on the last good config
+            logger.error("config_reload_failed", path=str(self.config_path), error=str(e))
+            return False
+        logger.info("config_reloaded", path=str(self.config_path), changed_sections=sorted(changed))
+        return True
+
+    def tick(self):
+        """Start every job that is due. Returns the names of the jobs started."""
+        now = self._now()
+        started = []
+        with self._lock:
+            for job in self.jobs.values():
+                if job.next_run > now:
+                    continue
+                job.next_run = job.schedule.next_after(now)
+                if not job.running.acquire(blocking=False):
+                    job.skipped += 1
+                    logger.warning("scheduled_run_skipped", job=job.name, reason="previous_run_in_progress")
+                    continue
+                job.runs += 1
+                started.append(job.name)
+                self.pool.submit(self._execute, job)
+        return started
+
+    def maintain_clusters(self):
+        """Pre-warm Databricks clusters ahead of due pipeline jobs and stop idle ones (with a cluster pool)."""
+        pool = self.orchestrator.cluster_pool
+        if pool is None:
+            return
+        now = self._now()
+        try:
+            for job in self.jobs.values():
+                due_soon = (job.next_run - now).total_seconds() <= pool.prewarm_lead
+                if job.action == 'pipeline' and due_soon and job.prewarmed_for != job.next_run:
+                    job.prewarmed_for = job.next_run
+                    pool.prewarm_for(job.next_run)
+            pool.terminate_idle()
+        except Exception as e:
+            logger.error("cluster_maintenance_failed", error=str(e))
+
+    def seconds_until_next(self):
+        now = self._now()
+        if not self.jobs:
+            return self.poll_interval
+        next_run = min(job.next_run for job in self.jobs.values())
+        return max(0.0, min(self.poll_interval, (next_run - now).total_seconds()))
+
+    def run_forever(self):
+        logger.info("scheduler_started", config=str(self.config_path), jobs=sorted(self.jobs))
+        while not self._stop.is_set():
+            self.maybe_reload()
+            self.maintain_clusters()
+            self.tick()
+            self._stop.wait(self.seconds_until_next())
+        self.close()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def close(self):
+        """Wait for running jobs, then release the orchestrator's resources."""
+        self.pool.shutdown(wait=True)
+        self.orchestrator.close()
+        logger.info("scheduler_stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run scheduled pipelines from one long-lived process.")
+    parser.add_argument('config', nargs='?', default='pipelines/pipeline_config.yaml')
+    args = parser.parse_args(argv)
+
+    scheduler = PipelineScheduler(args.config)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    scheduler.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import copy
+import json
+import random
+import smtplib
+import statistics
+import tempfile
+import time
+import yaml
+from .clock import VirtualClock, use_clock
+from .fakes import FakeDataFactoryClient, FakeSlackClient, FakeSMTP, FakeWorkspaceClient, FaultProfile
+from .logger import shutdown_logging
+from .retry_logic import counting_retries
+from .run_history import percentile
+
+# Synthetic behaviour of each service: API call latency (plus up to `jitter`),
+# the share of calls failing with 503 or throttled with 429, and how long
+# triggered runs take (plus up to `run_jitter`) and how often they fail
+DEFAULT_SERVICES = {
+    'adf': {'latency': 0.3, 'jitter': 0.2, 'error_rate': 0.0, 'throttle_rate': 0.0, 'retry_after': 1,
+            'run_duration': 300.0, 'run_jitter': 0.0, 'failure_rate': 0.0},
+    'databricks': {'latency': 0.3, 'jitter': 0.2, 'error_rate': 0.0, 'throttle_rate': 0.0, 'retry_after': 1,
+                   'run_duration': 600.0, 'run_jitter': 0.0, 'failure_rate': 0.0},
+}
+
+# Settings replaced for a dry run: nothing is persisted and alerts are sent
+# inline to in-process fakes, so the run is deterministic for a given seed
+SIMULATION_OVERRIDES = {
+    'state_store': {'enabled': False},
+    'run_history': {'enabled': False},
+    'telemetry': {'enabled': False},
+    'alerts': {'dispatch': {'enabled': False}},
+    'databricks': {'local_engine': {'enabled': False}, 'cluster_pool': {'enabled': False}},
+}
+
+
+def _merge(base, overrides):
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+@contextmanager
+def _smtp_replaced(smtp):
+    """Point ``smtplib.SMTP`` at ``smtp`` for the duration of a trial."""
+    original = smtplib.SMTP
+    smtplib.SMTP = smtp
+    try:
+        yield smtp
+    finally:
+        smtplib.SMTP = original
+
+
+def _setting_override(assignment):
+    """Turn ``retry.max_attempts=5`` into ``{'retry': {'max_attempts': 5}}``."""
+    path, _, value = assignment.partition('=')
+    if not path or not _:
+        raise ValueError(f"Expected key=value, got '{assignment}'")
+    override = yaml.safe_load(value)
+    for key in reversed(path.split('.')):
+        override = {key: override}
+    return override
+
+
+class PipelineSimulator:
+    """
+    Dry-run ``execute_pipeline`` on a virtual clock against synthetic services.
+
+    The real orchestrator runs with the in-process fakes standing in for
+    ADF, Databricks, SMTP and Slack. Call latencies, retry backoff, circuit
+    breaker timeouts, run durations, status polling and alert deduplication
+    all use a VirtualClock, so a pipeline that would take hours finishes in
+    milliseconds. Stages are scheduled as they would be with
+    ``execution.max_concurrency`` workers.
+
+    The makespan is approximate. Stages run one at a time, so state shared
+    between overlapping stages sees their calls in start order rather than
+    interleaved: the retry budget, the circuit breakers, and the batched
+    status polls. It also leaves out:
+
+    - alert delivery time: the background dispatcher is off and alerts are
+      sent inline, taking no simulated time; the alert digest goes out with
+      the next alert once due, instead of on a timer;
+    - cluster start-up and the local engine: the cluster pool and
+      ``databricks.local_engine`` are off, and every notebook run takes the
+      modelled ``run_duration``;
+    - batch and backfill modes and the scheduler daemon, which are not
+      simulated. Their sleeps follow the clock, but their worker threads
+      share one timeline.
+    """
+
+    def __init__(self, config, services=None, overrides=None):
+        self.config = _merge(copy.deepcopy(config), SIMULATION_OVERRIDES)
+        if overrides:
+            _merge(self.config, overrides)
+        self.services = copy.deepcopy(DEFAULT_SERVICES)
+        for service, model in (services or {}).items():
+            if service not in self.services:
+                raise ValueError(f"Unknown service '{service}'; expected adf or databricks")
+            self.services[service].update(model)
+
+    @classmethod
+    def from_file(cls, config_path, **kwargs):
+        with open(config_path, 'r') as f:
+            return cls(yaml.safe_load(f), **kwargs)
+
+    def _trial_config(self, workdir):
+        config = copy.deepcopy(self.config)
+        # Failures are reported in the summary; the queue logger drops everything below its level
+        config['logging'] = {'level': 'CRITICAL', 'mode': 'queue', 'output_file': str(Path(workdir) / 'simulation.log')}
+        config['databricks'].setdefault('job_cache', {})['index_file'] = str(Path(workdir) / 'jobs.json')
+        email = config['alerts'].setdefault('email', {'enabled': False})
+        for key, value in (('smtp_server', 'smtp.invalid'), ('smtp_port', 587), ('sender', 'datamove@example.com'),
+                           ('username', 'simulation'), ('password', 'simulation')):
+            email.setdefault(key, value)
+        return config
+
+    def _client(self, factory, service, seed):
+        model = self.services[service]
+        profile = FaultProfile(latency=model['latency'], jitter=model['jitter'], error_rate=model['error_rate'],
+                               throttle_rate=model['throttle_rate'], retry_after=model['retry_after'], seed=seed)
+        return factory(profile, run_duration=model['run_duration'], run_jitter=model['run_jitter'],
+                       failure_rate=model['failure_rate'], seed=seed)
+
+    def run(self, seed=0, workdir=None):
+        """Simulate one execution. Returns its makespan, API calls, retries and alert counts."""
+        if workdir is None:
+            with tempfile.TemporaryDirectory() as workdir:
+                try:
+                    return self.run(seed, workdir)
+                finally:
+                    shutdown_logging()
+
+        from .trigger_pipeline import PipelineOrchestrator
+
+        config_path = Path(workdir) / 'pipeline_config.yaml'
+        config_path.write_text(yaml.safe_dump(self._trial_config(workdir)))
+        # Decorrelated jitter draws from the module-level generator
+        random.seed(seed)
+        clock = VirtualClock()
+        smtp = FakeSMTP.install()
+        started = time.perf_counter()
+        with use_clock(clock), _smtp_replaced(smtp):
+            orchestrator = PipelineOrchestrator(str(config_path))
+            adf = orchestrator.adf_client = self._client(FakeDataFactoryClient, 'adf', seed)
+            databricks = orchestrator.databricks_client = self._client(FakeWorkspaceClient, 'databricks', seed + 1)
+            slack = None
+            if orchestrator.config['alerts'].get('slack', {}).get('enabled'):
+                slack = orchestrator.alert_manager.slack_client = FakeSlackClient()
+
+            raised = Counter()
+            send_alert = orchestrator.alert_manager.send_alert
+
+            def counting_send_alert(subject, message, is_error=False):
+                raised['error' if is_error else 'success'] += 1
+                return send_alert(subject, message, is_error)
+
+            orchestrator.alert_manager.send_alert = counting_send_alert
+            error = None
+            with counting_retries() as retries:
+                try:
+                    orchestrator.execute_pipeline(resume=False)
+                except Exception as e:
+                    error = str(e)
+            makespan = clock.monotonic()
+            orchestrator.close()
+
+        return {
+            'succeeded': error is None,
+            'error': error,
+            'makespan': makespan,
+            'api_calls': dict(adf.profile.operations + databricks.profile.operations),
+            'retries': retries['retries'],
+            'alerts_raised': sum(raised.values()),
+            'alerts_delivered': len(smtp.sent) + (len(slack.messages) if slack else 0),
+            'real_seconds': time.perf_counter() - started,
+        }
+
+    def run_many(self, trials=100, seed=0):
+        """
+        Simulate ``trials`` executions with different random draws and summarise them.
+
+        Reports makespan percentiles, the success rate, and the mean API calls
+        (per operation), retries and alerts per execution.
+        """
+        started = time.perf_counter()
+        results = []
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                for trial in range(trials):
+                    results.append(self.run(seed=seed + trial * 2, workdir=workdir))
+            finally:
+                shutdown_logging()
+
+        makespans = sorted(result['makespan'] for result in results)
+        calls = Counter()
+        for result in results:
+            calls.update(result['api_calls'])
+        return {
+            'trials': trials,
+            'success_rate': sum(result['succeeded'] for result in results) / trials,
+            'makespan': {
+                'p50': percentile(makespans, 50), 'p95': percentile(makespans, 95), 'p99': percentile(makespans, 99),
+                'mean': statistics.fmean(makespans), 'max': makespans[-1],
+            },
+            'api_calls': sum(calls.values()) / trials,
+            'api_calls_by_operation': {operation: count / trials for operation, count in sorted(calls.items())},
+            'retries': statistics.fmean(result['retries'] for result in results),
+            'alerts_raised': statistics.fmean(result['alerts_raised'] for result in results),
+            'alerts_delivered': statistics.fmean(result['alerts_delivered'] for result in results),
+            'errors': dict(Counter(result['error'] for result in results if result['error'])),
+            'real_seconds': round(time.perf_counter() - started, 3),
+        }
+
+
+def _service_overrides(assignments):
+    model = {}
+    for assignment in assignments or []:
+        key, _, value = assignment.partition('=')
+        if key not in DEFAULT_SERVICES['adf']:
+            raise ValueError(f"Unknown service setting '{key}'; expected one of {', '.join(DEFAULT_SERVICES['adf'])}")
+        model[key] = float(value)
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Estimate pipeline makespan, API calls and alert volume on a virtual clock."
+    )
+    parser.add_argument('config', nargs='?', default='pipelines/pipeline_config.yaml')
+    parser.add_argument('--trials', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--adf', action='append', metavar='KEY=VALUE',
+                        help="ADF model, e.g. run_duration=900 error_rate=0.05 (repeatable)")
+    parser.add_argument('--databricks', action='append', metavar='KEY=VALUE', help="Databricks model (repeatable)")
+    parser.add_argument('--set', action='append', metavar='PATH=VALUE', dest='settings',
+                        help="config override, e.g. retry.max_attempts=5 (repeatable)")
+    parser.add_argument('--json', action='store_true', help="print the full summary as JSON")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for assignment in args.settings or []:
+        _merge(overrides, _setting_override(assignment))
+    simulator = PipelineSimulator.from_file(
+        args.config,
+        services={'adf': _service_overrides(args.adf), 'databricks': _service_overrides(args.databricks)},
+        overrides=overrides
+    )
+    summary = simulator.run_many(args.trials, seed=args.seed)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    makespan = summary['makespan']
+    print(f"{summary['trials']} simulated runs in {summary['real_seconds']:.2f}s, "
+          f"{summary['success_rate']:.0%} succeeded")
+    print(f"makespan (s)    p50 {makespan['p50']:.1f}  p95 {makespan['p95']:.1f}  "
+          f"p99 {makespan['p99']:.1f}  max {makespan['max']:.1f}")
+    print(f"per run         {summary['api_calls']:.1f} API calls, {summary['retries']:.2f} retries, "
+          f"{summary['alerts_raised']:.2f} alerts raised, {summary['alerts_delivered']:.2f} delivered")
+    for error, count in summary['errors'].items():
+        print(f"{count}x {error}")
+
+
+if __name__ == '__main__':
+    main()
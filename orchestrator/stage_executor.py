@@ -0,0 +1,251 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import asyncio
+import contextvars
+import heapq
+import itertools
+from .clock import get_clock
+from .logger import get_logger
+from .retry_logic import deadline
+
+logger = get_logger()
+
+DEFAULT_STAGES = [
+    {'name': 'adf_pipeline', 'type': 'adf'},
+    {'name': 'databricks_notebook', 'type': 'databricks', 'depends_on': ['adf_pipeline']},
+]
+
+
+class StageDefinitionError(ValueError):
+    """Raised when the stage graph in the pipeline config is invalid."""
+
+
+class StageExecutionError(Exception):
+    """Raised when one or more stages failed during execution."""
+
+    def __init__(self, failures, skipped, results):
+        self.failures = failures
+        self.skipped = skipped
+        self.results = results
+        details = '; '.join(f"{name}: {error}" for name, error in failures.items())
+        message = f"Stages failed: {details}"
+        if skipped:
+            message += f" (skipped: {', '.join(skipped)})"
+        super().__init__(message)
+
+
+class Stage:
+    """
+    One node of the stage graph.
+
+    ``handler`` may be a plain function or a coroutine function; coroutines
+    run on their own event loop in the stage's worker thread. ``timeout``
+    sets a deadline that retries and waits inside the handler respect.
+    """
+
+    def __init__(self, name, handler, depends_on=None, params=None, timeout=None):
+        self.name = name
+        self.handler = handler
+        self.depends_on = list(depends_on or [])
+        self.params = dict(params or {})
+        self.timeout = timeout
+        self.duration = None
+
+    def run(self):
+        with deadline(self.timeout):
+            if asyncio.iscoroutinefunction(self.handler):
+                return asyncio.run(self.handler(**self.params))
+            return self.handler(**self.params)
+
+
+def validate_stages(stages):
+    """Check names are unique, dependencies exist and the graph is acyclic."""
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise StageDefinitionError(f"Duplicate stage name: {stage.name}")
+        by_name[stage.name] = stage
+
+    for stage in stages:
+        for dep in stage.depends_on:
+            if dep not in by_name:
+                raise StageDefinitionError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+    # Kahn's algorithm: anything left over sits on a cycle
+    remaining = {stage.name: set(stage.depends_on) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise StageDefinitionError(f"Dependency cycle between stages: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+class _ThreadedRunner:
+    """Runs each launched stage on the thread pool; completions arrive in real time."""
+
+    def __init__(self, pool, run_stage):
+        self.pool = pool
+        self.run_stage = run_stage
+        self.in_flight = {}
+
+    def __len__(self):
+        return len(self.in_flight)
+
+    def launch(self, stage):
+        # Copy the caller's context so an enclosing deadline reaches the stage
+        context = contextvars.copy_context()
+        self.in_flight[self.pool.submit(context.run, self.run_stage, stage)] = stage
+
+    def next_done(self):
+        """Block until a stage finishes; return it and a callable returning its result (or raising)."""
+        done, _ = wait(self.in_flight, return_when=FIRST_COMPLETED)
+        future = next(iter(done))
+        return self.in_flight.pop(future), future.result
+
+
+def _raiser(error):
+    def outcome():
+        raise error
+    return outcome
+
+
+class _VirtualRunner:
+    """
+    Runs each launched stage straight away in its own lane of a VirtualClock.
+
+    The stage starts at the clock's current time; its outcome is held until
+    ``next_done`` reaches its finish time, so completions come back in
+    simulated-time order and the clock advances to each one in turn.
+    """
+
+    def __init__(self, clock, run_stage):
+        self.clock = clock
+        self.run_stage = run_stage
+        self.in_flight = []
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.in_flight)
+
+    def launch(self, stage):
+        with self.clock.lane() as lane:
+            try:
+                result = self.run_stage(stage)
+            except Exception as e:
+                outcome = _raiser(e)
+            else:
+                outcome = lambda: result
+        heapq.heappush(self.in_flight, (lane.now, next(self._sequence), stage, outcome))
+
+    def next_done(self):
+        finished_at, _, stage, outcome = heapq.heappop(self.in_flight)
+        self.clock.advance_to(finished_at)
+        return stage, outcome
+
+
+class StageExecutor:
+    """
+    Run a DAG of stages on a bounded thread pool.
+
+    Every stage whose dependencies have completed is started as soon as one
+    of ``max_workers`` is free, so wall time follows the critical path
+    rather than the sum of all stages. Stages downstream of a failure are
+    skipped. With ``fail_fast`` no new stages are started once any stage has
+    failed; stages already in flight are allowed to finish.
+
+    ``on_stage_failure(stage, error)`` is called as each stage fails and
+    ``on_stage_skipped(stage, reason)`` as each stage is skipped, on the
+    thread running the scheduler.
+
+    On a VirtualClock the same scheduling loop drives a runner that executes
+    stages without threads, each in its own clock lane, and hands their
+    completions back in simulated-time order.
+    """
+
+    def __init__(self, stages, max_workers=4, fail_fast=True,
+                 on_stage_failure=None, on_stage_skipped=None):
+        validate_stages(stages)
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max(1, int(max_workers))
+        self.fail_fast = fail_fast
+        self.on_stage_failure = on_stage_failure
+        self.on_stage_skipped = on_stage_skipped
+
+    def _timed_run(self, stage):
+        start = get_clock().monotonic()
+        try:
+            return stage.run()
+        finally:
+            stage.duration = get_clock().monotonic() - start
+
+    def _skip_blocked(self, pending, failures, skipped):
+        # Propagate failures downstream until nothing else is blocked
+        blocked = True
+        while blocked:
+            blocked = [name for name, stage in pending.items()
+                       if any(dep in failures or dep in skipped for dep in stage.depends_on)]
+            for name in blocked:
+                self._skip(pending.pop(name), skipped, 'upstream_failed')
+
+    def _skip(self, stage, skipped, reason):
+        skipped.append(stage.name)
+        logger.warning("stage_skipped", stage=stage.name, reason=reason)
+        if self.on_stage_skipped:
+            self.on_stage_skipped(stage, reason)
+
+    def _finished(self, stage, results, failures, outcome):
+        """Record a stage's result or error (``outcome`` is a zero-argument callable returning it)."""
+        try:
+            results[stage.name] = outcome()
+        except Exception as e:
+            failures[stage.name] = e
+            logger.error("stage_failed", stage=stage.name, error=str(e), duration=stage.duration)
+            if self.on_stage_failure:
+                self.on_stage_failure(stage, e)
+        else:
+            logger.info("stage_complete", stage=stage.name, duration=stage.duration)
+
+    def _schedule(self, runner):
+        results = {}
+        failures = {}
+        skipped = []
+        pending = dict(self.stages)
+
+        while pending or len(runner):
+            self._skip_blocked(pending, failures, skipped)
+
+            if not (self.fail_fast and failures):
+                for name, stage in list(pending.items()):
+                    if len(runner) >= self.max_workers:
+                        break
+                    if all(dep in results for dep in stage.depends_on):
+                        del pending[name]
+                        logger.info("stage_started", stage=stage.name)
+                        runner.launch(stage)
+
+            if not len(runner):
+                # Nothing running and nothing runnable: the rest is blocked
+                for stage in pending.values():
+                    self._skip(stage, skipped, 'fail_fast')
+                pending.clear()
+                break
+
+            stage, outcome = runner.next_done()
+            self._finished(stage, results, failures, outcome)
+
+        return results, failures, skipped
+
+    def run(self):
+        """Execute all stages and return a mapping of stage name to result."""
+        clock = get_clock()
+        if clock.virtual:
+            results, failures, skipped = self._schedule(_VirtualRunner(clock, self._timed_run))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage') as pool:
+                results, failures, skipped = self._schedule(_ThreadedRunner(pool, self._timed_run))
+        if failures:
+            first_error = next(iter(failures.values()))
+            raise StageExecutionError(failures, skipped, results) from first_error
+        return results
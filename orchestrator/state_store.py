@@ -0,0 +1,218 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from .logger import get_logger
+
+logger = get_logger()
+
+# Stage states: the run was started, the stage finished, or it failed
+TRIGGERED = 'triggered'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+RUNNING = 'running'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    execution_id TEXT PRIMARY KEY,
+    pipeline_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    owner_host TEXT,
+    owner_pid INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_executions_pipeline ON executions (pipeline_key, started_at);
+
+CREATE TABLE IF NOT EXISTS stage_runs (
+    execution_id TEXT NOT NULL REFERENCES executions (execution_id),
+    stage TEXT NOT NULL,
+    service TEXT,
+    status TEXT NOT NULL,
+    run_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (execution_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_stage_runs_run_id ON stage_runs (run_id);
+
+CREATE TABLE IF NOT EXISTS triggers (
+    idempotency_key TEXT PRIMARY KEY,
+    service TEXT NOT NULL,
+    target TEXT,
+    execution_id TEXT,
+    stage TEXT,
+    run_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_triggers_stage ON triggers (execution_id, stage, created_at);
+"""
+
+# Columns added after the first release, for state files created without them
+MIGRATIONS = {
+    'executions': {'owner_host': 'TEXT', 'owner_pid': 'INTEGER'},
+}
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RunStateStore:
+    """
+    Durable record of pipeline executions and the run behind each stage.
+
+    Backed by a local SQLite file. Each ``execute_pipeline`` call is an
+    execution keyed by a hash of the pipeline definition; every stage
+    records its service run ID when triggered and its outcome when it
+    finishes, so a later call can resume an unfinished execution instead of
+    starting over. Every create call is also logged under its idempotency
+    key before it is sent, so a retry can tell whether an earlier attempt
+    may already have started the run.
+
+    Executions record the host and process running them. Only failed
+    executions, or running ones whose process has gone, are resumed, so an
+    overlapping call never takes over an execution that is still live.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Stage threads write through one connection, serialised by the lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            for table, columns in MIGRATIONS.items():
+                existing = {row['name'] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                for column, column_type in columns.items():
+                    if column not in existing:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _owner_gone(self, row):
+        # A process on another host can't be checked, so its execution counts as live
+        return row['owner_host'] == socket.gethostname() and row['owner_pid'] is not None and \
+            row['owner_pid'] != os.getpid() and not _process_alive(row['owner_pid'])
+
+    def start_execution(self, pipeline_key, resume_window=None):
+        """
+        Return ``(execution_id, resumed)``.
+
+        With ``resume_window`` (seconds), the latest execution of this
+        pipeline that started within the window is resumed if it failed, or
+        if it is still marked running but the process running it has exited;
+        otherwise a new execution is created.
+        """
+        now = time.time()
+        owner = (socket.gethostname(), os.getpid())
+        if resume_window:
+            rows = self._execute(
+                "SELECT execution_id, status, owner_host, owner_pid FROM executions "
+                "WHERE pipeline_key = ? AND started_at >= ? ORDER BY started_at DESC LIMIT 1",
+                (pipeline_key, now - resume_window)
+            )
+            latest = rows[0] if rows else None
+            if latest is not None and latest['status'] == RUNNING and not self._owner_gone(latest):
+                logger.warning("execution_in_progress", execution_id=latest['execution_id'],
+                               owner_host=latest['owner_host'], owner_pid=latest['owner_pid'])
+            elif latest is not None and latest['status'] in (FAILED, RUNNING):
+                execution_id = latest['execution_id']
+                self._execute(
+                    "UPDATE executions SET status = ?, finished_at = NULL, owner_host = ?, owner_pid = ? "
+                    "WHERE execution_id = ?",
+                    (RUNNING, *owner, execution_id)
+                )
+                logger.info("execution_resumed", execution_id=execution_id, previous_status=latest['status'])
+                return execution_id, True
+
+        execution_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO executions (execution_id, pipeline_key, status, started_at, owner_host, owner_pid) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (execution_id, pipeline_key, RUNNING, now, *owner)
+        )
+        return execution_id, False
+
+    def finish_execution(self, execution_id, status):
+        self._execute("UPDATE executions SET status = ?, finished_at = ? WHERE execution_id = ?",
+                      (status, time.time(), execution_id))
+
+    def record_stage(self, execution_id, stage, status, service=None, run_id=None, error=None):
+        """Insert or update a stage's state. ``attempts`` counts the TRIGGERED transitions."""
+        self._execute(
+            "INSERT INTO stage_runs (execution_id, stage, service, status, run_id, attempts, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (execution_id, stage) DO UPDATE SET "
+            "service = COALESCE(excluded.service, service), status = excluded.status, "
+            "run_id = COALESCE(excluded.run_id, run_id), attempts = attempts + excluded.attempts, "
+            "error = excluded.error, updated_at = excluded.updated_at",
+            (execution_id, stage, service, status, None if run_id is None else str(run_id),
+             1 if status == TRIGGERED else 0, error, time.time())
+        )
+
+    def stage_states(self, execution_id):
+        """Map of stage name to its recorded row (as a dict)."""
+        rows = self._execute("SELECT * FROM stage_runs WHERE execution_id = ?", (execution_id,))
+        return {row['stage']: dict(row) for row in rows}
+
+    def record_trigger(self, idempotency_key, service, target=None, execution_id=None, stage=None):
+        """Log a key before any create call is sent. A key that is already logged is left as it is."""
+        self._execute(
+            "INSERT OR IGNORE INTO triggers (idempotency_key, service, target, execution_id, stage, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (idempotency_key, service, target, execution_id, stage, time.time())
+        )
+
+    def begin_attempt(self, idempotency_key, service, target=None):
+        """
+        Count a create call about to be sent and return the key's state before it.
+
+        A non-zero ``attempts`` without a ``run_id`` means an earlier call may
+        have created the run even though no response came back.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO triggers (idempotency_key, service, target, created_at) VALUES (?, ?, ?, ?)",
+                (idempotency_key, service, target, time.time())
+            )
+            row = self._conn.execute("SELECT * FROM triggers WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            self._conn.execute("UPDATE triggers SET attempts = attempts + 1 WHERE idempotency_key = ?",
+                               (idempotency_key,))
+        return dict(row)
+
+    def complete_trigger(self, idempotency_key, run_id):
+        self._execute("UPDATE triggers SET run_id = ? WHERE idempotency_key = ?", (str(run_id), idempotency_key))
+
+    def get_trigger(self, idempotency_key):
+        rows = self._execute("SELECT * FROM triggers WHERE idempotency_key = ?", (idempotency_key,))
+        return dict(rows[0]) if rows else None
+
+    def pending_trigger(self, execution_id, stage):
+        """Key of the stage's latest create call that never returned a run ID, if any."""
+        rows = self._execute(
+            "SELECT idempotency_key, run_id FROM triggers WHERE execution_id = ? AND stage = ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (execution_id, stage)
+        )
+        return rows[0]['idempotency_key'] if rows and rows[0]['run_id'] is None else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
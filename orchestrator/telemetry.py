@@ -0,0 +1,306 @@
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_current_span = contextvars.ContextVar('datamove_span', default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set, in Prometheus layout."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, key, value):
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+        series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+
+class Span:
+    """A timed operation; nested spans record their parent."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start_ns', 'end_ns', 'status', '_token')
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = 'OK'
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+class _NullSpan:
+    """Returned by disabled telemetry; every operation is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NoopTelemetry:
+    """Telemetry that records nothing; the default until ``setup_telemetry`` enables it."""
+
+    enabled = False
+
+    def span(self, name, **attributes):
+        return _NULL_SPAN
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def increment(self, name, amount=1, **labels):
+        pass
+
+    def gauge_add(self, name, delta, **labels):
+        pass
+
+    def export(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _SpanContext:
+    def __init__(self, telemetry, name, attributes):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        self.span = Span(self.name, _current_span.get(), self.attributes)
+        self.span._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.status = 'ERROR'
+            span.attributes.setdefault('error', str(exc))
+        _current_span.reset(span._token)
+        self.telemetry._finish(span)
+        return False
+
+
+class Telemetry:
+    """
+    In-process metrics and tracing.
+
+    Records latency histograms, counters and gauges keyed by label set, and
+    spans whose parent is whatever span is active in the current context
+    (which follows asyncio tasks and stage threads). Every span also feeds
+    the ``datamove_span_duration_seconds`` histogram. ``export`` writes
+    metrics as a Prometheus text file (for node_exporter's textfile
+    collector) and finished spans as OTLP-JSON lines, both to local files.
+    """
+
+    enabled = True
+
+    def __init__(self, service_name='datamove', prometheus_file=None, otlp_file=None,
+                 buckets=DEFAULT_BUCKETS, max_spans=10000):
+        self.service_name = service_name
+        self.prometheus_file = Path(prometheus_file) if prometheus_file else None
+        self.otlp_file = Path(otlp_file) if otlp_file else None
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def span(self, name, **attributes):
+        return _SpanContext(self, name, attributes)
+
+    def current_span(self):
+        return _current_span.get()
+
+    def _finish(self, span):
+        self.observe('datamove_span_duration_seconds', span.duration, span=span.name, status=span.status)
+        with self._lock:
+            self.spans.append(span)
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.buckets)
+            histogram.observe(key, value)
+
+    def increment(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def gauge_add(self, name, delta, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + delta
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_format_labels(key)} {value}" for key, value in sorted(series.items()))
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{_format_labels(key)} {value}" for key, value in sorted(series.items()))
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, series in sorted(histogram.series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), series['counts']):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {series['sum']}")
+                    lines.append(f"{name}_count{_format_labels(key)} {series['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def _otlp_payload(self, spans):
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {'key': key, 'value': {'boolValue': value}}
+            if isinstance(value, int):
+                return {'key': key, 'value': {'intValue': str(value)}}
+            if isinstance(value, float):
+                return {'key': key, 'value': {'doubleValue': value}}
+            return {'key': key, 'value': {'stringValue': str(value)}}
+
+        return {'resourceSpans': [{
+            'resource': {'attributes': [attribute('service.name', self.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': 'datamove.orchestrator'},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': [attribute(k, v) for k, v in span.attributes.items()],
+                    'status': {'code': 2 if span.status == 'ERROR' else 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def export(self):
+        """Write metrics and any spans finished since the last export to the configured files."""
+        if self.prometheus_file:
+            self.prometheus_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.prometheus_file.with_suffix(self.prometheus_file.suffix + '.tmp')
+            tmp_path.write_text(self.prometheus_text())
+            # Atomic so the textfile collector never reads a partial file
+            os.replace(tmp_path, self.prometheus_file)
+        with self._lock:
+            spans = list(self.spans)
+            self.spans.clear()
+        if self.otlp_file and spans:
+            self.otlp_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.otlp_file, 'a') as f:
+                f.write(json.dumps(self._otlp_payload(spans)) + '\n')
+
+    def close(self):
+        self.export()
+
+
+_telemetry = {'instance': NoopTelemetry(), 'key': None}
+_telemetry_lock = threading.Lock()
+
+
+def setup_telemetry(config):
+    """
+    Configure telemetry from the optional `telemetry` config section.
+
+    Without it (or with `enabled: false`) a no-op implementation is used, so
+    instrumented code costs one method call per metric or span.
+    """
+    telemetry_config = config.get('telemetry', {})
+    if not telemetry_config.get('enabled', False):
+        key = None
+    else:
+        key = (
+            telemetry_config.get('service_name', 'datamove'),
+            telemetry_config.get('prometheus_file'),
+            telemetry_config.get('otlp_file'),
+        )
+    with _telemetry_lock:
+        if _telemetry['key'] == key:
+            return _telemetry['instance']
+        _telemetry['instance'].close()
+        if key is None:
+            _telemetry.update(instance=NoopTelemetry(), key=None)
+        else:
+            _telemetry.update(instance=Telemetry(
+                service_name=key[0],
+                prometheus_file=key[1],
+                otlp_file=key[2],
+                buckets=telemetry_config.get('buckets', DEFAULT_BUCKETS),
+                max_spans=telemetry_config.get('max_spans', 10000)
+            ), key=key)
+        return _telemetry['instance']
+
+
+def get_telemetry():
+    """Get the configured telemetry instance."""
+    return _telemetry['instance']
+
+
+def _export_at_exit():
+    _telemetry['instance'].close()
+
+
+atexit.register(_export_at_exit)
@@ -0,0 +1,106 @@
+import atexit
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SharedTransport:
+    """
+    Keep-alive HTTP connection pools shared by every SDK client in the process.
+
+    One ``HTTPAdapter`` (and so one urllib3 pool manager) is mounted on the
+    session of each client, giving a single pool per host with at most
+    ``pool_maxsize`` connections. With ``pool_block`` a request waits for a
+    free connection instead of opening one that is discarded afterwards.
+    The adapter never retries: the SDKs and ``RetryPolicy`` do that.
+    """
+
+    def __init__(self, pool_connections=20, pool_maxsize=32, pool_block=True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            # No urllib3 retries or redirects, as azure-core expects from its own adapter
+            max_retries=Retry(total=False, redirect=False, raise_on_status=False)
+        )
+
+    def mount(self, session):
+        """
+        Route a session's HTTP(S) requests through the shared pools.
+
+        Don't close a mounted session: that would close the shared adapter.
+        """
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def session(self):
+        """A new ``requests.Session`` backed by the shared pools."""
+        return self.mount(requests.Session())
+
+    def azure_transport(self):
+        """azure-core transport for ``DataFactoryManagementClient`` and friends."""
+        from azure.core.pipeline.transport import RequestsTransport
+        return RequestsTransport(session=self.session(), session_owner=False)
+
+    def stats(self):
+        """Per-host pool usage: connections opened, requests sent, idle and in-use connections."""
+        manager = self.adapter.poolmanager
+        hosts = {}
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            # The queue holds idle connections plus None placeholders for ones not yet opened
+            queued = list(pool.pool.queue)
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': sum(conn is not None for conn in queued),
+                'in_use': pool.pool.maxsize - len(queued),
+                'max_size': pool.pool.maxsize,
+            }
+        return {
+            'hosts': hosts,
+            'connections_opened': sum(h['connections_opened'] for h in hosts.values()),
+            'requests': sum(h['requests'] for h in hosts.values()),
+        }
+
+    def close(self):
+        self.adapter.close()
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def shared_transport(config):
+    """
+    Process-wide transport for the optional `http` config section.
+
+    Orchestrators with the same pool settings share one transport, so
+    connections are reused across pipelines run in the same process.
+    """
+    http_config = config.get('http', {})
+    key = (
+        http_config.get('pool_connections', 20),
+        http_config.get('pool_maxsize', 32),
+        http_config.get('pool_block', True),
+    )
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = SharedTransport(*key)
+        return transport
+
+
+def _close_at_exit():
+    for transport in list(_transports.values()):
+        transport.close()
+
+
+atexit.register(_close_at_exit)
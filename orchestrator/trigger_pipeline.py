@@ -1,49 +1,345 @@
+import hashlib
+import json
+import time
 import yaml
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.datafactory import DataFactoryManagementClient
-from databricks.sdk import WorkspaceClient
-from databricks.sdk.service.jobs import CreateJob, JobSettings, NotebookTask
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
 from .logger import setup_logger, get_logger
-from .retry_logic import with_retry
+from .retry_logic import RetryPolicy, counting_retries, new_idempotency_key, remaining_time, retrying
 from .alerting import AlertManager
+from .backfill import Backfill, date_chunks
+from .batch_trigger import BatchTrigger
+from .clock import get_clock
+from .cluster_pool import ClusterPool
+from .credentials import PersistentTokenCredential
+from .job_cache import JobDefinitionCache, is_missing_job
+from .local_engine import LocalTransform, available as local_engine_available, input_size
+from .run_history import PIPELINE_STAGE, RunHistory
+from .run_tracker import RunTracker, _query_filter
+from .state_store import FAILED, SUCCEEDED, TRIGGERED, RunStateStore
+from .stage_executor import DEFAULT_STAGES, Stage, StageDefinitionError, StageExecutor
+from .telemetry import setup_telemetry
+
+# Stage types that can be declared under `stages` in the pipeline config
+STAGE_HANDLERS = {
+    'adf': ('trigger_adf_pipeline', ('pipeline_name', 'parameters')),
+    'databricks': ('run_databricks_notebook', ('notebook_path', 'base_parameters')),
+}
+
+# Config settings each lazily built client depends on; reload_config only
+# rebuilds a client when one of these changed
+CLIENT_SETTINGS = {
+    'credential': (('auth',),),
+    'adf_client': (('auth',), ('adf', 'subscription_id'), ('http',)),
+    'databricks_client': (('databricks', 'workspace_url'), ('databricks', 'token'), ('databricks', 'cluster_id'),
+                          ('http',)),
+    'job_cache': (('databricks', 'workspace_url'), ('databricks', 'token'), ('databricks', 'cluster_id'),
+                  ('databricks', 'job_cache')),
+    'run_tracker': (('auth',), ('adf', 'subscription_id'), ('adf', 'resource_group'), ('adf', 'factory_name'),
+                    ('databricks', 'workspace_url'), ('databricks', 'token'), ('databricks', 'cluster_id'),
+                    ('monitoring',)),
+    'cluster_pool': (('databricks', 'workspace_url'), ('databricks', 'token'), ('databricks', 'cluster_id'),
+                     ('databricks', 'cluster_pool'), ('http',)),
+    'state_store': (('state_store', 'enabled'), ('state_store', 'path')),
+    'trigger_log': (('state_store', 'enabled'), ('state_store', 'path')),
+    'run_history': (('run_history',),),
+}
+
+
+def _setting(config, path):
+    for key in path:
+        config = config.get(key) if isinstance(config, dict) else None
+    return config
 
 class PipelineOrchestrator:
     def __init__(self, config_path):
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        # Seconds spent in each startup phase, including lazily built clients
+        self.startup_timings = {}
+        self.config_path = config_path
+
+        with self._timed('load_config'):
+            with open(config_path, 'r') as f:
+                self.config = yaml.safe_load(f)
         
-        self.logger = setup_logger(self.config)
-        self.alert_manager = AlertManager(self.config)
+        with self._timed('setup_logger'):
+            self.logger = setup_logger(self.config)
+        with self._timed('telemetry'):
+            # No-op unless `telemetry.enabled`; shared with retries and alerting
+            self.telemetry = setup_telemetry(self.config)
+        with self._timed('alert_manager'):
+            self.alert_manager = AlertManager(self.config)
         
-        # Initialize Azure clients
-        self.credential = DefaultAzureCredential()
-        self.adf_client = DataFactoryManagementClient(
-            credential=self.credential,
-            subscription_id=self.config['adf']['subscription_id']
-        )
+        # Built from this instance's `retry` section; its retry budget and
+        # circuit breakers are shared by every call the orchestrator makes
+        self.retry_policy = RetryPolicy.from_config(self.config)
         
-        # Initialize Databricks client with authentication
-        self.databricks_client = WorkspaceClient(
-            host=self.config['databricks']['workspace_url'],
-            token=self.config['databricks'].get('token'),  # Get token from config
-            cluster_id=self.config['databricks']['cluster_id']
+        # SDK clients are created on first use (see the properties below), so a
+        # run that only touches one service never imports or builds the other.
+        self.logger.info("orchestrator_initialized", startup_timings=self.startup_timings)
+
+    @contextmanager
+    def _timed(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.startup_timings[phase] = round(elapsed, 4)
+            if 'telemetry' in vars(self):
+                self.telemetry.observe('datamove_startup_seconds', elapsed, phase=phase)
+
+    def close(self):
+        """Flush queued alerts, release pooled connections and export telemetry."""
+        self.alert_manager.close()
+        if 'adf_client' in vars(self) or 'databricks_client' in vars(self):
+            self.logger.info("http_pool_stats", **self.transport.stats())
+        for attr in ('trigger_log', 'state_store', 'run_history'):
+            if vars(self).get(attr) is not None:
+                vars(self)[attr].close()
+        self.telemetry.export()
+
+    def reload_config(self):
+        """
+        Re-read the config file in place, for long-running processes.
+
+        Clients, the token cache and job definitions are kept unless a
+        setting they were built from changed. Returns the names of the
+        top-level sections that changed.
+        """
+        with open(self.config_path, 'r') as f:
+            config = yaml.safe_load(f)
+        old, self.config = self.config, config
+        changed = {section for section in set(old) | set(config) if old.get(section) != config.get(section)}
+
+        for attr, paths in CLIENT_SETTINGS.items():
+            if attr in vars(self) and any(_setting(old, path) != _setting(config, path) for path in paths):
+                client = vars(self).pop(attr)
+                if hasattr(client, 'close'):
+                    client.close()
+        if 'logging' in changed:
+            self.logger = setup_logger(config)
+        if 'telemetry' in changed:
+            self.telemetry = setup_telemetry(config)
+        if 'retry' in changed:
+            self.retry_policy = RetryPolicy.from_config(config)
+        if 'alerts' in changed:
+            old_alert_manager, self.alert_manager = self.alert_manager, AlertManager(config)
+            old_alert_manager.close()
+        return changed
+
+    def startup_report(self):
+        """Return the startup-time breakdown recorded so far, in seconds."""
+        return dict(self.startup_timings, total=round(sum(self.startup_timings.values()), 4))
+
+    @cached_property
+    def credential(self):
+        """Azure credential, backed by the persistent token cache when enabled."""
+        with self._timed('credential'):
+            def build_credential():
+                from azure.identity import DefaultAzureCredential
+                return DefaultAzureCredential()
+
+            token_cache = self.config.get('auth', {}).get('token_cache', {})
+            if not token_cache.get('enabled', False):
+                return build_credential()
+            return PersistentTokenCredential(
+                build_credential,
+                cache_path=token_cache.get('path', '~/.datamove/token_cache.json'),
+                refresh_margin=token_cache.get('refresh_margin', 300),
+                identity=token_cache.get('identity')
+            )
+
+    @property
+    def transport(self):
+        """Keep-alive connection pools shared by the SDK clients of every orchestrator in the process."""
+        from .transport import shared_transport
+        return shared_transport(self.config)
+
+    @cached_property
+    def adf_client(self):
+        credential = self.credential
+        with self._timed('adf_client'):
+            from azure.mgmt.datafactory import DataFactoryManagementClient
+            return DataFactoryManagementClient(
+                credential=credential,
+                subscription_id=self.config['adf']['subscription_id'],
+                transport=self.transport.azure_transport()
+            )
+
+    @cached_property
+    def databricks_client(self):
+        with self._timed('databricks_client'):
+            from databricks.sdk import WorkspaceClient
+            client = WorkspaceClient(
+                host=self.config['databricks']['workspace_url'],
+                token=self.config['databricks'].get('token'),  # Get token from config
+                cluster_id=self.config['databricks']['cluster_id']
+            )
+            # The SDK builds its own session; route it through the shared pools. The
+            # session is private to the SDK, so newer releases may not expose it
+            session = getattr(getattr(client, 'api_client', None), '_session', None)
+            if hasattr(session, 'mount'):
+                self.transport.mount(session)
+            else:
+                self.logger.warning("databricks_http_pool_not_shared",
+                                    reason="databricks-sdk client has no api_client._session")
+            return client
+
+    @cached_property
+    def cluster_pool(self):
+        """Warm-cluster scheduler for notebook runs; None unless `databricks.cluster_pool.enabled`."""
+        pool_config = self.config['databricks'].get('cluster_pool', {})
+        if not pool_config.get('enabled', False):
+            return None
+        pool = ClusterPool(
+            self.databricks_client,
+            pool_config.get('cluster_ids') or [self.config['databricks']['cluster_id']],
+            max_runs_per_cluster=pool_config.get('max_runs_per_cluster', 4),
+            idle_timeout=pool_config.get('idle_timeout', 1800),
+            min_warm=pool_config.get('min_warm', 1),
+            prewarm_lead=pool_config.get('prewarm_lead', 600),
+            state_ttl=pool_config.get('state_ttl', 30)
+        )
+        if self.run_history is not None:
+            # Size pre-warming from past load, not just what this process has seen
+            pool.hourly_peaks.update(self.run_history.hourly_peaks(
+                get_clock().time() - self.run_history.baseline_window, service='databricks'
+            ))
+        return pool
+
+    @cached_property
+    def job_cache(self):
+        """Reuse job definitions across executions instead of creating one per run."""
+        return JobDefinitionCache(
+            self.databricks_client,
+            index_path=self.config['databricks'].get('job_cache', {}).get('index_file')
+        )
+
+    @cached_property
+    def run_tracker(self):
+        """Shared completion tracker for every run this orchestrator starts."""
+        monitoring = self.config.get('monitoring', {})
+        tracker = RunTracker(
+            adf_client_factory=lambda: self.adf_client,
+            resource_group=self.config['adf']['resource_group'],
+            factory_name=self.config['adf']['factory_name'],
+            databricks_client_factory=lambda: self.databricks_client,
+            min_interval=monitoring.get('min_poll_interval', 5),
+            max_interval=monitoring.get('max_poll_interval', 300),
+            poll_fraction=monitoring.get('poll_fraction', 0.1),
+            max_poll_failures=monitoring.get('max_poll_failures', 5)
+        )
+        if self.run_history is not None:
+            # Poll sparsely until each stage's usual finish time from the first run on
+            tracker.expected_durations.update(self.run_history.expected_durations(self.pipeline_name))
+        return tracker
+
+    @cached_property
+    def state_store(self):
+        """Local record of stage runs for resuming failed executions; None unless `state_store.enabled`."""
+        state_config = self.config.get('state_store', {})
+        if not state_config.get('enabled', False):
+            return None
+        return RunStateStore(state_config.get('path', '.datamove/state.db'))
+
+    @cached_property
+    def run_history(self):
+        """Indexed stage and pipeline durations for percentiles and regressions; None unless `run_history.enabled`."""
+        history_config = self.config.get('run_history', {})
+        if not history_config.get('enabled', False):
+            return None
+        return RunHistory(
+            history_config.get('path', '.datamove/history.db'),
+            baseline_window=history_config.get('baseline_window', 14 * 86400),
+            min_samples=history_config.get('min_samples', 5),
+            regression_factor=history_config.get('regression_factor', 2.0)
         )
 
-    @with_retry
-    def trigger_adf_pipeline(self):
-        """Trigger Azure Data Factory pipeline."""
+    @property
+    def pipeline_name(self):
+        """Name runs are recorded under in the run history."""
+        return self.config.get('run_history', {}).get('pipeline') or self.config['adf'].get('pipeline_name')
+
+    @cached_property
+    def trigger_log(self):
+        """Idempotency keys of create calls: the state store when enabled, otherwise in memory."""
+        return self.state_store or RunStateStore(':memory:')
+
+    def _find_adf_run(self, pipeline_name, idempotency_key, since):
+        """Find a run of ``pipeline_name`` that was started with this key, via `adf.idempotency_parameter`."""
+        from azure.mgmt.datafactory.models import RunFilterParameters, RunQueryFilter
+
+        key_parameter = self.config['adf'].get('idempotency_parameter')
+        if not key_parameter:
+            return None
+        filter_parameters = RunFilterParameters(
+            last_updated_after=datetime.fromtimestamp(since, timezone.utc) - timedelta(minutes=5),
+            last_updated_before=datetime.now(timezone.utc) + timedelta(minutes=5),
+            filters=[_query_filter(RunQueryFilter, 'PipelineName', 'Equals', [pipeline_name])]
+        )
+        while True:
+            response = self.adf_client.pipeline_runs.query_by_factory(
+                self.config['adf']['resource_group'], self.config['adf']['factory_name'], filter_parameters
+            )
+            for pipeline_run in response.value or []:
+                if (pipeline_run.parameters or {}).get(key_parameter) == idempotency_key:
+                    return pipeline_run.run_id
+            if not response.continuation_token:
+                return None
+            filter_parameters.continuation_token = response.continuation_token
+
+    def _create_adf_run(self, pipeline_name, parameters, idempotency_key, **options):
+        """
+        Create an ADF run at most once per idempotency key.
+
+        If an earlier attempt with the same key got no response, the run it
+        may have started is looked up before another create call is sent.
+        """
+        trigger = self.trigger_log.begin_attempt(idempotency_key, 'adf', pipeline_name)
+        run_id = trigger['run_id']
+        if run_id is None and trigger['attempts']:
+            run_id = self._find_adf_run(pipeline_name, idempotency_key, trigger['created_at'])
+        if run_id is not None:
+            self.trigger_log.complete_trigger(idempotency_key, run_id)
+            self.logger.info("adf_run_deduplicated", pipeline_name=pipeline_name, run_id=run_id)
+            return run_id
+
+        key_parameter = self.config['adf'].get('idempotency_parameter')
+        if key_parameter:
+            parameters = dict(parameters or {}, **{key_parameter: idempotency_key})
+        run_response = self.adf_client.pipelines.create_run(
+            resource_group_name=self.config['adf']['resource_group'],
+            factory_name=self.config['adf']['factory_name'],
+            pipeline_name=pipeline_name,
+            parameters=parameters,
+            **options
+        )
+        self.trigger_log.complete_trigger(idempotency_key, run_response.run_id)
+        return run_response.run_id
+
+    @retrying('adf', idempotency_key='idempotency_key')
+    def trigger_adf_pipeline(self, pipeline_name=None, parameters=None, recover_run_id=None, idempotency_key=None):
+        """
+        Trigger Azure Data Factory pipeline.
+
+        With ``recover_run_id``, the failed run is rerun in recovery mode from
+        its failed activity, instead of starting the pipeline from scratch.
+        Retries reuse ``idempotency_key``, so at most one run is started.
+        """
+        pipeline_name = pipeline_name or self.config['adf']['pipeline_name']
         try:
-            self.logger.info("triggering_adf_pipeline", pipeline_name=self.config['adf']['pipeline_name'])
+            self.logger.info("triggering_adf_pipeline", pipeline_name=pipeline_name, recover_run_id=recover_run_id)
             
+            recovery = {}
+            if recover_run_id:
+                recovery = {'reference_pipeline_run_id': recover_run_id, 'is_recovery': True,
+                            'start_from_failure': True}
             # Create pipeline run
-            run_response = self.adf_client.pipelines.create_run(
-                resource_group_name=self.config['adf']['resource_group'],
-                factory_name=self.config['adf']['factory_name'],
-                pipeline_name=self.config['adf']['pipeline_name']
-            )
+            run_id = self._create_adf_run(pipeline_name, parameters, idempotency_key, **recovery)
             
-            self.logger.info("adf_pipeline_triggered", run_id=run_response.run_id)
-            return run_response.run_id
+            self.logger.info("adf_pipeline_triggered", pipeline_name=pipeline_name, run_id=run_id)
+            return run_id
             
         except Exception as e:
             self.logger.error("adf_pipeline_trigger_failed", error=str(e))
@@ -54,29 +350,126 @@ class PipelineOrchestrator:
             )
             raise
 
-    @with_retry
-    def run_databricks_notebook(self):
-        """Run Databricks notebook."""
+    def trigger_adf_pipelines(self, pipelines):
+        """
+        Trigger many ADF pipelines in one process.
+
+        Args:
+            pipelines (list): Pipeline names, or dicts with `pipeline_name` and
+                optional `parameters`.
+
+        Concurrency, rate and retry limits come from `adf.batch` in the config.
+        """
+        batch_config = self.config['adf'].get('batch', {})
+        # One key per pipeline, reused when the batch retries its trigger
+        items = [dict({'pipeline_name': p} if isinstance(p, str) else p, idempotency_key=new_idempotency_key())
+                 for p in pipelines]
+
+        def create_run(item):
+            return self._create_adf_run(item['pipeline_name'], item.get('parameters'), item['idempotency_key'])
+
+        self.logger.info("triggering_adf_batch", pipeline_count=len(items))
+        batch = BatchTrigger(
+            create_run,
+            max_concurrency=batch_config.get('max_concurrency', 16),
+            rate_per_second=batch_config.get('rate_per_second', 5),
+            burst=batch_config.get('burst'),
+            max_attempts=batch_config.get('max_attempts', 5)
+        )
+        with self.telemetry.span('adf.batch', pipelines=len(items)):
+            result = batch.run(items)
+
+        if result.failures:
+            failed = ', '.join(item['pipeline_name'] for item, _ in result.failures)
+            self.alert_manager.send_alert(
+                "ADF Batch Trigger Failed",
+                f"{len(result.failures)} of {len(items)} pipelines failed to trigger: {failed}",
+                is_error=True
+            )
+        return result
+
+    def run_databricks_notebook(self, notebook_path=None, base_parameters=None, idempotency_key=None):
+        """
+        Run Databricks notebook.
+
+        ``idempotency_key`` is sent as the run's idempotency token, so a
+        retried call returns the run an earlier attempt started instead of
+        starting another.
+        """
+        if self.cluster_pool is not None:
+            # Once per run, not per attempt: each acquire counts a run against the cluster
+            cluster_id = self.retry_policy.call('databricks', self.cluster_pool.acquire)
+        else:
+            cluster_id = self.config['databricks']['cluster_id']
+        return self._start_notebook_run(notebook_path, base_parameters, cluster_id, idempotency_key=idempotency_key)
+
+    @retrying('databricks', idempotency_key='idempotency_key')
+    def _start_notebook_run(self, notebook_path, base_parameters, cluster_id, idempotency_key=None):
+        from databricks.sdk.service.jobs import JobSettings, NotebookTask, SubmitTask, Task
+
+        notebook_path = notebook_path or self.config['databricks']['notebook_path']
+        # Defaults from `databricks.parameters` (paths etc.), overridden per stage or run
+        base_parameters = {**self.config['databricks'].get('parameters', {}), **(base_parameters or {})}
         try:
-            self.logger.info("running_databricks_notebook", notebook_path=self.config['databricks']['notebook_path'])
+            self.logger.info("running_databricks_notebook", notebook_path=notebook_path)
+            trigger = self.trigger_log.begin_attempt(idempotency_key, 'databricks', notebook_path)
+            if trigger['run_id'] is not None:
+                self.logger.info("databricks_run_deduplicated", run_id=trigger['run_id'])
+                return int(trigger['run_id'])
             
-            # Create job settings
+            if self.config['databricks'].get('launch_mode', 'run_now') == 'submit':
+                # One-time run: no job definition is stored in the workspace
+                run = self.databricks_client.jobs.submit(
+                    run_name="Data Processing Job",
+                    tasks=[SubmitTask(
+                        task_key="notebook",
+                        existing_cluster_id=cluster_id,
+                        notebook_task=NotebookTask(
+                            notebook_path=notebook_path,
+                            base_parameters=base_parameters or {}
+                        )
+                    )],
+                    idempotency_token=idempotency_key
+                )
+                self.trigger_log.complete_trigger(idempotency_key, run.run_id)
+                self.logger.info("databricks_run_submitted", run_id=run.run_id)
+                return run.run_id
+            
+            # Job settings exclude per-run parameters so the definition can be reused
             job_settings = JobSettings(
                 name="Data Processing Job",
-                tasks=[NotebookTask(
-                    notebook_path=self.config['databricks']['notebook_path'],
-                    base_parameters={}
-                )]
+                tasks=[Task(
+                    task_key="notebook",
+                    existing_cluster_id=cluster_id,
+                    notebook_task=NotebookTask(notebook_path=notebook_path)
+                )],
+                # Backfill chunks run concurrently as runs of the same job
+                max_concurrent_runs=self.config['databricks'].get('max_concurrent_runs')
             )
+            with self.telemetry.span('databricks.job_definition'):
+                job_id = self.job_cache.get_or_create(
+                    job_settings.name, job_settings.tasks, max_concurrent_runs=job_settings.max_concurrent_runs
+                )
             
-            # Create and run job
-            job = self.databricks_client.jobs.create(
-                name=job_settings.name,
-                tasks=job_settings.tasks
-            )
+            run_kwargs = {'job_id': job_id, 'idempotency_token': idempotency_key}
+            if base_parameters:
+                run_kwargs['notebook_params'] = base_parameters
+            try:
+                with self.telemetry.span('databricks.run_now', job_id=job_id):
+                    run = self.databricks_client.jobs.run_now(**run_kwargs)
+            except Exception as e:
+                if not is_missing_job(e):
+                    raise
+                # Job was deleted in the workspace since it was verified
+                self.job_cache.invalidate(job_id)
+                run_kwargs['job_id'] = job_id = self.job_cache.get_or_create(
+                    job_settings.name, job_settings.tasks, max_concurrent_runs=job_settings.max_concurrent_runs
+                )
+                run = self.databricks_client.jobs.run_now(**run_kwargs)
             
-            self.logger.info("databricks_job_created", job_id=job.job_id)
-            return job.job_id
+            self.trigger_log.complete_trigger(idempotency_key, run.run_id)
+            self.logger.info("databricks_run_started", job_id=job_id, run_id=run.run_id)
+            return run.run_id
             
         except Exception as e:
             self.logger.error("databricks_job_failed", error=str(e))
@@ -87,30 +480,305 @@ class PipelineOrchestrator:
             )
             raise
 
-    def execute_pipeline(self):
-        """Execute the complete pipeline."""
+    def _local_transform(self, notebook_path=None, base_parameters=None):
+        """
+        A LocalTransform for this notebook run when it can run in-process, else None.
+
+        Only full-mode runs of the default notebook whose source is a local
+        path of at most `databricks.local_engine.max_input_bytes` qualify,
+        and only when the engine's packages are installed. Incremental
+        MERGEs and anything larger go to Databricks.
+        """
+        databricks_config = self.config['databricks']
+        local_config = databricks_config.get('local_engine', {})
+        if not local_config.get('enabled', False):
+            return None
+        if notebook_path not in (None, databricks_config.get('notebook_path')):
+            return None
+        parameters = {**databricks_config.get('parameters', {}), **(base_parameters or {})}
+        if parameters.get('mode', 'full') != 'full':
+            return None
+        engine = local_config.get('engine', 'auto')
+        output_format = local_config.get('output_format', 'parquet')
+        if not local_engine_available(engine, output_format):
+            self.logger.debug("local_engine_unavailable", engine=engine, output_format=output_format)
+            return None
+        size = input_size(parameters.get('source_path'))
+        if size is None or size > local_config.get('max_input_bytes', 256 * 1024 * 1024):
+            return None
+        self.logger.info("local_engine_selected", source_path=parameters['source_path'], input_bytes=size)
+        return LocalTransform.from_parameters(
+            parameters, engine=engine, output_format=output_format, batch_size=local_config.get('batch_size', 65536)
+        )
+
+    def run_local_transform(self, transform):
+        """Run a LocalTransform to completion and return its run ID (`local-...`)."""
+        run_id = f"local-{new_idempotency_key()}"
         try:
-            # Trigger ADF pipeline
-            adf_run_id = self.trigger_adf_pipeline()
-            
-            # Run Databricks notebook
-            databricks_job_id = self.run_databricks_notebook()
+            self.logger.info("local_transform_started", run_id=run_id, source_path=transform.source_path)
+            with self.telemetry.span('local_transform', run_id=run_id):
+                result = transform.run()
+            self.logger.info("local_transform_complete", run_id=run_id, **result)
+            return run_id
+        except Exception as e:
+            self.logger.error("local_transform_failed", run_id=run_id, error=str(e))
+            self.alert_manager.send_alert(
+                "Local Transform Failed",
+                f"Failed to run the transformation locally: {str(e)}",
+                is_error=True
+            )
+            raise
+
+    def build_stages(self, execution_id=None, previous=None):
+        """
+        Build the stage graph from the `stages` section of the config.
+
+        ``previous`` maps stage names to their recorded state when resuming
+        an execution: completed stages are not run again, and a failed ADF
+        run is restarted from its failed activity.
+        """
+        previous = previous or {}
+        stages = []
+        for spec in self.config.get('stages') or DEFAULT_STAGES:
+            stage_type = spec.get('type')
+            if stage_type not in STAGE_HANDLERS:
+                raise StageDefinitionError(f"Unknown stage type '{stage_type}' for stage '{spec.get('name')}'")
+            method_name, param_names = STAGE_HANDLERS[stage_type]
+            params = {key: spec[key] for key in param_names if key in spec}
+            state = previous.get(spec['name'])
+            if stage_type == 'adf' and state and state['status'] == FAILED and state['run_id']:
+                params['recover_run_id'] = state['run_id']
+            stages.append(Stage(
+                name=spec['name'],
+                handler=self._stage_handler(spec['name'], stage_type, method_name, execution_id, state),
+                depends_on=spec.get('depends_on'),
+                params=params,
+                timeout=spec.get('timeout')
+            ))
+        return stages
+
+    def _stage_handler(self, stage_name, stage_type, method_name, execution_id=None, state=None):
+        """Trigger a stage's run and, if configured, block until it has finished."""
+        def record(status, run_id=None, error=None):
+            if execution_id is not None:
+                self.state_store.record_stage(execution_id, stage_name, status,
+                                              service=stage_type, run_id=run_id, error=error)
+
+        def run_stage(**params):
+            if state and state['status'] == SUCCEEDED:
+                self.logger.info("stage_already_completed", stage=stage_name, run_id=state['run_id'])
+                return self._stored_run_id(stage_type, state['run_id'])
+            self.telemetry.gauge_add('datamove_stages_in_flight', 1, type=stage_type)
+            start = get_clock().monotonic()
+            outcome = 'error'
+            run_id = None
+            retries = {'retries': 0}
+            try:
+                with self.telemetry.span('stage', stage=stage_name, type=stage_type) as span, \
+                        counting_retries() as retries:
+                    local = None
+                    if state and state['status'] == TRIGGERED and state['run_id']:
+                        # The last process stopped while this run was in flight: wait for it, don't start another
+                        run_id = self._stored_run_id(stage_type, state['run_id'])
+                        self.logger.info("stage_run_adopted", stage=stage_name, run_id=run_id)
+                    elif stage_type == 'databricks' and (local := self._local_transform(
+                            params.get('notebook_path'), params.get('base_parameters'))) is not None:
+                        # Small input: run in-process; it has finished when this returns
+                        run_id = self.run_local_transform(local)
+                    else:
+                        if execution_id is not None:
+                            # Logged before the create call, so a resume after a crash reuses the key
+                            key = self.state_store.pending_trigger(execution_id, stage_name) or new_idempotency_key()
+                            self.state_store.record_trigger(key, stage_type, execution_id=execution_id, stage=stage_name)
+                            params = dict(params, idempotency_key=key)
+                        run_id = getattr(self, method_name)(**params)
+                        record(TRIGGERED, run_id)
+                    span.set_attribute('run_id', str(run_id))
+                    if local is None and self.config.get('monitoring', {}).get('wait_for_completion', False):
+                        if stage_type == 'adf':
+                            pipeline_name = params.get('pipeline_name') or self.config['adf']['pipeline_name']
+                            self.wait_for_run(stage_type, run_id, stage=stage_name, pipeline_name=pipeline_name)
+                        else:
+                            self.wait_for_run(stage_type, run_id, stage=stage_name)
+                record(SUCCEEDED, run_id)
+                outcome = 'success'
+                return run_id
+            except Exception as e:
+                record(FAILED, run_id, error=str(e))
+                raise
+            finally:
+                self.telemetry.gauge_add('datamove_stages_in_flight', -1, type=stage_type)
+                duration = get_clock().monotonic() - start
+                self.telemetry.observe('datamove_stage_duration_seconds', duration, stage=stage_name, outcome=outcome)
+                self._record_history(stage_name, duration, outcome, service=stage_type, retries=retries['retries'],
+                                     execution_id=execution_id, run_id=run_id)
+        return run_stage
+
+    def _alert_stage_failed(self, stage, error):
+        self.alert_manager.send_alert(
+            f"Stage Failed: {stage.name}",
+            f"Stage '{stage.name}' failed after {stage.duration or 0:.1f}s: {error}",
+            is_error=True
+        )
+
+    def _alert_stage_skipped(self, stage, reason):
+        cause = "an upstream stage failed" if reason == 'upstream_failed' else "another stage failed (fail_fast)"
+        self.alert_manager.send_alert(
+            f"Stage Skipped: {stage.name}",
+            f"Stage '{stage.name}' was not run because {cause}",
+            is_error=True
+        )
+
+    def _record_history(self, stage, duration, outcome, **details):
+        """Append a run to the history, if enabled. A history failure never fails the pipeline."""
+        if self.run_history is None:
+            return
+        try:
+            row = self.run_history.record(self.pipeline_name, stage, duration, outcome, **details)
+            if row['regressed']:
+                self.telemetry.increment('datamove_duration_regressions_total', 1, stage=stage)
+        except Exception as e:
+            self.logger.error("run_history_write_failed", stage=stage, error=str(e))
+
+    def wait_for_run(self, service, run_id, stage=None, pipeline_name=None):
+        """Wait for an ADF or Databricks run to reach a terminal state."""
+        if service == 'adf':
+            run = self.run_tracker.track_adf(run_id, stage=stage, pipeline_name=pipeline_name)
+        else:
+            run = self.run_tracker.track_databricks(run_id, stage=stage)
+        timeout = self.config.get('monitoring', {}).get('timeout')
+        remaining = remaining_time()
+        if remaining is not None:
+            # Never wait past the stage deadline
+            timeout = max(0.0, remaining) if timeout is None else min(timeout, max(0.0, remaining))
+        try:
+            with self.telemetry.span('wait_for_run', service=service, run_id=str(run_id)):
+                return self.run_tracker.wait(run, timeout=timeout)
+        except Exception as e:
+            # Alerted once per stage, by execute_pipeline's on_stage_failure hook
+            self.logger.error("run_failed", service=service, run_id=run_id, stage=stage, error=str(e))
+            raise
+
+    @staticmethod
+    def _stored_run_id(stage_type, run_id):
+        # Databricks run IDs are integers (local runs aside); the state store keeps every ID as text
+        return int(run_id) if stage_type == 'databricks' and str(run_id).isdigit() else run_id
+
+    def _pipeline_key(self):
+        """Hash of what execute_pipeline runs; a changed definition never resumes an old execution."""
+        definition = {
+            'stages': self.config.get('stages') or DEFAULT_STAGES,
+            'pipeline_name': self.config['adf'].get('pipeline_name'),
+            'notebook_path': self.config['databricks'].get('notebook_path'),
+            'parameters': self.config['databricks'].get('parameters'),
+        }
+        return hashlib.sha256(json.dumps(definition, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _start_execution(self, resume):
+        """Return ``(execution_id, previous stage states)``, or ``(None, None)`` without a state store."""
+        if self.state_store is None:
+            return None, None
+        state_config = self.config.get('state_store', {})
+        if resume is None:
+            resume = state_config.get('resume', True)
+        execution_id, resumed = self.state_store.start_execution(
+            self._pipeline_key(), resume_window=state_config.get('resume_window', 43200) if resume else None
+        )
+        return execution_id, self.state_store.stage_states(execution_id) if resumed else None
+
+    def execute_pipeline(self, resume=None):
+        """
+        Execute all configured stages, running independent stages concurrently.
+
+        With the state store enabled, a recent execution that did not finish
+        is resumed: completed stages are skipped and failed ADF runs are
+        recovered from the failed activity. Pass ``resume=False`` to start
+        over; the default comes from `state_store.resume`.
+        """
+        execution_config = self.config.get('execution', {})
+        execution_id = None
+        start = get_clock().monotonic()
+        try:
+            execution_id, previous = self._start_execution(resume)
+            executor = StageExecutor(
+                self.build_stages(execution_id, previous),
+                max_workers=execution_config.get('max_concurrency', 4),
+                fail_fast=execution_config.get('fail_fast', True),
+                on_stage_failure=self._alert_stage_failed,
+                on_stage_skipped=self._alert_stage_skipped
+            )
+            # Stage spans (and the retry/API spans under them) are children of this one
+            with self.telemetry.span('pipeline'):
+                results = executor.run()
             
-            self.logger.info("pipeline_execution_complete", 
-                          adf_run_id=adf_run_id, 
-                          databricks_job_id=databricks_job_id)
+            self.logger.info("pipeline_execution_complete", stage_results=results, execution_id=execution_id)
+            if execution_id is not None:
+                self.state_store.finish_execution(execution_id, SUCCEEDED)
+            self._record_history(PIPELINE_STAGE, get_clock().monotonic() - start, 'success', execution_id=execution_id)
             
             self.alert_manager.send_alert(
                 "Pipeline Execution Successful",
-                f"ADF Run ID: {adf_run_id}\nDatabricks Job ID: {databricks_job_id}",
+                "\n".join(f"{name}: {result}" for name, result in results.items()),
                 is_error=False
             )
+            return results
             
         except Exception as e:
-            self.logger.error("pipeline_execution_failed", error=str(e))
+            self.logger.error("pipeline_execution_failed", error=str(e), execution_id=execution_id)
+            if execution_id is not None:
+                self.state_store.finish_execution(execution_id, FAILED)
+            self._record_history(PIPELINE_STAGE, get_clock().monotonic() - start, 'error', execution_id=execution_id)
             self.alert_manager.send_alert(
                 "Pipeline Execution Failed",
                 f"Pipeline execution failed: {str(e)}",
                 is_error=True
             )
-            raise 
\ No newline at end of file
+            raise
+        finally:
+            self.telemetry.export()
+
+    def backfill(self, start_date, end_date, chunk=None, max_in_flight=None, notebook_path=None, base_parameters=None):
+        """
+        Reprocess a date range as parallel, partition-aligned notebook runs.
+
+        The range is split into day, week or month chunks. Each chunk is
+        passed to the notebook as `start_date`/`end_date` in full mode, so it
+        reads and replaces only that range. Defaults come from
+        `databricks.backfill` in the config.
+        """
+        backfill_config = self.config['databricks'].get('backfill', {})
+        chunks = date_chunks(start_date, end_date, chunk or backfill_config.get('chunk', 'month'))
+        timeout = self.config.get('monitoring', {}).get('timeout')
+
+        def run_chunk(date_chunk):
+            params = dict(base_parameters or {}, mode='full',
+                          start_date=date_chunk.start.isoformat(), end_date=date_chunk.end.isoformat())
+            run_id = self.run_databricks_notebook(notebook_path=notebook_path, base_parameters=params)
+            run = self.run_tracker.track_databricks(run_id, stage='backfill')
+            self.run_tracker.wait(run, timeout=timeout)
+            return run_id
+
+        self.logger.info("backfill_started", start_date=str(start_date), end_date=str(end_date), chunks=len(chunks))
+        with self.telemetry.span('backfill', chunks=len(chunks)):
+            result = Backfill(
+                run_chunk,
+                max_in_flight=max_in_flight or backfill_config.get('max_in_flight', 4),
+                max_attempts=backfill_config.get('max_attempts', 2),
+                retry_delay=backfill_config.get('retry_delay', 60)
+            ).run(chunks)
+        self.telemetry.export()
+
+        if result.failures:
+            failed = ', '.join(date_chunk.label for date_chunk, _ in result.failures)
+            self.alert_manager.send_alert(
+                "Backfill Failed",
+                f"{len(result.failures)} of {len(chunks)} chunks failed: {failed}",
+                is_error=True
+            )
+        else:
+            self.alert_manager.send_alert(
+                "Backfill Successful",
+                f"{start_date} to {end_date}: {len(chunks)} chunks in {result.elapsed:.0f}s",
+                is_error=False
+            )
+        return result
@@ -1,6 +1,7 @@
-from pyspark.sql import SparkSession
+from pyspark.sql import SparkSession, Window
 from pyspark.sql.functions import *
 from delta.tables import *
+import datetime as dt
 
 # Initialize Spark session
 spark = SparkSession.builder \
@@ -10,33 +11,228 @@ spark = SparkSession.builder \
     .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog") \
     .getOrCreate()
 
-# Read source data
-source_df = spark.read.format("delta").load("/mnt/data/source")
-
-# Apply transformations
-transformed_df = source_df \
-    .withColumn("processed_date", current_timestamp()) \
-    .withColumn("year", year("date")) \
-    .withColumn("month", month("date")) \
-    .withColumn("day", dayofmonth("date")) \
-    .dropDuplicates() \
-    .orderBy("date")
-
-# Write to Delta Lake
-transformed_df.write \
-    .format("delta") \
-    .mode("overwrite") \
-    .partitionBy("year", "month", "day") \
-    .save("/mnt/data/transformed")
-
-# Optimize table
-spark.sql("""
-    OPTIMIZE '/mnt/data/transformed'
-    ZORDER BY (date)
-""")
-
-# Clean up old files
-spark.sql("""
-    VACUUM '/mnt/data/transformed'
-    RETAIN 168 HOURS
-""") 
\ No newline at end of file
+
+def get_param(name, default):
+    """Read a notebook widget (job parameter), falling back to ``default`` outside Databricks."""
+    try:
+        dbutils.widgets.text(name, default)
+        return dbutils.widgets.get(name) or default
+    except NameError:
+        return default
+
+
+# Parameters (passed as notebook_params / base_parameters by the orchestrator)
+SOURCE_PATH = get_param("source_path", "/mnt/data/source")
+TARGET_PATH = get_param("target_path", "/mnt/data/transformed")
+# "full" rebuilds the target from the whole source; "incremental" merges only new changes
+MODE = get_param("mode", "full")
+# Columns identifying a record; the latest version of each key wins
+BUSINESS_KEY = [c.strip() for c in get_param("business_key", "id").split(",") if c.strip()]
+# Column that orders versions of the same key (newest wins)
+SEQUENCE_COLUMN = get_param("sequence_column", "date")
+# "cdf" reads the source's Change Data Feed; "watermark" filters on WATERMARK_COLUMN
+CHANGE_SOURCE = get_param("change_source", "cdf")
+WATERMARK_COLUMN = get_param("watermark_column", "date")
+# Optional inclusive date range (YYYY-MM-DD); backfill chunks set both, and full mode
+# then reads only that range and replaces it in the target with replaceWhere
+START_DATE = get_param("start_date", "")
+END_DATE = get_param("end_date", "")
+# Delta table recording the last source version / watermark processed per target
+STATE_PATH = get_param("state_path", "/mnt/data/_datamove_state")
+# "dynamic" replaces only the partitions present in the new data; "static" rewrites the whole table
+PARTITION_OVERWRITE = get_param("partition_overwrite", "dynamic")
+# Maintenance: OPTIMIZE touched partitions when files are small, VACUUM at most every N hours
+ZORDER_COLUMNS = [c.strip() for c in get_param("zorder_columns", ",".join(BUSINESS_KEY)).split(",") if c.strip()]
+SMALL_FILE_BYTES = int(get_param("small_file_bytes", str(32 * 1024 * 1024)))
+MIN_FILES_TO_OPTIMIZE = int(get_param("min_files_to_optimize", "50"))
+VACUUM_INTERVAL_HOURS = float(get_param("vacuum_interval_hours", "24"))
+VACUUM_RETAIN_HOURS = int(get_param("vacuum_retain_hours", "168"))
+# Above this many touched partitions, maintenance targets the whole table
+MAX_PARTITION_PREDICATES = 500
+
+CDF_COLUMNS = ["_change_type", "_commit_version", "_commit_timestamp"]
+PARTITION_COLUMNS = ["year", "month", "day"]
+
+
+def transform(df):
+    return df \
+        .withColumn("processed_date", current_timestamp()) \
+        .withColumn("year", year("date")) \
+        .withColumn("month", month("date")) \
+        .withColumn("day", dayofmonth("date"))
+
+
+def latest_per_key(df, order_columns):
+    """Keep one row per business key: the one that sorts last by ``order_columns``."""
+    window = Window.partitionBy(*BUSINESS_KEY).orderBy(*[col(c).desc() for c in order_columns])
+    return df.withColumn("_row", row_number().over(window)) \
+        .filter(col("_row") == 1) \
+        .drop("_row")
+
+
+def read_state():
+    if not DeltaTable.isDeltaTable(spark, STATE_PATH):
+        return None
+    rows = spark.read.format("delta").load(STATE_PATH) \
+        .filter(col("target_path") == TARGET_PATH) \
+        .collect()
+    return rows[0] if rows else None
+
+
+def write_state(source_version=None, watermark=None):
+    state_df = spark.createDataFrame(
+        [(TARGET_PATH, SOURCE_PATH, source_version, watermark)],
+        "target_path STRING, source_path STRING, source_version LONG, watermark STRING"
+    ).withColumn("updated_at", current_timestamp())
+    if not DeltaTable.isDeltaTable(spark, STATE_PATH):
+        state_df.write.format("delta").save(STATE_PATH)
+        return
+    DeltaTable.forPath(spark, STATE_PATH).alias("t") \
+        .merge(state_df.alias("s"), "t.target_path = s.target_path") \
+        .whenMatchedUpdateAll() \
+        .whenNotMatchedInsertAll() \
+        .execute()
+
+
+def read_changes(state):
+    """
+    Return ``(changes, new_state)`` where ``changes`` holds the latest change
+    per business key since the last run, with an ``_is_delete`` flag, or
+    ``(None, None)`` when there is nothing new.
+    """
+    if CHANGE_SOURCE == "cdf":
+        current_version = DeltaTable.forPath(spark, SOURCE_PATH).history(1).select("version").first()[0]
+        last_version = state["source_version"] if state else None
+        if last_version is not None and last_version >= current_version:
+            return None, None
+        if last_version is None:
+            # First incremental run: take the current snapshot
+            changes = spark.read.format("delta").option("versionAsOf", current_version).load(SOURCE_PATH) \
+                .withColumn("_is_delete", lit(False))
+            return latest_per_key(changes, [SEQUENCE_COLUMN]), {"source_version": current_version}
+        changes = spark.read.format("delta") \
+            .option("readChangeFeed", "true") \
+            .option("startingVersion", last_version + 1) \
+            .option("endingVersion", current_version) \
+            .load(SOURCE_PATH) \
+            .filter(col("_change_type") != "update_preimage")
+        changes = latest_per_key(changes, ["_commit_version", SEQUENCE_COLUMN]) \
+            .withColumn("_is_delete", col("_change_type") == "delete") \
+            .drop(*CDF_COLUMNS)
+        return changes, {"source_version": current_version}
+
+    # Watermark: rows whose watermark column is newer than the last one processed
+    changes = spark.read.format("delta").load(SOURCE_PATH)
+    if state and state["watermark"] is not None:
+        changes = changes.filter(col(WATERMARK_COLUMN) > lit(state["watermark"]).cast(changes.schema[WATERMARK_COLUMN].dataType))
+    watermark = changes.agg(max(WATERMARK_COLUMN)).first()[0]
+    if watermark is None:
+        return None, None
+    changes = latest_per_key(changes, [SEQUENCE_COLUMN]).withColumn("_is_delete", lit(False))
+    return changes, {"watermark": str(watermark)}
+
+
+def merge_into_target(updates):
+    if not DeltaTable.isDeltaTable(spark, TARGET_PATH):
+        updates.filter(~col("_is_delete")).drop("_is_delete").write \
+            .format("delta") \
+            .partitionBy(*PARTITION_COLUMNS) \
+            .save(TARGET_PATH)
+        return
+    condition = " AND ".join(f"t.`{c}` <=> s.`{c}`" for c in BUSINESS_KEY)
+    upsert_columns = {c: f"s.`{c}`" for c in updates.columns if c != "_is_delete"}
+    DeltaTable.forPath(spark, TARGET_PATH).alias("t") \
+        .merge(updates.alias("s"), condition) \
+        .whenMatchedDelete(condition="s._is_delete") \
+        .whenMatchedUpdate(set=upsert_columns) \
+        .whenNotMatchedInsert(condition="NOT s._is_delete", values=upsert_columns) \
+        .execute()
+
+
+def touched_partitions(df):
+    """Distinct (year, month, day) values in ``df``, i.e. the partitions a write will touch."""
+    return [tuple(row) for row in df.select(*PARTITION_COLUMNS).distinct().dropna().collect()]
+
+
+def partition_predicate(partitions):
+    """SQL predicate on the partition columns matching ``partitions``, or None for the whole table."""
+    if not partitions or len(partitions) > MAX_PARTITION_PREDICATES:
+        return None
+    return " OR ".join(
+        "(" + " AND ".join(f"{c} = {v}" for c, v in zip(PARTITION_COLUMNS, values)) + ")"
+        for values in partitions
+    )
+
+
+def maintain(partitions):
+    """
+    Compact and clean up the target only when its statistics call for it.
+
+    OPTIMIZE is limited to the partitions this run touched and only runs when
+    the table has accumulated many small files. VACUUM runs at most once per
+    VACUUM_INTERVAL_HOURS, based on the table history.
+    """
+    target = DeltaTable.forPath(spark, TARGET_PATH)
+    detail = target.detail().select("numFiles", "sizeInBytes").first()
+    num_files, size_bytes = detail["numFiles"] or 0, detail["sizeInBytes"] or 0
+    average_file_bytes = size_bytes / num_files if num_files else 0
+
+    if partitions and num_files >= MIN_FILES_TO_OPTIMIZE and average_file_bytes < SMALL_FILE_BYTES:
+        predicate = partition_predicate(partitions)
+        statement = f"OPTIMIZE delta.`{TARGET_PATH}`"
+        if predicate:
+            statement += f" WHERE {predicate}"
+        if ZORDER_COLUMNS:
+            statement += " ZORDER BY (" + ", ".join(f"`{c}`" for c in ZORDER_COLUMNS) + ")"
+        print(f"Optimizing {len(partitions)} partitions ({num_files} files, {average_file_bytes / 1024 / 1024:.1f} MB average)")
+        spark.sql(statement)
+
+    last_vacuum = target.history() \
+        .filter(col("operation") == "VACUUM END") \
+        .agg(max("timestamp")) \
+        .first()[0]
+    # History timestamps are in the session time zone, like datetime.now() on the driver
+    if last_vacuum is None or dt.datetime.now() - last_vacuum >= dt.timedelta(hours=VACUUM_INTERVAL_HOURS):
+        spark.sql(f"VACUUM delta.`{TARGET_PATH}` RETAIN {VACUUM_RETAIN_HOURS} HOURS")
+
+
+partitions = []
+if MODE == "incremental":
+    state = read_state()
+    changes, new_state = read_changes(state)
+    if changes is None:
+        print(f"No new changes in {SOURCE_PATH} since the last run")
+    else:
+        changes = transform(changes).cache()
+        partitions = touched_partitions(changes)
+        merge_into_target(changes)
+        write_state(**new_state)
+        changes.unpersist()
+else:
+    # Read source data, pruned to the requested date range if there is one
+    source_df = spark.read.format("delta").load(SOURCE_PATH)
+    date_range = None
+    if START_DATE and END_DATE:
+        date_range = f"date >= '{START_DATE}' AND date <= '{END_DATE}'"
+        source_df = source_df.filter(date_range)
+
+    # Apply transformations. No global sort: the write is partitioned by date
+    # anyway, and sorting would force a full shuffle.
+    transformed_df = transform(source_df).dropDuplicates()
+
+    writer = transformed_df.write \
+        .format("delta") \
+        .mode("overwrite") \
+        .partitionBy(*PARTITION_COLUMNS)
+    if date_range:
+        # Replace exactly the requested range, including days with no source rows left
+        writer = writer.option("replaceWhere", date_range)
+    else:
+        # Overwrite only the partitions present in the new data
+        writer = writer.option("partitionOverwriteMode", PARTITION_OVERWRITE)
+    writer.save(TARGET_PATH)
+    # Only the date column is read again to find which partitions were written
+    partitions = touched_partitions(transform(source_df.select("date")))
+
+if partitions:
+    maintain(partitions)
@@ -11,13 +11,52 @@ fi
 # Activate virtual environment
 source venv/bin/activate
 
-# Install dependencies
-pip install -r requirements.txt
+# Install dependencies, only when requirements.txt changed since the last install
+REQUIREMENTS_STAMP="venv/.requirements.sha256"
+if ! sha256sum --status -c "$REQUIREMENTS_STAMP" 2>/dev/null; then
+    pip install -r requirements.txt && sha256sum requirements.txt > "$REQUIREMENTS_STAMP"
+fi
+
+# Run the pipeline (pass 'batch' to trigger every pipeline listed under adf.batch.pipelines,
+# 'backfill <start_date> <end_date>' to reprocess a date range in parallel chunks,
+# 'daemon' to run the scheduler.jobs from one long-lived process,
+# 'simulate [--trials N --adf key=value ...]' to estimate makespan on a virtual clock,
+# or 'history <percentiles|regressions|capacity> [--since 7d ...]' to query the run history)
+MODE=${1:-pipeline}
+START_DATE=${2:-}
+END_DATE=${3:-}
+
+if [ "$MODE" == "backfill" ] && { [ -z "$START_DATE" ] || [ -z "$END_DATE" ]; }; then
+    echo "Usage: $0 backfill <start_date> <end_date>" >&2
+    exit 1
+fi
+
+if [ "$MODE" == "daemon" ]; then
+    exec python -m orchestrator.scheduler pipelines/pipeline_config.yaml
+fi
+
+if [ "$MODE" == "simulate" ]; then
+    exec python -m orchestrator.simulator pipelines/pipeline_config.yaml "${@:2}"
+fi
+
+if [ "$MODE" == "history" ]; then
+    exec python -m orchestrator.run_history --config pipelines/pipeline_config.yaml "${@:2}"
+fi
 
-# Run the pipeline
+# Arguments go through sys.argv, never into the Python source
 python -c "
+import sys
 from orchestrator.trigger_pipeline import PipelineOrchestrator
 
+mode, start_date, end_date = sys.argv[1:4]
 orchestrator = PipelineOrchestrator('pipelines/pipeline_config.yaml')
-orchestrator.execute_pipeline()
-" 
\ No newline at end of file
+try:
+    if mode == 'batch':
+        orchestrator.trigger_adf_pipelines(orchestrator.config['adf']['batch']['pipelines'])
+    elif mode == 'backfill':
+        orchestrator.backfill(start_date, end_date)
+    else:
+        orchestrator.execute_pipeline()
+finally:
+    orchestrator.close()
+" "$MODE" "$START_DATE" "$END_DATE"
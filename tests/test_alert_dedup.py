@@ -0,0 +1,114 @@
+import pytest
+import time
+from unittest.mock import patch
+from orchestrator.alert_dedup import AlertDeduplicator, alert_fingerprint
+from orchestrator.alerting import AlertManager
+
+CHANNELS = ('email', 'slack')
+
+def test_fingerprint_ignores_volatile_ids():
+    first = alert_fingerprint("ADF Pipeline Trigger Failed", "run 3f2c1a9e-0000-4bcd-8123-1234567890ab failed after 3 attempts", True)
+    second = alert_fingerprint("ADF Pipeline Trigger Failed", "run 9a7e5d31-1111-4bcd-8123-abcdefabcdef failed after 4 attempts", True)
+    other = alert_fingerprint("Databricks Job Failed", "run 3f2c1a9e-0000-4bcd-8123-1234567890ab failed", True)
+
+    assert first == second
+    assert first != other
+    assert first != alert_fingerprint("ADF Pipeline Trigger Failed", "run 1 failed after 3 attempts", False)
+
+def test_duplicates_suppressed_within_ttl():
+    dedup = AlertDeduplicator(ttl=60)
+
+    assert dedup.filter("Failed", "run 1", True, CHANNELS) == ['email', 'slack']
+    assert dedup.filter("Failed", "run 2", True, CHANNELS) == []
+    assert dedup.filter("Other", "run 2", True, CHANNELS) == ['email', 'slack']
+
+def test_duplicates_allowed_after_ttl():
+    dedup = AlertDeduplicator(ttl=0.05)
+    dedup.filter("Failed", "run 1", True, CHANNELS)
+    time.sleep(0.06)
+
+    assert dedup.filter("Failed", "run 1", True, CHANNELS) == ['email', 'slack']
+
+def test_cache_is_bounded():
+    dedup = AlertDeduplicator(ttl=600, max_entries=10)
+    for i in range(100):
+        dedup.filter(f"Alert {chr(65 + i % 26)}{chr(65 + i // 26)}", "message", True, CHANNELS)
+
+    assert len(dedup._seen) <= 10
+
+def test_rate_limit_is_per_channel():
+    dedup = AlertDeduplicator(rate_limits={'email': {'per_minute': 1, 'burst': 1}})
+
+    assert dedup.filter("A", "x", True, CHANNELS) == ['email', 'slack']
+    assert dedup.filter("B", "x", True, CHANNELS) == ['slack']
+
+def test_digest_counts_suppressed_alerts():
+    dedup = AlertDeduplicator(ttl=600)
+    for run in range(5):
+        dedup.filter("ADF Pipeline Trigger Failed", f"run {run} failed", True, CHANNELS)
+
+    subject, message, is_error = dedup.take_digest()
+
+    assert subject == "Alert digest: 4 suppressed"
+    assert "4x [ERROR] ADF Pipeline Trigger Failed" in message
+    assert is_error
+    assert dedup.take_digest() is None
+
+@pytest.fixture
+def mock_config():
+    return {
+        'alerts': {
+            'dedup': {'enabled': True, 'ttl': 600, 'digest_interval': 600},
+            'email': {'enabled': False},
+            'slack': {
+                'enabled': True,
+                'webhook_url': 'https://hooks.slack.com/services/test',
+                'channel': '#test-channel',
+                'on_failure': True,
+                'on_success': False
+            }
+        }
+    }
+
+def test_alert_manager_sends_one_alert_and_a_digest_per_storm(mock_config):
+    with patch('slack_sdk.WebClient') as mock_client:
+        alert_manager = AlertManager(mock_config)
+        for attempt in range(10):
+            alert_manager.send_alert("ADF Pipeline Trigger Failed", f"attempt {attempt}: timeout", is_error=True)
+        alert_manager.close()
+
+    texts = [call.kwargs['text'] for call in mock_client.return_value.chat_postMessage.call_args_list]
+    assert len(texts) == 2
+    assert texts[0] == "[ERROR] attempt 0: timeout"
+    assert "9 alerts suppressed" in texts[1]
+
+def test_alerts_a_channel_would_drop_do_not_use_its_rate_limit(mock_config):
+    mock_config['alerts']['dedup']['rate_limits'] = {'slack': {'per_minute': 1, 'burst': 1}}
+
+    with patch('slack_sdk.WebClient') as mock_client:
+        alert_manager = AlertManager(mock_config)
+        # Slack has on_success: false, so these never reach it
+        for run in range(3):
+            alert_manager.send_alert(f"Run {run} Complete", "ok", is_error=False)
+        alert_manager.send_alert("ADF Pipeline Trigger Failed", "timeout", is_error=True)
+        digest = alert_manager.deduplicator.take_digest()
+
+    texts = [call.kwargs['text'] for call in mock_client.return_value.chat_postMessage.call_args_list]
+    assert texts == ["[ERROR] timeout"]
+    assert digest is None
+
+def test_digest_is_due_on_the_virtual_clock(mock_config):
+    from orchestrator.clock import VirtualClock, use_clock
+
+    with patch('slack_sdk.WebClient') as mock_client, use_clock(VirtualClock()) as clock:
+        alert_manager = AlertManager(mock_config)
+        for attempt in range(3):
+            alert_manager.send_alert("ADF Pipeline Trigger Failed", f"attempt {attempt}: timeout", is_error=True)
+        clock.sleep(601)
+        alert_manager.send_alert("Databricks Job Failed", "notebook failed", is_error=True)
+
+        texts = [call.kwargs['text'] for call in mock_client.return_value.chat_postMessage.call_args_list]
+        alert_manager.close()
+
+    assert len(texts) == 3
+    assert "2 alerts suppressed" in texts[1]
@@ -0,0 +1,121 @@
+import pytest
+import smtplib
+import threading
+import time
+from unittest.mock import Mock, patch
+from orchestrator.alert_dispatcher import AlertDispatcher, SMTPConnectionPool
+from orchestrator.alerting import AlertManager
+
+@pytest.fixture
+def mock_config():
+    return {
+        'alerts': {
+            'dispatch': {'enabled': True, 'flush_timeout': 5},
+            'email': {
+                'enabled': True,
+                'sender': 'test@example.com',
+                'recipients': ['recipient@example.com'],
+                'smtp_server': 'smtp.test.com',
+                'smtp_port': 587,
+                'username': 'test_user',
+                'password': 'test_pass',
+                'on_failure': True,
+                'on_success': False,
+                'pool_size': 1
+            },
+            'slack': {
+                'enabled': True,
+                'webhook_url': 'https://hooks.slack.com/services/test',
+                'channel': '#test-channel',
+                'on_failure': True,
+                'on_success': False
+            }
+        }
+    }
+
+def test_pool_reuses_session():
+    with patch('smtplib.SMTP') as mock_smtp:
+        pool = SMTPConnectionPool('smtp.test.com', 587, 'user', 'pass', size=1)
+        pool.send_message(Mock())
+        pool.send_message(Mock())
+
+    mock_smtp.assert_called_once()
+    mock_smtp.return_value.starttls.assert_called_once()
+    mock_smtp.return_value.login.assert_called_once_with('user', 'pass')
+    assert mock_smtp.return_value.send_message.call_count == 2
+
+def test_pool_reconnects_dropped_session():
+    stale, fresh = Mock(), Mock()
+    stale.send_message.side_effect = smtplib.SMTPServerDisconnected()
+    with patch('smtplib.SMTP', side_effect=[stale, fresh]):
+        pool = SMTPConnectionPool('smtp.test.com', 587, size=1)
+        pool.send_message('message')
+
+    fresh.send_message.assert_called_once_with('message')
+    assert pool.connects == 2
+
+def test_pool_probes_idle_session():
+    server = Mock()
+    server.noop.return_value = (421, b'closing')
+    replacement = Mock()
+    with patch('smtplib.SMTP', side_effect=[server, replacement]):
+        pool = SMTPConnectionPool('smtp.test.com', 587, size=1, idle_timeout=0)
+        pool.send_message('first')
+        time.sleep(0.01)
+        pool.send_message('second')
+
+    replacement.send_message.assert_called_once_with('second')
+
+def test_dispatcher_does_not_block_caller_and_channels_run_in_parallel():
+    release = threading.Event()
+    slow_email = Mock(side_effect=lambda *args: release.wait(5))
+    slack = Mock()
+    dispatcher = AlertDispatcher({'email': slow_email, 'slack': slack})
+
+    start = time.monotonic()
+    dispatcher.submit('subject', 'message', True)
+    assert time.monotonic() - start < 0.1
+
+    # Slack is delivered while email is still stuck on the relay
+    deadline = time.monotonic() + 2
+    while not slack.called and time.monotonic() < deadline:
+        time.sleep(0.01)
+    slack.assert_called_once_with('subject', 'message', True)
+
+    release.set()
+    assert dispatcher.flush(timeout=2)
+    slow_email.assert_called_once()
+    dispatcher.close()
+
+def test_dispatcher_close_flushes_pending():
+    delivered = []
+    dispatcher = AlertDispatcher({'email': lambda *args: (time.sleep(0.01), delivered.append(args))})
+    for i in range(5):
+        dispatcher.submit(i)
+
+    dispatcher.close()
+
+    assert [args[0] for args in delivered] == [0, 1, 2, 3, 4]
+
+def test_dispatcher_survives_channel_errors():
+    handler = Mock(side_effect=[Exception('relay down'), None])
+    dispatcher = AlertDispatcher({'email': handler})
+    dispatcher.submit('a')
+    dispatcher.submit('b')
+
+    assert dispatcher.flush(timeout=2)
+    assert handler.call_count == 2
+    dispatcher.close()
+
+def test_alert_manager_dispatches_in_background(mock_config):
+    with patch('smtplib.SMTP') as mock_smtp, \
+         patch('slack_sdk.WebClient') as mock_client:
+        alert_manager = AlertManager(mock_config)
+        alert_manager.send_alert("Subject", "Message", is_error=True)
+        alert_manager.send_alert("Subject", "Message", is_error=True)
+        alert_manager.close()
+
+    # Both emails went over a single pooled session
+    mock_smtp.assert_called_once()
+    assert mock_smtp.return_value.send_message.call_count == 2
+    assert mock_client.return_value.chat_postMessage.call_count == 2
@@ -0,0 +1,78 @@
+import pytest
+import threading
+import time
+from datetime import date
+from unittest.mock import Mock
+from orchestrator.backfill import Backfill, DateChunk, date_chunks
+
+def test_month_chunks_are_aligned_and_clipped():
+    chunks = date_chunks('2024-01-15', '2024-03-10', 'month')
+
+    assert chunks == [
+        DateChunk(date(2024, 1, 15), date(2024, 1, 31)),
+        DateChunk(date(2024, 2, 1), date(2024, 2, 29)),
+        DateChunk(date(2024, 3, 1), date(2024, 3, 10)),
+    ]
+
+def test_week_chunks_start_on_monday():
+    chunks = date_chunks(date(2024, 1, 3), date(2024, 1, 15), 'week')
+
+    assert [c.label for c in chunks] == [
+        '2024-01-03..2024-01-07', '2024-01-08..2024-01-14', '2024-01-15..2024-01-15'
+    ]
+
+def test_day_chunks_across_year_end():
+    assert len(date_chunks('2023-12-30', '2024-01-02', 'day')) == 4
+
+def test_invalid_ranges_rejected():
+    with pytest.raises(ValueError):
+        date_chunks('2024-02-01', '2024-01-01')
+    with pytest.raises(ValueError):
+        date_chunks('2024-01-01', '2024-02-01', 'year')
+
+def test_runs_chunks_concurrently_up_to_limit():
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+
+    def run_chunk(chunk):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(0.05)
+        with lock:
+            state['active'] -= 1
+        return f"run-{chunk.start.day}"
+
+    chunks = date_chunks('2024-01-01', '2024-01-08', 'day')
+    result = Backfill(run_chunk, max_in_flight=3).run(chunks)
+
+    assert len(result.runs) == 8
+    assert result.runs[chunks[0]] == 'run-1'
+    assert state['peak'] == 3
+
+def test_failed_chunk_is_retried_without_stopping_others():
+    chunks = date_chunks('2024-01-01', '2024-01-03', 'day')
+    attempts = {}
+
+    def run_chunk(chunk):
+        attempts[chunk] = attempts.get(chunk, 0) + 1
+        if chunk == chunks[1]:
+            raise RuntimeError("run failed")
+        if chunk == chunks[0] and attempts[chunk] == 1:
+            raise RuntimeError("cluster lost")
+        return 'ok'
+
+    result = Backfill(run_chunk, max_attempts=2, retry_delay=0).run(chunks)
+
+    assert set(result.runs) == {chunks[0], chunks[2]}
+    assert [chunk for chunk, _ in result.failures] == [chunks[1]]
+    assert attempts == {chunks[0]: 2, chunks[1]: 2, chunks[2]: 1}
+    assert result.summary()['attempts'] == 5
+
+def test_fatal_errors_are_not_retried():
+    run_chunk = Mock(side_effect=ValueError("bad notebook parameter"))
+
+    result = Backfill(run_chunk, max_attempts=3, retry_delay=0).run(date_chunks('2024-01-01', '2024-01-01', 'day'))
+
+    assert run_chunk.call_count == 1
+    assert len(result.failures) == 1
@@ -0,0 +1,108 @@
+import time
+from unittest.mock import Mock
+from orchestrator.batch_trigger import BatchTrigger
+from orchestrator.clock import VirtualClock, use_clock
+from orchestrator.rate_limit import TokenBucket
+
+class ThrottledError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("Too Many Requests")
+        self.status_code = 429
+        self.response = Mock(headers={'Retry-After': retry_after} if retry_after else {})
+
+class ServerError(Exception):
+    status_code = 503
+
+class BadRequestError(Exception):
+    status_code = 400
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+
+    # First token is free, the other five wait ~20ms each
+    assert time.monotonic() - start >= 0.09
+
+def test_token_bucket_try_acquire():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+def test_batch_triggers_every_item():
+    trigger = Mock(side_effect=lambda item: f"run-{item['pipeline_name']}")
+    items = [{'pipeline_name': f'p{i}'} for i in range(20)]
+
+    result = BatchTrigger(trigger, max_concurrency=4, rate_per_second=1000).run(items)
+
+    assert len(result.runs) == 20
+    assert not result.failures
+    assert trigger.call_count == 20
+    assert result.throughput > 0
+    assert result.summary()['triggered'] == 20
+
+def test_batch_honours_retry_after_and_slows_down():
+    trigger = Mock(side_effect=[ThrottledError(retry_after='0.1'), 'run-1'])
+
+    batch = BatchTrigger(trigger, max_concurrency=1, rate_per_second=100)
+    start = time.monotonic()
+    result = batch.run([{'pipeline_name': 'p'}])
+
+    assert time.monotonic() - start >= 0.1
+    assert result.runs == [({'pipeline_name': 'p'}, 'run-1')]
+    assert result.throttled == 1
+    assert result.attempts == 2
+    assert batch.bucket.rate < 100
+
+def test_batch_retries_server_errors():
+    trigger = Mock(side_effect=[ServerError(), 'run-1'])
+
+    with use_clock(VirtualClock()):
+        result = BatchTrigger(trigger, max_concurrency=1, rate_per_second=100).run([{'pipeline_name': 'p'}])
+
+    assert len(result.runs) == 1
+    assert trigger.call_count == 2
+
+def test_batch_retries_connection_errors_without_sleeping_after_the_last():
+    trigger = Mock(side_effect=ConnectionError("reset"))
+
+    with use_clock(VirtualClock()) as clock:
+        result = BatchTrigger(trigger, max_concurrency=1, rate_per_second=100, max_attempts=3,
+                              default_backoff=5).run([{'pipeline_name': 'p'}])
+
+    assert trigger.call_count == 3
+    assert len(result.failures) == 1
+    # Backoff of 5s then 10s, and none once the attempts are used up
+    assert clock.slept == 15
+
+def test_batch_does_not_retry_client_errors():
+    trigger = Mock(side_effect=BadRequestError())
+
+    result = BatchTrigger(trigger, max_concurrency=1, rate_per_second=100).run([{'pipeline_name': 'p'}])
+
+    assert trigger.call_count == 1
+    assert len(result.failures) == 1
+    assert not result.runs
+
+def test_batch_respects_max_concurrency():
+    import threading
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def trigger(item):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.pop()
+        return 'run'
+
+    BatchTrigger(trigger, max_concurrency=3, rate_per_second=1000, burst=100).run(
+        [{'pipeline_name': str(i)} for i in range(12)]
+    )
+
+    assert max(peak) <= 3
@@ -0,0 +1,104 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import Mock
+from orchestrator.cluster_pool import ClusterPool
+from orchestrator.fakes import FakeWorkspaceClient
+
+class Clock:
+    def __init__(self, now=1704067200.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def make_pool(running=(), stopped=(), **kwargs):
+    client = FakeWorkspaceClient(run_duration=60)
+    for cluster_id in running:
+        client.clusters.add(cluster_id, running=True)
+    for cluster_id in stopped:
+        client.clusters.add(cluster_id)
+    kwargs.setdefault('clock', Clock())
+    return client, ClusterPool(client, list(running) + list(stopped), **kwargs)
+
+def test_spreads_runs_over_warm_clusters_before_starting_others():
+    client, pool = make_pool(running=['a', 'b'], stopped=['c'], max_runs_per_cluster=2)
+
+    chosen = [pool.acquire() for _ in range(4)]
+
+    assert sorted(chosen) == ['a', 'a', 'b', 'b']
+    assert client.clusters.starts == 0
+    # Both warm clusters are full, so the next run starts the stopped one
+    assert pool.acquire() == 'c'
+    assert client.clusters.starts == 1
+
+def test_load_comes_from_active_runs():
+    client, pool = make_pool(running=['a', 'b'], max_runs_per_cluster=4, state_ttl=0)
+    client.jobs.create(name='job', tasks=[type('Task', (), {'existing_cluster_id': 'a'})()])
+    for _ in range(3):
+        client.jobs.run_now(1000)
+
+    assert pool.acquire() == 'b'
+
+def test_load_counts_each_task_cluster():
+    client = Mock()
+    client.clusters.get.side_effect = lambda cluster_id: Mock(state='RUNNING')
+    task = lambda cluster_id, state='RUNNING': Mock(cluster_instance=Mock(cluster_id=cluster_id),
+                                                    state=Mock(life_cycle_state=state))
+    client.jobs.list_runs.return_value = [
+        Mock(cluster_instance=None, tasks=[task('a'), task('a'), task('b', state='TERMINATED')]),
+    ]
+    pool = ClusterPool(client, ['a', 'b'], clock=Clock())
+
+    assert pool.acquire() == 'b'
+    client.jobs.list_runs.assert_called_once_with(active_only=True, expand_tasks=True)
+    assert pool.stats()['a']['load'] == 2
+
+def test_terminating_clusters_are_not_started():
+    states = {'a': 'RUNNING', 'b': 'TERMINATING', 'c': 'TERMINATED'}
+    client = Mock()
+    client.clusters.get.side_effect = lambda cluster_id: Mock(state=states[cluster_id])
+    client.jobs.list_runs.return_value = []
+    pool = ClusterPool(client, ['a', 'b', 'c'], max_runs_per_cluster=1, clock=Clock())
+
+    assert [pool.acquire(), pool.acquire()] == ['a', 'c']
+    client.clusters.start.assert_called_once_with('c')
+    states['c'] = 'PENDING'
+    assert pool.prewarm(3) == []
+
+def test_all_full_queues_on_least_loaded():
+    _, pool = make_pool(running=['a'], max_runs_per_cluster=1)
+
+    assert [pool.acquire(), pool.acquire()] == ['a', 'a']
+
+def test_prewarm_uses_peak_load_for_the_hour():
+    clock = Clock(datetime(2024, 1, 1, 2, 10, tzinfo=timezone.utc).timestamp())
+    client, pool = make_pool(running=['a'], stopped=['b', 'c'], max_runs_per_cluster=2, clock=clock)
+    for _ in range(4):
+        pool.acquire()
+    client.clusters.delete('a')
+    client.clusters.delete('b')
+
+    started = pool.prewarm_for(datetime(2024, 1, 2, 2, 0, tzinfo=timezone.utc))
+
+    assert pool.expected_runs(datetime(2024, 1, 2, 2, 0, tzinfo=timezone.utc)) == 4
+    assert len(started) == 2
+    # No history for this hour: keep one cluster warm
+    assert pool.prewarm_for(datetime(2024, 1, 2, 9, 0, tzinfo=timezone.utc)) == []
+
+def test_terminates_idle_clusters_beyond_min_warm():
+    clock = Clock()
+    client, pool = make_pool(running=['a', 'b', 'c'], idle_timeout=600, min_warm=1, state_ttl=0, clock=clock)
+    pool.acquire()
+    clock.now += 300
+    assert pool.terminate_idle() == []
+
+    clock.now += 600
+    stopped = pool.terminate_idle()
+
+    assert len(stopped) == 2
+    assert client.clusters.terminations == 2
+    assert [state['state'] for state in pool.stats().values()].count('RUNNING') == 1
+
+def test_requires_clusters():
+    with pytest.raises(ValueError):
+        ClusterPool(FakeWorkspaceClient(), [])
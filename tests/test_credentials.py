@@ -0,0 +1,76 @@
+import json
+import os
+import time
+import pytest
+from unittest.mock import Mock
+from azure.core.credentials import AccessToken
+from orchestrator.credentials import PersistentTokenCredential
+
+SCOPE = 'https://management.azure.com/.default'
+
+@pytest.fixture
+def inner_credential():
+    credential = Mock()
+    credential.get_token.return_value = AccessToken('token-1', int(time.time()) + 3600)
+    return credential
+
+def test_token_reused_until_expiry(inner_credential, tmp_path):
+    factory = Mock(return_value=inner_credential)
+    credential = PersistentTokenCredential(factory, tmp_path / 'tokens.json')
+
+    assert credential.get_token(SCOPE).token == 'token-1'
+    assert credential.get_token(SCOPE).token == 'token-1'
+
+    factory.assert_called_once()
+    inner_credential.get_token.assert_called_once_with(SCOPE)
+
+def test_cache_is_shared_across_processes(inner_credential, tmp_path):
+    cache_path = tmp_path / 'tokens.json'
+    PersistentTokenCredential(Mock(return_value=inner_credential), cache_path).get_token(SCOPE)
+
+    factory = Mock()
+    token = PersistentTokenCredential(factory, cache_path).get_token(SCOPE)
+
+    assert token.token == 'token-1'
+    factory.assert_not_called()
+    assert os.stat(cache_path).st_mode & 0o777 == 0o600
+
+def test_token_near_expiry_is_refreshed(inner_credential, tmp_path):
+    cache_path = tmp_path / 'tokens.json'
+    cache_path.write_text(json.dumps({'app|||' + SCOPE: {'token': 'stale', 'expires_on': int(time.time()) + 60}}))
+
+    token = PersistentTokenCredential(Mock(return_value=inner_credential), cache_path, refresh_margin=300,
+                                      identity='app').get_token(SCOPE)
+
+    assert token.token == 'token-1'
+    inner_credential.get_token.assert_called_once()
+
+def test_corrupt_cache_is_ignored(inner_credential, tmp_path):
+    cache_path = tmp_path / 'tokens.json'
+    cache_path.write_text('not json')
+
+    token = PersistentTokenCredential(Mock(return_value=inner_credential), cache_path).get_token(SCOPE)
+
+    assert token.token == 'token-1'
+
+def test_claims_challenge_bypasses_cached_token(inner_credential, tmp_path):
+    credential = PersistentTokenCredential(Mock(return_value=inner_credential), tmp_path / 'tokens.json')
+    credential.get_token(SCOPE, enable_cae=True)
+    inner_credential.get_token.return_value = AccessToken('token-2', int(time.time()) + 3600)
+
+    # The cached token was revoked; the challenge must reach the credential
+    assert credential.get_token(SCOPE, enable_cae=True, claims='{"access_token": {}}').token == 'token-2'
+    assert credential.get_token(SCOPE, enable_cae=True).token == 'token-2'
+    assert inner_credential.get_token.call_count == 2
+
+def test_cache_is_kept_per_identity(inner_credential, tmp_path, monkeypatch):
+    cache_path = tmp_path / 'tokens.json'
+    monkeypatch.setenv('AZURE_CLIENT_ID', 'app-1')
+    PersistentTokenCredential(Mock(return_value=inner_credential), cache_path).get_token(SCOPE)
+
+    monkeypatch.setenv('AZURE_CLIENT_ID', 'app-2')
+    other = Mock()
+    other.get_token.return_value = AccessToken('token-2', int(time.time()) + 3600)
+
+    assert PersistentTokenCredential(Mock(return_value=other), cache_path).get_token(SCOPE).token == 'token-2'
+    assert PersistentTokenCredential(Mock(), cache_path, identity='app-1').get_token(SCOPE).token == 'token-1'
@@ -0,0 +1,83 @@
+import pytest
+from email.mime.text import MIMEText
+from orchestrator.batch_trigger import BatchTrigger
+from orchestrator.fakes import (
+    FakeDataFactoryClient, FakeHttpError, FakeSlackClient, FakeSMTP, FakeWorkspaceClient, FaultProfile
+)
+from orchestrator.job_cache import JobDefinitionCache
+from orchestrator.retry_logic import get_retry_after, is_throttled
+from orchestrator.run_tracker import RunFailedError, RunTracker
+
+def test_throttled_calls_look_like_service_errors():
+    client = FakeDataFactoryClient(FaultProfile(throttle_rate=1.0, retry_after=3))
+
+    with pytest.raises(FakeHttpError) as exc_info:
+        client.pipelines.create_run('rg', 'factory', 'pipeline')
+
+    assert is_throttled(exc_info.value)
+    assert get_retry_after(exc_info.value) == 3.0
+
+def test_fault_profile_is_reproducible():
+    def failures(seed):
+        profile = FaultProfile(error_rate=0.5, seed=seed)
+        outcomes = []
+        for _ in range(20):
+            try:
+                profile.apply('call')
+                outcomes.append(True)
+            except FakeHttpError:
+                outcomes.append(False)
+        return outcomes
+
+    assert failures(7) == failures(7)
+    assert not all(failures(7))
+
+def test_batch_trigger_recovers_from_fake_throttling():
+    client = FakeDataFactoryClient(FaultProfile(throttle_rate=0.3, retry_after=0.01, seed=1))
+    batch = BatchTrigger(
+        lambda item: client.pipelines.create_run('rg', 'factory', item).run_id,
+        max_concurrency=4, rate_per_second=1000, default_backoff=0.01, max_attempts=10
+    )
+
+    result = batch.run([f"pipeline_{i}" for i in range(20)])
+
+    assert len(result.runs) == 20
+    assert result.throttled > 0
+
+def test_run_tracker_against_fake_adf():
+    client = FakeDataFactoryClient(run_duration=0.05)
+    client.pipeline_runs.page_size = 2
+    tracker = RunTracker(adf_client=client, resource_group='rg', factory_name='factory', min_interval=0.01)
+
+    runs = [
+        tracker.track_adf(client.pipelines.create_run('rg', 'factory', 'copy').run_id, pipeline_name='copy')
+        for _ in range(5)
+    ]
+
+    for run in runs:
+        assert tracker.wait(run, timeout=5).succeeded
+
+def test_run_tracker_reports_fake_databricks_failures():
+    client = FakeWorkspaceClient(run_duration=0.02, failure_rate=1.0)
+    cache = JobDefinitionCache(client)
+    job_id = cache.get_or_create('job', [])
+    tracker = RunTracker(databricks_client=client, min_interval=0.01)
+
+    run = tracker.track_databricks(client.jobs.run_now(job_id).run_id)
+
+    with pytest.raises(RunFailedError):
+        tracker.wait(run, timeout=5)
+    assert cache.get_or_create('job', []) == job_id
+
+def test_fake_smtp_and_slack_record_messages():
+    smtp = FakeSMTP.install()
+    with smtp('smtp.example.com', 587) as server:
+        server.starttls()
+        server.login('user', 'password')
+        server.send_message(MIMEText('body'))
+    slack = FakeSlackClient()
+    slack.chat_postMessage(channel='#alerts', text='hello')
+
+    assert len(smtp.sent) == 1 and smtp.connections == 1
+    assert FakeSMTP.sent == []
+    assert slack.messages == [{'channel': '#alerts', 'text': 'hello'}]
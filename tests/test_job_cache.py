@@ -0,0 +1,83 @@
+import json
+import pytest
+from unittest.mock import MagicMock, Mock
+from databricks.sdk.service.jobs import NotebookTask, Task
+from orchestrator.job_cache import SETTINGS_HASH_TAG, JobDefinitionCache, settings_hash
+
+class MissingJobError(Exception):
+    error_code = 'RESOURCE_DOES_NOT_EXIST'
+
+def notebook_tasks(path='/notebooks/transform'):
+    return [Task(task_key='notebook', existing_cluster_id='cluster', notebook_task=NotebookTask(notebook_path=path))]
+
+def workspace_job(job_id, digest):
+    return Mock(job_id=job_id, settings=Mock(tags={SETTINGS_HASH_TAG: digest}))
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.jobs.list.return_value = []
+    client.jobs.create.return_value = Mock(job_id=101)
+    return client
+
+def test_settings_hash_is_stable_and_sensitive():
+    assert settings_hash('job', notebook_tasks()) == settings_hash('job', notebook_tasks())
+    assert settings_hash('job', notebook_tasks()) != settings_hash('job', notebook_tasks('/other'))
+
+def test_creates_once_per_settings(client):
+    cache = JobDefinitionCache(client)
+
+    assert cache.get_or_create('job', notebook_tasks()) == 101
+    assert cache.get_or_create('job', notebook_tasks()) == 101
+
+    client.jobs.create.assert_called_once()
+    assert client.jobs.create.call_args.kwargs['tags'] == {SETTINGS_HASH_TAG: settings_hash('job', notebook_tasks())}
+
+def test_index_persists_across_instances(client, tmp_path):
+    index_file = tmp_path / 'jobs.json'
+    JobDefinitionCache(client, index_path=index_file).get_or_create('job', notebook_tasks())
+    digest = settings_hash('job', notebook_tasks())
+    client.jobs.get.return_value = workspace_job(101, digest)
+
+    job_id = JobDefinitionCache(client, index_path=index_file).get_or_create('job', notebook_tasks())
+
+    assert job_id == 101
+    assert json.loads(index_file.read_text())[digest]['job_id'] == 101
+    client.jobs.create.assert_called_once()
+    client.jobs.get.assert_called_once_with(101)
+
+def test_recreates_job_deleted_in_workspace(client, tmp_path):
+    index_file = tmp_path / 'jobs.json'
+    JobDefinitionCache(client, index_path=index_file).get_or_create('job', notebook_tasks())
+    client.jobs.get.side_effect = MissingJobError()
+    client.jobs.create.return_value = Mock(job_id=202)
+
+    job_id = JobDefinitionCache(client, index_path=index_file).get_or_create('job', notebook_tasks())
+
+    assert job_id == 202
+    assert client.jobs.create.call_count == 2
+
+def test_adopts_matching_workspace_job(client):
+    digest = settings_hash('job', notebook_tasks())
+    client.jobs.list.return_value = [workspace_job(55, 'stale'), workspace_job(77, digest)]
+
+    assert JobDefinitionCache(client).get_or_create('job', notebook_tasks()) == 77
+    client.jobs.create.assert_not_called()
+
+def test_invalidate_forgets_job(client):
+    cache = JobDefinitionCache(client)
+    cache.get_or_create('job', notebook_tasks())
+    cache.invalidate(101)
+    client.jobs.create.return_value = Mock(job_id=303)
+
+    assert cache.get_or_create('job', notebook_tasks()) == 303
+
+def test_extra_settings_are_part_of_definition(client):
+    cache = JobDefinitionCache(client)
+
+    cache.get_or_create('job', notebook_tasks(), max_concurrent_runs=None)
+    cache.get_or_create('job', notebook_tasks(), max_concurrent_runs=4)
+
+    assert client.jobs.create.call_count == 2
+    assert client.jobs.create.call_args.kwargs['max_concurrent_runs'] == 4
+    assert settings_hash('job', notebook_tasks(), max_concurrent_runs=None) == settings_hash('job', notebook_tasks())
@@ -0,0 +1,111 @@
+import pytest
+from datetime import date
+from orchestrator.local_engine import LocalTransform, available, input_size
+
+
+def write_source(path, rows):
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    path.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows), path / 'part-0.parquet')
+    return path
+
+
+def read_target(path):
+    ds = pytest.importorskip('pyarrow.dataset')
+    return ds.dataset(str(path), format='parquet', partitioning='hive').to_table().to_pylist()
+
+
+ROWS = [
+    {'id': 1, 'value': 'a', 'date': date(2024, 1, 1)},
+    {'id': 1, 'value': 'a', 'date': date(2024, 1, 1)},
+    {'id': 2, 'value': 'b', 'date': date(2024, 1, 2)},
+    {'id': 3, 'value': 'c', 'date': date(2024, 2, 1)},
+]
+
+
+def test_input_size_counts_data_files_only(tmp_path):
+    (tmp_path / 'year=2024').mkdir()
+    (tmp_path / 'year=2024' / 'part-0.parquet').write_bytes(b'x' * 100)
+    (tmp_path / '_delta_log').mkdir()
+    (tmp_path / '_delta_log' / '00000.json').write_bytes(b'x' * 50)
+    (tmp_path / '_SUCCESS').write_bytes(b'')
+
+    assert input_size(tmp_path) == 100
+    assert input_size(tmp_path / 'missing') is None
+    assert input_size('dbfs:/mnt/data/source') is None
+    assert input_size('abfss://data@account.dfs.core.windows.net/source') is None
+
+
+def test_available_requires_packages_for_engine_and_format(monkeypatch):
+    monkeypatch.setattr('orchestrator.local_engine._installed', lambda module: module == 'pyarrow')
+
+    assert available()
+    assert not available(engine='duckdb')
+    assert not available(output_format='delta')
+
+
+def test_rejects_unknown_engine_and_format():
+    with pytest.raises(ValueError):
+        LocalTransform('src', 'dst', engine='spark')
+    with pytest.raises(ValueError):
+        LocalTransform('src', 'dst', output_format='csv')
+
+
+@pytest.mark.parametrize('engine', ['pyarrow', 'duckdb'])
+def test_writes_deduplicated_partitioned_parquet(tmp_path, engine):
+    if engine == 'duckdb':
+        pytest.importorskip('duckdb')
+    source = write_source(tmp_path / 'source', ROWS)
+
+    result = LocalTransform(source, tmp_path / 'target', engine=engine, batch_size=2).run()
+
+    rows = read_target(tmp_path / 'target')
+    assert result['engine'] == engine
+    assert result['rows'] == 3 and result['partitions'] == 3
+    assert sorted((r['id'], r['year'], r['month'], r['day']) for r in rows) == [
+        (1, 2024, 1, 1), (2, 2024, 1, 2), (3, 2024, 2, 1)
+    ]
+    assert all(r['processed_date'] is not None for r in rows)
+
+
+@pytest.mark.parametrize('engine', ['pyarrow', 'duckdb'])
+def test_string_dates_are_parsed_for_partitions(tmp_path, engine):
+    if engine == 'duckdb':
+        pytest.importorskip('duckdb')
+    rows = [dict(row, date=row['date'].isoformat()) for row in ROWS]
+
+    LocalTransform(write_source(tmp_path / 'source', rows), tmp_path / 'target', engine=engine).run()
+
+    assert sorted((r['id'], r['year'], r['month'], r['day']) for r in read_target(tmp_path / 'target')) == [
+        (1, 2024, 1, 1), (2, 2024, 1, 2), (3, 2024, 2, 1)
+    ]
+
+
+def test_unparseable_string_dates_are_rejected(tmp_path):
+    source = write_source(tmp_path / 'source', [{'id': 1, 'date': 'yesterday'}])
+
+    with pytest.raises(ValueError, match="not ISO dates"):
+        LocalTransform(source, tmp_path / 'target', engine='pyarrow').run()
+
+
+def test_dynamic_overwrite_keeps_untouched_partitions(tmp_path):
+    target = tmp_path / 'target'
+    LocalTransform(write_source(tmp_path / 'v1', ROWS), target, engine='pyarrow').run()
+
+    newer = [{'id': 4, 'value': 'd', 'date': date(2024, 1, 1)}]
+    LocalTransform(write_source(tmp_path / 'v2', newer), target, engine='pyarrow').run()
+
+    assert sorted(r['id'] for r in read_target(target)) == [2, 3, 4]
+
+
+def test_date_range_replaces_the_whole_range(tmp_path):
+    target = tmp_path / 'target'
+    LocalTransform(write_source(tmp_path / 'v1', ROWS), target, engine='pyarrow').run()
+
+    # 2024-01-02 has no rows left in the source, so its partition is removed
+    source = write_source(tmp_path / 'v2', [r for r in ROWS if r['id'] != 2])
+    result = LocalTransform(source, target, start_date='2024-01-01', end_date='2024-01-31', engine='pyarrow').run()
+
+    assert result['partitions'] == 1
+    assert sorted(r['id'] for r in read_target(target)) == [1, 3]
@@ -0,0 +1,125 @@
+import json
+import logging
+import pytest
+import structlog
+from orchestrator.logger import setup_logger, shutdown_logging
+
+@pytest.fixture
+def log_config(tmp_path):
+    return {
+        'logging': {
+            'level': 'INFO',
+            'format': 'json',
+            'output_file': str(tmp_path / 'logs' / 'pipeline.log')
+        }
+    }
+
+@pytest.fixture(autouse=True)
+def reset_logging():
+    yield
+    shutdown_logging()
+    structlog.reset_defaults()
+
+def test_setup_logger_is_idempotent(log_config):
+    root_logger = logging.getLogger()
+    before = len(root_logger.handlers)
+
+    setup_logger(log_config)
+    after_first = len(root_logger.handlers)
+    setup_logger(log_config)
+    setup_logger(log_config)
+
+    assert after_first == before + 2
+    assert len(root_logger.handlers) == after_first
+
+def test_changing_config_replaces_handlers(log_config, tmp_path):
+    root_logger = logging.getLogger()
+    before = len(root_logger.handlers)
+    setup_logger(log_config)
+
+    log_config['logging']['mode'] = 'queue'
+    setup_logger(log_config)
+
+    assert len(root_logger.handlers) == before + 1
+
+def test_queue_mode_writes_json_lines(log_config):
+    log_config['logging']['mode'] = 'queue'
+    logger = setup_logger(log_config)
+
+    logger.info("stage_complete", stage="ingest", duration=1.5)
+    logger.debug("filtered_out")
+    shutdown_logging()
+
+    with open(log_config['logging']['output_file']) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 1
+    assert lines[0]['event'] == 'stage_complete'
+    assert lines[0]['stage'] == 'ingest'
+    assert 'timestamp' in lines[0]
+
+def test_queue_mode_rotates_by_size(log_config, tmp_path):
+    log_config['logging'].update(mode='queue', rotation={'when': 'size', 'max_bytes': 2000, 'backup_count': 3})
+    logger = setup_logger(log_config)
+
+    for i in range(200):
+        logger.info("event", index=i, padding="x" * 50)
+    shutdown_logging()
+
+    rotated = list((tmp_path / 'logs').glob('pipeline.log.*'))
+    assert 1 <= len(rotated) <= 3
+
+def test_queue_mode_timestamp_matches_sync_format(log_config):
+    log_config['logging']['mode'] = 'queue'
+    setup_logger(log_config).info("event")
+    shutdown_logging()
+
+    with open(log_config['logging']['output_file']) as f:
+        timestamp = json.loads(f.readline())['timestamp']
+    assert timestamp.endswith('Z') and 'T' in timestamp
+
+def test_queue_mode_captures_exception_on_calling_thread(log_config):
+    log_config['logging']['mode'] = 'queue'
+    logger = setup_logger(log_config)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("operation_failed")
+    shutdown_logging()
+
+    with open(log_config['logging']['output_file']) as f:
+        entry = json.loads(f.readline())
+    assert 'ValueError: boom' in entry['exception']
+
+def test_queue_mode_reaches_loggers_bound_before_reconfiguration(log_config):
+    log_config['logging']['mode'] = 'queue'
+    log_config['logging']['level'] = 'WARNING'
+    setup_logger(log_config)
+    module_logger = structlog.get_logger()
+    module_logger.warning("first_setup")
+
+    # e.g. a config reload lowering the level
+    log_config['logging']['level'] = 'INFO'
+    setup_logger(log_config)
+    module_logger.info("after_reload")
+    shutdown_logging()
+    module_logger.info("after_shutdown")
+
+    with open(log_config['logging']['output_file']) as f:
+        events = [json.loads(line)['event'] for line in f]
+    assert events == ['first_setup', 'after_reload']
+
+def test_sync_mode_reaches_loggers_cached_in_queue_mode(log_config, capsys):
+    log_config['logging']['mode'] = 'queue'
+    setup_logger(log_config)
+    module_logger = structlog.get_logger()
+    module_logger.info("queued")
+
+    log_config['logging']['mode'] = 'sync'
+    setup_logger(log_config)
+    module_logger.info("printed", stage="ingest")
+
+    # The queue listener's console handler also wrote the first event to stdout
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line['event'] for line in lines] == ['queued', 'printed']
+    assert lines[1]['stage'] == 'ingest'
+    assert lines[1]['timestamp'].endswith('Z')
@@ -1,6 +1,11 @@
+import json
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, MagicMock, Mock, patch, mock_open
+from orchestrator.fakes import FakeDataFactoryClient, FakeHttpError, FakeWorkspaceClient
+from orchestrator.retry_logic import RetryPolicy
 from orchestrator.trigger_pipeline import PipelineOrchestrator
+from orchestrator.stage_executor import StageExecutionError
+from orchestrator.telemetry import setup_telemetry
 
 @pytest.fixture
 def mock_config():
@@ -46,8 +51,13 @@ def mock_config():
 
 @pytest.fixture
 def mock_orchestrator(mock_config):
-    with patch('yaml.safe_load', return_value=mock_config):
-        return PipelineOrchestrator('test_config.yaml')
+    with patch('builtins.open', mock_open()), \
+         patch('yaml.safe_load', return_value=mock_config):
+        orchestrator = PipelineOrchestrator('test_config.yaml')
+    # Clients are lazy, so tests can swap in mocks before first use
+    orchestrator.adf_client = MagicMock()
+    orchestrator.databricks_client = MagicMock()
+    return orchestrator
 
 def test_trigger_adf_pipeline(mock_orchestrator):
     # Mock ADF client response
@@ -66,12 +76,14 @@ def test_run_databricks_notebook(mock_orchestrator):
     mock_job = Mock()
     mock_job.job_id = 'test-job-id'
     mock_orchestrator.databricks_client.jobs.create.return_value = mock_job
+    mock_orchestrator.databricks_client.jobs.run_now.return_value = Mock(run_id='test-run-id')
 
     # Test notebook execution
-    job_id = mock_orchestrator.run_databricks_notebook()
+    run_id = mock_orchestrator.run_databricks_notebook()
     
-    assert job_id == 'test-job-id'
+    assert run_id == 'test-run-id'
     mock_orchestrator.databricks_client.jobs.create.assert_called_once()
+    mock_orchestrator.databricks_client.jobs.run_now.assert_called_once_with(job_id='test-job-id', idempotency_token=ANY)
 
 def test_execute_pipeline_success(mock_orchestrator):
     # Mock successful pipeline execution
@@ -87,10 +99,334 @@ def test_execute_pipeline_success(mock_orchestrator):
 def test_execute_pipeline_failure(mock_orchestrator):
     # Mock pipeline failure
     mock_orchestrator.trigger_adf_pipeline = Mock(side_effect=Exception('Test error'))
+    mock_orchestrator.run_databricks_notebook = Mock()
 
     # Test pipeline failure handling
     with pytest.raises(Exception):
         mock_orchestrator.execute_pipeline()
     
     mock_orchestrator.trigger_adf_pipeline.assert_called_once()
-    mock_orchestrator.run_databricks_notebook.assert_not_called() 
\ No newline at end of file
+    mock_orchestrator.run_databricks_notebook.assert_not_called() 
+
+def test_execute_pipeline_runs_independent_stages_concurrently(mock_orchestrator):
+    import threading
+    barrier = threading.Barrier(2, timeout=5)
+
+    def wait_for_peer(**kwargs):
+        barrier.wait()
+        return 'ok'
+
+    mock_orchestrator.config['stages'] = [
+        {'name': 'copy_a', 'type': 'adf', 'pipeline_name': 'a'},
+        {'name': 'copy_b', 'type': 'adf', 'pipeline_name': 'b'},
+        {'name': 'transform', 'type': 'databricks', 'depends_on': ['copy_a', 'copy_b']},
+    ]
+    mock_orchestrator.trigger_adf_pipeline = Mock(side_effect=wait_for_peer)
+    mock_orchestrator.run_databricks_notebook = Mock(return_value='test-job-id')
+
+    results = mock_orchestrator.execute_pipeline()
+
+    assert results == {'copy_a': 'ok', 'copy_b': 'ok', 'transform': 'test-job-id'}
+    mock_orchestrator.trigger_adf_pipeline.assert_any_call(pipeline_name='a')
+    mock_orchestrator.trigger_adf_pipeline.assert_any_call(pipeline_name='b')
+
+def test_execute_pipeline_skips_downstream_of_failed_stage(mock_orchestrator):
+    mock_orchestrator.config['stages'] = [
+        {'name': 'copy', 'type': 'adf'},
+        {'name': 'transform', 'type': 'databricks', 'depends_on': ['copy']},
+    ]
+    mock_orchestrator.config['execution'] = {'fail_fast': False}
+    mock_orchestrator.trigger_adf_pipeline = Mock(side_effect=Exception('Test error'))
+    mock_orchestrator.run_databricks_notebook = Mock()
+    mock_orchestrator.alert_manager = Mock()
+
+    with pytest.raises(StageExecutionError) as exc_info:
+        mock_orchestrator.execute_pipeline()
+
+    assert exc_info.value.skipped == ['transform']
+    mock_orchestrator.run_databricks_notebook.assert_not_called()
+    subjects = [call.args[0] for call in mock_orchestrator.alert_manager.send_alert.call_args_list]
+    assert subjects == ["Stage Failed: copy", "Stage Skipped: transform", "Pipeline Execution Failed"]
+
+def test_trigger_adf_pipelines_batch(mock_orchestrator):
+    mock_orchestrator.config['adf']['batch'] = {'max_concurrency': 4, 'rate_per_second': 1000}
+    mock_orchestrator.adf_client.pipelines.create_run.side_effect = \
+        lambda **kwargs: Mock(run_id=f"run-{kwargs['pipeline_name']}")
+
+    result = mock_orchestrator.trigger_adf_pipelines(
+        ['copy_a', {'pipeline_name': 'copy_b', 'parameters': {'day': '2024-01-01'}}]
+    )
+
+    assert sorted(run_id for _, run_id in result.runs) == ['run-copy_a', 'run-copy_b']
+    mock_orchestrator.adf_client.pipelines.create_run.assert_any_call(
+        resource_group_name='test-resource-group',
+        factory_name='test-factory',
+        pipeline_name='copy_b',
+        parameters={'day': '2024-01-01'}
+    )
+
+def test_execute_pipeline_waits_for_runs_before_success_alert(mock_orchestrator):
+    mock_orchestrator.config['monitoring'] = {'wait_for_completion': True}
+    mock_orchestrator.trigger_adf_pipeline = Mock(return_value='test-run-id')
+    mock_orchestrator.run_databricks_notebook = Mock(return_value=42)
+    mock_orchestrator.wait_for_run = Mock()
+
+    mock_orchestrator.execute_pipeline()
+
+    assert mock_orchestrator.wait_for_run.call_args_list == [
+        (('adf', 'test-run-id'), {'stage': 'adf_pipeline', 'pipeline_name': 'test-pipeline'}),
+        (('databricks', 42), {'stage': 'databricks_notebook'}),
+    ]
+
+def test_clients_are_created_lazily(mock_config):
+    with patch('builtins.open', mock_open()), \
+         patch('yaml.safe_load', return_value=mock_config):
+        orchestrator = PipelineOrchestrator('test_config.yaml')
+
+    assert 'adf_client' not in orchestrator.__dict__
+    assert 'databricks_client' not in orchestrator.__dict__
+    assert 'credential' not in orchestrator.__dict__
+
+    with patch('databricks.sdk.WorkspaceClient') as mock_workspace:
+        assert orchestrator.databricks_client is mock_workspace.return_value
+
+    assert 'adf_client' not in orchestrator.__dict__
+    report = orchestrator.startup_report()
+    assert {'load_config', 'setup_logger', 'databricks_client', 'total'} <= set(report)
+
+
+def test_run_databricks_notebook_reuses_job_definition(mock_orchestrator):
+    jobs = mock_orchestrator.databricks_client.jobs
+    jobs.create.return_value = Mock(job_id='test-job-id')
+    jobs.run_now.side_effect = [Mock(run_id=1), Mock(run_id=2)]
+
+    mock_orchestrator.run_databricks_notebook(base_parameters={'run_date': '2024-01-01'})
+    mock_orchestrator.run_databricks_notebook(base_parameters={'run_date': '2024-01-02'})
+
+    jobs.create.assert_called_once()
+    jobs.run_now.assert_called_with(job_id='test-job-id', notebook_params={'run_date': '2024-01-02'},
+                                    idempotency_token=ANY)
+
+
+def test_run_databricks_notebook_submit_mode(mock_orchestrator):
+    mock_orchestrator.config['databricks']['launch_mode'] = 'submit'
+    jobs = mock_orchestrator.databricks_client.jobs
+    jobs.submit.return_value = Mock(run_id='submitted-run')
+
+    run_id = mock_orchestrator.run_databricks_notebook(base_parameters={'run_date': '2024-01-01'})
+
+    assert run_id == 'submitted-run'
+    jobs.create.assert_not_called()
+    task = jobs.submit.call_args.kwargs['tasks'][0]
+    assert task.notebook_task.base_parameters == {'run_date': '2024-01-01'}
+
+def test_backfill_runs_one_notebook_run_per_chunk(mock_orchestrator):
+    mock_orchestrator.run_databricks_notebook = Mock(side_effect=lambda **kwargs: kwargs['base_parameters']['start_date'])
+    mock_orchestrator.run_tracker = Mock()
+    mock_orchestrator.alert_manager.send_alert = Mock()
+
+    result = mock_orchestrator.backfill('2024-01-20', '2024-03-05', chunk='month', max_in_flight=2)
+
+    params = sorted(call.kwargs['base_parameters']['start_date'] + '..' + call.kwargs['base_parameters']['end_date']
+                    for call in mock_orchestrator.run_databricks_notebook.call_args_list)
+    assert params == ['2024-01-20..2024-01-31', '2024-02-01..2024-02-29', '2024-03-01..2024-03-05']
+    assert mock_orchestrator.run_tracker.wait.call_count == 3
+    assert result.summary()['completed'] == 3
+    assert mock_orchestrator.alert_manager.send_alert.call_args.kwargs['is_error'] is False
+
+def test_run_databricks_notebook_applies_default_parameters(mock_orchestrator):
+    mock_orchestrator.config['databricks']['parameters'] = {'source_path': '/src', 'target_path': '/dst'}
+    jobs = mock_orchestrator.databricks_client.jobs
+    jobs.create.return_value = Mock(job_id='test-job-id')
+    jobs.run_now.return_value = Mock(run_id=1)
+
+    mock_orchestrator.run_databricks_notebook(base_parameters={'target_path': '/override'})
+
+    jobs.run_now.assert_called_once_with(
+        job_id='test-job-id', notebook_params={'source_path': '/src', 'target_path': '/override'},
+        idempotency_token=ANY
+    )
+
+def test_execute_pipeline_emits_stage_spans(mock_config, tmp_path):
+    mock_config['telemetry'] = {'enabled': True, 'otlp_file': str(tmp_path / 'spans.jsonl')}
+    with patch('builtins.open', mock_open()), \
+         patch('yaml.safe_load', return_value=mock_config):
+        orchestrator = PipelineOrchestrator('test_config.yaml')
+    orchestrator.trigger_adf_pipeline = Mock(return_value='adf-run')
+    orchestrator.run_databricks_notebook = Mock(return_value='db-run')
+    try:
+        orchestrator.execute_pipeline()
+        spans = orchestrator.telemetry.spans
+        assert not spans  # exported at the end of the run
+        lines = (tmp_path / 'spans.jsonl').read_text().splitlines()
+    finally:
+        setup_telemetry({})
+
+    exported = json.loads(lines[0])['resourceSpans'][0]['scopeSpans'][0]['spans']
+    root = next(span for span in exported if span['name'] == 'pipeline')
+    stages = [span for span in exported if span['name'] == 'stage']
+    assert len(stages) == 2
+    assert all(span['parentSpanId'] == root['spanId'] for span in stages)
+
+def test_reload_config_keeps_clients_with_unchanged_settings(mock_orchestrator, mock_config):
+    adf_client = mock_orchestrator.adf_client
+    retry_policy = mock_orchestrator.retry_policy
+    new_config = json.loads(json.dumps(mock_config))
+    new_config['databricks']['workspace_url'] = 'https://other-workspace.cloud.databricks.com'
+    new_config['adf']['pipeline_name'] = 'renamed-pipeline'
+
+    with patch('builtins.open', mock_open()), \
+         patch('yaml.safe_load', return_value=new_config):
+        changed = mock_orchestrator.reload_config()
+
+    assert changed == {'adf', 'databricks'}
+    assert mock_orchestrator.adf_client is adf_client
+    assert 'databricks_client' not in vars(mock_orchestrator)
+    assert mock_orchestrator.retry_policy is retry_policy
+    assert mock_orchestrator.config['adf']['pipeline_name'] == 'renamed-pipeline'
+
+def test_execute_pipeline_resumes_after_partial_failure(mock_orchestrator, tmp_path):
+    mock_orchestrator.config['state_store'] = {'enabled': True, 'path': str(tmp_path / 'state.db')}
+    mock_orchestrator.alert_manager = Mock()
+    mock_orchestrator.adf_client.pipelines.create_run.return_value = Mock(run_id='adf-run-1')
+    mock_orchestrator.databricks_client.jobs.create.return_value = Mock(job_id=7)
+    mock_orchestrator.databricks_client.jobs.run_now.side_effect = [ValueError("bad notebook parameter"), Mock(run_id=99)]
+
+    with pytest.raises(StageExecutionError):
+        mock_orchestrator.execute_pipeline()
+    results = mock_orchestrator.execute_pipeline()
+
+    # The ADF copy succeeded the first time, so only the notebook runs again
+    assert results == {'adf_pipeline': 'adf-run-1', 'databricks_notebook': 99}
+    mock_orchestrator.adf_client.pipelines.create_run.assert_called_once()
+
+def test_failed_adf_run_is_recovered_on_resume(mock_orchestrator, tmp_path):
+    mock_orchestrator.config['state_store'] = {'enabled': True, 'path': str(tmp_path / 'state.db')}
+    mock_orchestrator.alert_manager = Mock()
+    mock_orchestrator.config['monitoring'] = {'wait_for_completion': True}
+    mock_orchestrator.config['stages'] = [{'name': 'copy', 'type': 'adf'}]
+    mock_orchestrator.adf_client.pipelines.create_run.side_effect = [Mock(run_id='adf-run-1'), Mock(run_id='adf-run-2')]
+    mock_orchestrator.wait_for_run = Mock(side_effect=[RuntimeError("Copy activity failed"), 'Succeeded'])
+
+    with pytest.raises(StageExecutionError):
+        mock_orchestrator.execute_pipeline()
+    assert mock_orchestrator.execute_pipeline() == {'copy': 'adf-run-2'}
+
+    recovery_call = mock_orchestrator.adf_client.pipelines.create_run.call_args_list[1]
+    assert recovery_call.kwargs['reference_pipeline_run_id'] == 'adf-run-1'
+    assert recovery_call.kwargs['is_recovery'] is True
+    assert recovery_call.kwargs['start_from_failure'] is True
+    # resume=False ignores the recorded state
+    mock_orchestrator.adf_client.pipelines.create_run.side_effect = None
+    mock_orchestrator.wait_for_run.side_effect = None
+    mock_orchestrator.execute_pipeline(resume=False)
+    assert 'is_recovery' not in mock_orchestrator.adf_client.pipelines.create_run.call_args.kwargs
+
+def _lose_first_response(create):
+    """Make the first call succeed on the service side but fail on the client, like a timed-out response."""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        response = create(*args, **kwargs)
+        calls.append(response)
+        if len(calls) == 1:
+            raise FakeHttpError(504, "Gateway timeout")
+        return response
+    return wrapper
+
+def test_retried_adf_trigger_adopts_run_from_lost_response(mock_orchestrator):
+    mock_orchestrator.config['adf']['idempotency_parameter'] = 'datamove_trigger_key'
+    mock_orchestrator.retry_policy = RetryPolicy(max_attempts=3, initial_delay=0)
+    mock_orchestrator.alert_manager = Mock()
+    client = mock_orchestrator.adf_client = FakeDataFactoryClient()
+    client.pipelines.create_run = _lose_first_response(client.pipelines.create_run)
+
+    run_id = mock_orchestrator.trigger_adf_pipeline(parameters={'run_date': '2024-01-02'})
+
+    assert client.runs.ids() == [run_id]
+    _, _, run = client.runs.state(run_id)
+    assert run['parameters']['run_date'] == '2024-01-02'
+
+def test_retried_databricks_run_reuses_idempotency_token(mock_orchestrator):
+    mock_orchestrator.retry_policy = RetryPolicy(max_attempts=3, initial_delay=0)
+    mock_orchestrator.alert_manager = Mock()
+    client = mock_orchestrator.databricks_client = FakeWorkspaceClient()
+    client.jobs.run_now = _lose_first_response(client.jobs.run_now)
+
+    run_id = mock_orchestrator.run_databricks_notebook()
+
+    assert client.runs.ids() == [run_id]
+
+def test_run_databricks_notebook_uses_cluster_pool(mock_orchestrator):
+    mock_orchestrator.config['databricks']['cluster_pool'] = {
+        'enabled': True, 'cluster_ids': ['warm-a', 'warm-b'], 'max_runs_per_cluster': 1
+    }
+    client = mock_orchestrator.databricks_client = FakeWorkspaceClient(run_duration=60)
+    client.clusters.add('warm-a', running=True)
+    client.clusters.add('warm-b', running=True)
+
+    run_ids = [mock_orchestrator.run_databricks_notebook() for _ in range(2)]
+
+    clusters = {client.runs.state(run_id)[2]['cluster_id'] for run_id in run_ids}
+    assert clusters == {'warm-a', 'warm-b'}
+
+def test_retried_notebook_run_takes_one_cluster_slot(mock_orchestrator):
+    mock_orchestrator.config['databricks']['cluster_pool'] = {'enabled': True, 'cluster_ids': ['warm-a']}
+    mock_orchestrator.retry_policy = RetryPolicy.from_config(
+        {'retry': {'max_attempts': 3, 'initial_delay': 0, 'max_delay': 0, 'exponential_base': 2}}
+    )
+    client = mock_orchestrator.databricks_client = FakeWorkspaceClient(run_duration=60)
+    client.clusters.add('warm-a', running=True)
+    run_now = client.jobs.run_now
+    attempts = []
+
+    def flaky_run_now(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) < 3:
+            raise FakeHttpError(503)
+        return run_now(**kwargs)
+
+    client.jobs.run_now = flaky_run_now
+
+    mock_orchestrator.run_databricks_notebook()
+
+    assert len(attempts) == 3
+    assert mock_orchestrator.cluster_pool.stats()['warm-a']['load'] == 1
+
+def test_small_full_mode_transform_runs_locally(mock_orchestrator, tmp_path):
+    (tmp_path / 'part-0.parquet').write_bytes(b'x' * 1024)
+    mock_orchestrator.config['databricks']['local_engine'] = {'enabled': True, 'max_input_bytes': 4096}
+    params = {'source_path': str(tmp_path), 'target_path': str(tmp_path / 'out'), 'mode': 'full'}
+    handler = mock_orchestrator._stage_handler('transform', 'databricks', 'run_databricks_notebook')
+
+    with patch('orchestrator.trigger_pipeline.local_engine_available', return_value=True), \
+         patch('orchestrator.local_engine.LocalTransform.run', return_value={'engine': 'duckdb', 'rows': 3}) as run:
+        run_id = handler(base_parameters=params)
+
+    assert run_id.startswith('local-')
+    run.assert_called_once()
+    mock_orchestrator.databricks_client.jobs.run_now.assert_not_called()
+
+@pytest.mark.parametrize('override', [{'mode': 'incremental'}, {'source_path': 'dbfs:/mnt/data/source'}])
+def test_large_or_incremental_transform_stays_on_databricks(mock_orchestrator, tmp_path, override):
+    (tmp_path / 'part-0.parquet').write_bytes(b'x' * 1024)
+    mock_orchestrator.config['databricks']['local_engine'] = {'enabled': True, 'max_input_bytes': 4096}
+    params = dict({'source_path': str(tmp_path), 'mode': 'full'}, **override)
+
+    with patch('orchestrator.trigger_pipeline.local_engine_available', return_value=True):
+        assert mock_orchestrator._local_transform(base_parameters=params) is None
+        mock_orchestrator.config['databricks']['local_engine']['max_input_bytes'] = 512
+        assert mock_orchestrator._local_transform(base_parameters={'source_path': str(tmp_path)}) is None
+
+def test_stage_runs_are_recorded_in_run_history(mock_orchestrator, tmp_path):
+    mock_orchestrator.config['run_history'] = {'enabled': True, 'path': str(tmp_path / 'history.db')}
+    mock_orchestrator.retry_policy = RetryPolicy(max_attempts=3, initial_delay=0)
+    mock_orchestrator.adf_client.pipelines.create_run.side_effect = [FakeHttpError(503), Mock(run_id='adf-run')]
+    mock_orchestrator.databricks_client.jobs.run_now.return_value = Mock(run_id=42)
+
+    mock_orchestrator.execute_pipeline()
+
+    rows = {row['stage']: row for row in mock_orchestrator.run_history.percentiles(since=0)}
+    assert set(rows) == {'*', 'adf_pipeline', 'databricks_notebook'}
+    assert sum(row['retries'] for row in rows.values()) == 1
+    assert all(row['count'] == 1 and row['failures'] == 0 for row in rows.values())
@@ -1,7 +1,13 @@
 import pytest
 import time
 from unittest.mock import Mock, patch
-from orchestrator.retry_logic import with_retry
+from orchestrator.clock import VirtualClock, use_clock
+from orchestrator.retry_logic import (
+    with_retry, get_retry_after, get_status_code, is_throttled, classify_error,
+    CircuitBreaker, CircuitOpenError, RetryPolicy, FATAL, THROTTLED, TRANSIENT,
+    DeadlineExceeded, DecorrelatedJitter, deadline, remaining_time, retrying
+)
+import asyncio
 
 @pytest.fixture
 def mock_config():
@@ -44,17 +50,16 @@ def test_max_retries_exceeded(mock_config):
     assert mock_func.call_count == mock_config['retry']['max_attempts']
 
 def test_exponential_backoff(mock_config):
-    mock_func = Mock(side_effect=[Exception("Test error"), "success"])
-    start_time = time.time()
-    
-    decorated_func = with_retry(mock_config)(mock_func)
-    decorated_func()
-    
-    elapsed_time = time.time() - start_time
-    
+    mock_func = Mock(side_effect=[Exception("Test error"), Exception("Test error"), "success"])
+
+    with use_clock(VirtualClock()) as clock:
+        decorated_func = with_retry(mock_config)(mock_func)
+        decorated_func()
+
     # With initial_delay=0.1 and exponential_base=2,
-    # the first retry should wait approximately 0.1 seconds
-    assert 0.1 <= elapsed_time <= 0.2
+    # the retries wait 0.1 and then 0.2 seconds
+    assert clock.sleeps == 2
+    assert clock.monotonic() == pytest.approx(0.3)
 
 def test_retry_with_different_config(mock_config):
     # Modify config for this test
@@ -78,4 +83,274 @@ def test_retry_with_logging(mock_config):
         
         assert result == "success"
         assert mock_func.call_count == 2
-        assert mock_logger.error.call_count == 1 
\ No newline at end of file
+        assert mock_logger.error.call_count == 1
+
+def test_get_retry_after_parses_headers():
+    error = Exception("throttled")
+    error.status_code = 429
+    error.response = Mock(headers={'Retry-After': '7'})
+
+    assert is_throttled(error)
+    assert get_status_code(error) == 429
+    assert get_retry_after(error) == 7.0
+
+def test_get_retry_after_prefers_azure_milliseconds_header():
+    error = Exception("throttled")
+    error.response = Mock(headers={'x-ms-retry-after-ms': '1500', 'Retry-After': '2'})
+
+    assert get_retry_after(error) == 1.5
+
+def test_get_retry_after_missing():
+    assert get_retry_after(Exception("no response")) is None
+
+def http_error(status, headers=None):
+    error = Exception(f"HTTP {status}")
+    error.status_code = status
+    error.response = Mock(headers=headers or {})
+    return error
+
+def test_classify_error():
+    assert classify_error(http_error(429)) == THROTTLED
+    assert classify_error(http_error(503)) == TRANSIENT
+    assert classify_error(http_error(400)) == FATAL
+    assert classify_error(http_error(403)) == FATAL
+    assert classify_error(ConnectionError("reset")) == TRANSIENT
+    assert classify_error(ValueError("bad parameter")) == FATAL
+    assert classify_error(Exception("unknown")) == TRANSIENT
+
+def test_classify_databricks_error_codes():
+    error = Exception("limit")
+    error.error_code = 'REQUEST_LIMIT_EXCEEDED'
+    error.retry_after_secs = 3
+    assert classify_error(error) == THROTTLED
+    assert get_retry_after(error) == 3.0
+
+def test_fatal_errors_are_not_retried(mock_config):
+    mock_func = Mock(side_effect=http_error(401))
+
+    with pytest.raises(Exception):
+        with_retry(mock_config)(mock_func)()
+
+    assert mock_func.call_count == 1
+
+def test_wait_honours_retry_after(mock_config):
+    policy = RetryPolicy.from_config(mock_config)
+    mock_func = Mock(side_effect=[http_error(429, {'Retry-After': '0.3'}), "success"])
+
+    with use_clock(VirtualClock()) as clock:
+        assert policy.call('adf', mock_func) == "success"
+
+    assert clock.slept == pytest.approx(0.3)
+
+def test_retry_budget_limits_retries(mock_config):
+    mock_config['retry']['budget'] = {'ratio': 0, 'min_retries': 1}
+    mock_config['retry']['initial_delay'] = 0.01
+    policy = RetryPolicy.from_config(mock_config)
+    mock_func = Mock(side_effect=http_error(503))
+
+    with pytest.raises(Exception):
+        policy.call('adf', mock_func)
+    # One retry from the budget, then no more
+    assert mock_func.call_count == 2
+
+    with pytest.raises(Exception):
+        policy.call('adf', mock_func)
+    assert mock_func.call_count == 3
+
+def test_circuit_breaker_opens_and_half_opens():
+    with use_clock(VirtualClock()) as clock:
+        breaker = CircuitBreaker('databricks', failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        clock.sleep(31)
+        breaker.before_call()
+        # Only one trial call is let through while half-open
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+def test_open_circuit_fails_fast(mock_config):
+    mock_config['retry']['circuit_breaker'] = {'failure_threshold': 2, 'reset_timeout': 60}
+    mock_config['retry']['initial_delay'] = 0.01
+    policy = RetryPolicy.from_config(mock_config)
+    mock_func = Mock(side_effect=http_error(503))
+
+    with pytest.raises(CircuitOpenError):
+        policy.call('adf', mock_func)
+    assert mock_func.call_count == 2
+
+    with pytest.raises(CircuitOpenError):
+        policy.call('adf', mock_func)
+    assert mock_func.call_count == 2
+    # Other services are unaffected
+    assert policy.call('databricks', Mock(return_value="ok")) == "ok"
+
+def test_fatal_half_open_trial_closes_circuit(mock_config):
+    mock_config['retry']['circuit_breaker'] = {'failure_threshold': 1, 'reset_timeout': 30}
+    mock_config['retry']['max_attempts'] = 1
+    policy = RetryPolicy.from_config(mock_config)
+
+    with use_clock(VirtualClock()) as clock:
+        with pytest.raises(Exception):
+            policy.call('adf', Mock(side_effect=http_error(503)))
+        clock.sleep(31)
+        # The trial reaches the service and gets a 404: it is up, so the circuit closes
+        with pytest.raises(Exception):
+            policy.call('adf', Mock(side_effect=http_error(404)))
+
+        assert policy.call('adf', Mock(return_value="ok")) == "ok"
+        assert policy.breaker('adf').state == CircuitBreaker.CLOSED
+
+def test_half_open_trial_released_when_it_misses_deadline(mock_config):
+    mock_config['retry']['circuit_breaker'] = {'failure_threshold': 1, 'reset_timeout': 0}
+    policy = RetryPolicy.from_config(mock_config)
+    policy.breaker('databricks').record_failure()
+
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def main():
+        with deadline(0.01):
+            await policy.acall('databricks', slow)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    # The abandoned trial doesn't keep the circuit shut
+    policy.breaker('databricks').before_call()
+
+def test_decorrelated_jitter_stays_within_bounds():
+    jitter = DecorrelatedJitter(base=1, cap=10)
+    previous = 1
+    for _ in range(50):
+        delay = jitter.next_delay()
+        assert 1 <= delay <= min(10, previous * 3)
+        previous = delay
+
+def test_nested_deadline_only_shortens():
+    assert remaining_time() is None
+    with deadline(10):
+        with deadline(100):
+            assert remaining_time() <= 10
+        with deadline(1):
+            assert remaining_time() <= 1
+    assert remaining_time() is None
+
+def test_sync_retry_stops_at_deadline(mock_config):
+    mock_config['retry']['initial_delay'] = 1
+    mock_func = Mock(side_effect=http_error(503))
+
+    with deadline(0.5):
+        with pytest.raises(Exception):
+            with_retry(mock_config)(mock_func)()
+
+    # The first backoff (1s) would overrun the deadline
+    assert mock_func.call_count == 1
+
+def test_deadline_follows_virtual_clock(mock_config):
+    mock_config['retry']['initial_delay'] = 10
+    mock_config['retry']['max_delay'] = 10
+    mock_config['retry']['max_attempts'] = 10
+    mock_func = Mock(side_effect=http_error(503))
+
+    with use_clock(VirtualClock()) as clock:
+        with deadline(25):
+            with pytest.raises(Exception):
+                with_retry(mock_config)(mock_func)()
+
+    # Two 10s backoffs fit in 25 virtual seconds, a third would not
+    assert mock_func.call_count == 3
+    assert clock.slept == pytest.approx(20)
+
+def test_sync_retry_draws_one_jittered_delay_per_attempt(mock_config):
+    mock_config['retry']['jitter'] = 'decorrelated'
+    mock_config['retry']['max_attempts'] = 3
+    mock_func = Mock(side_effect=http_error(503))
+
+    with patch('orchestrator.retry_logic.DecorrelatedJitter.next_delay', side_effect=[2, 3, 50]) as next_delay:
+        with use_clock(VirtualClock()) as clock:
+            with deadline(60):
+                with pytest.raises(Exception):
+                    with_retry(mock_config)(mock_func)()
+
+    # The deadline check and the sleep use the same draw
+    assert next_delay.call_count == 2
+    assert clock.slept == pytest.approx(5)
+
+def test_async_retry_on_failure(mock_config):
+    mock_config['retry']['jitter'] = 'decorrelated'
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise http_error(503)
+        return "success"
+
+    assert asyncio.run(with_retry(mock_config)(flaky)()) == "success"
+    assert len(calls) == 2
+
+def test_async_retry_fatal_not_retried(mock_config):
+    calls = []
+
+    async def forbidden():
+        calls.append(1)
+        raise http_error(403)
+
+    with pytest.raises(Exception):
+        asyncio.run(with_retry(mock_config)(forbidden)())
+    assert len(calls) == 1
+
+def test_async_deadline_bounds_attempt(mock_config):
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def main():
+        with deadline(0.05):
+            await with_retry(mock_config)(slow)()
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert time.monotonic() - start < 1
+
+def test_async_cancellation_is_not_retried(mock_config):
+    calls = []
+
+    async def hangs():
+        calls.append(1)
+        await asyncio.sleep(5)
+
+    async def main():
+        task = asyncio.create_task(with_retry(mock_config)(hangs)())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await task
+
+    with patch('orchestrator.retry_logic.logger') as mock_logger:
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(main())
+    assert len(calls) == 1
+    mock_logger.error.assert_not_called()
+
+def test_retrying_keeps_idempotency_key_across_attempts(mock_config):
+    class Client:
+        retry_policy = RetryPolicy.from_config(mock_config)
+        keys = []
+
+        @retrying('test', idempotency_key='idempotency_key')
+        def create(self, idempotency_key=None):
+            self.keys.append(idempotency_key)
+            if len(self.keys) < 3:
+                raise ConnectionError("response lost")
+            return idempotency_key
+
+    key = Client().create()
+
+    assert Client.keys == [key, key, key]
+    assert Client().create(idempotency_key='caller-key') == 'caller-key'
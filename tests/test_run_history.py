@@ -0,0 +1,97 @@
+import json
+import pytest
+import time
+from datetime import datetime, timezone
+from orchestrator.run_history import PIPELINE_STAGE, RunHistory, main, parse_window, percentile
+
+class Clock:
+    def __init__(self, now=1704067200.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def history(tmp_path):
+    history = RunHistory(tmp_path / 'history.db', min_samples=5, clock=Clock())
+    yield history
+    history.close()
+
+def test_percentile_interpolates_between_ranks():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == pytest.approx(4.8)
+    assert percentile([], 50) is None
+
+def test_parse_window():
+    assert parse_window('90') == 90
+    assert parse_window('30m') == 1800
+    assert parse_window('7d') == 7 * 86400
+    with pytest.raises(ValueError):
+        parse_window('soon')
+
+def test_percentiles_per_stage_over_window(history):
+    for i, duration in enumerate([10, 20, 30, 40, 50]):
+        history.record('sales', 'ingest', duration, 'success', retries=i % 2, started_at=1000 + i)
+    history.record('sales', 'ingest', 99, 'error', started_at=1010)
+    history.record('sales', 'transform', 5, 'success', started_at=1000)
+    history.record('sales', 'ingest', 1000, 'success', started_at=5000)
+
+    rows = history.percentiles(since=1000, until=2000)
+
+    ingest = next(row for row in rows if row['stage'] == 'ingest')
+    assert (ingest['count'], ingest['p50'], ingest['max']) == (5, 30, 50)
+    assert ingest['retries'] == 2 and ingest['failures'] == 1
+    assert [row['stage'] for row in history.percentiles(since=1000, stage='transform')] == ['transform']
+
+def test_flags_runs_much_slower_than_baseline(history):
+    for i in range(5):
+        assert not history.record('sales', 'ingest', 10 + i, 'success', started_at=1000 + i)['regressed']
+
+    # Above p95 but under twice the median: not a regression
+    assert not history.record('sales', 'ingest', 20, 'success', started_at=2000)['regressed']
+    slow = history.record('sales', 'ingest', 60, 'success', started_at=2001)
+
+    assert slow['regressed'] and slow['baseline'] == pytest.approx(12.5)
+    assert [row['duration'] for row in history.regressions(since=0)] == [60]
+
+def test_no_regression_without_enough_samples(history):
+    history.record('sales', 'ingest', 10, 'success', started_at=1000)
+    assert not history.record('sales', 'ingest', 1000, 'success', started_at=1001)['regressed']
+
+def test_expected_durations_skip_pipeline_rows(history):
+    history.clock.now = 2000
+    history.record('sales', 'ingest', 10, 'success', started_at=1000)
+    history.record('sales', 'ingest', 30, 'success', started_at=1100)
+    history.record('sales', PIPELINE_STAGE, 90, 'success', started_at=1000)
+
+    assert history.expected_durations('sales') == {'ingest': 20}
+
+def test_hourly_peaks_count_overlapping_runs(history):
+    base = datetime(2024, 1, 1, 2, 30, tzinfo=timezone.utc).timestamp()
+    history.record('sales', 'a', 3600, 'success', service='databricks', started_at=base)
+    history.record('sales', 'b', 600, 'success', service='databricks', started_at=base + 60)
+    history.record('sales', 'c', 600, 'success', service='adf', started_at=base + 60)
+
+    # The first run spans 02:30-03:30, so it is also in flight during hour 3
+    assert history.hourly_peaks(0, service='databricks') == {2: 2, 3: 1}
+
+def test_default_clock_follows_the_virtual_clock(tmp_path):
+    from orchestrator.clock import VirtualClock, use_clock
+
+    with use_clock(VirtualClock()) as clock:
+        history = RunHistory(tmp_path / 'history.db')
+        clock.sleep(120)
+        row = history.record('sales', 'ingest', 30, 'success')
+        history.close()
+
+    assert row['started_at'] == clock.epoch + 90
+
+def test_cli_prints_percentiles_as_json(history, capsys):
+    history.clock.now = time.time()
+    history.record('sales', 'ingest', 12.5, 'success')
+
+    main(['--db', str(history.path), 'percentiles', '--since', '1h', '--json'])
+
+    rows = json.loads(capsys.readouterr().out)
+    assert rows[0]['stage'] == 'ingest' and rows[0]['p50'] == 12.5
@@ -0,0 +1,150 @@
+import pytest
+from unittest.mock import Mock
+from orchestrator.fakes import FakeHttpError
+from orchestrator.run_tracker import RunFailedError, RunPollError, RunTimeoutError, RunTracker
+
+def adf_response(*runs, continuation_token=None):
+    return Mock(
+        value=[Mock(run_id=run_id, status=status, message='') for run_id, status in runs],
+        continuation_token=continuation_token
+    )
+
+def databricks_run(life_cycle, result=None):
+    return Mock(state=Mock(life_cycle_state=life_cycle, result_state=result, state_message=''))
+
+@pytest.fixture
+def tracker():
+    return RunTracker(
+        adf_client=Mock(),
+        resource_group='rg',
+        factory_name='factory',
+        databricks_client=Mock(),
+        min_interval=0.05,
+        max_interval=0.1
+    )
+
+def test_adf_runs_are_polled_in_one_query(tracker):
+    tracker.adf_client.pipeline_runs.query_by_factory.return_value = adf_response(
+        ('run-1', 'Succeeded'), ('run-2', 'Succeeded'), ('run-3', 'InProgress')
+    )
+    runs = [
+        tracker.track_adf('run-1', pipeline_name='copy_a'),
+        tracker.track_adf('run-2', pipeline_name='copy_b'),
+        tracker.track_adf('run-3', pipeline_name='copy_a'),
+    ]
+
+    tracker.wait(runs[0], timeout=2)
+    tracker.wait(runs[1], timeout=2)
+
+    first_call = tracker.adf_client.pipeline_runs.query_by_factory.call_args_list[0]
+    pipeline_filter = first_call.args[2].filters[0]
+    assert pipeline_filter.operand == 'PipelineName'
+    assert sorted(pipeline_filter.values_property) == ['copy_a', 'copy_b']
+    assert not runs[2].finished.is_set()
+
+def test_adf_query_follows_continuation_token(tracker):
+    tracker.adf_client.pipeline_runs.query_by_factory.side_effect = [
+        adf_response(('run-1', 'Succeeded'), continuation_token='next'),
+        adf_response(('run-2', 'Succeeded')),
+    ]
+    runs = [tracker.track_adf('run-1'), tracker.track_adf('run-2')]
+
+    for run in runs:
+        tracker.wait(run, timeout=2)
+
+    assert tracker.adf_client.pipeline_runs.query_by_factory.call_count == 2
+
+def test_failed_adf_run_raises(tracker):
+    tracker.adf_client.pipeline_runs.query_by_factory.return_value = adf_response(('run-1', 'Failed'))
+    run = tracker.track_adf('run-1')
+
+    with pytest.raises(RunFailedError):
+        tracker.wait(run, timeout=2)
+
+def test_databricks_only_fetches_runs_no_longer_active(tracker):
+    jobs = tracker.databricks_client.jobs
+    jobs.list_runs.return_value = [Mock(run_id=2)]
+    jobs.get_run.return_value = databricks_run('TERMINATED', 'SUCCESS')
+    finished = tracker.track_databricks(1)
+    tracker.track_databricks(2)
+
+    tracker.wait(finished, timeout=2)
+
+    jobs.list_runs.assert_called_with(active_only=True)
+    assert all(call.args == (1,) for call in jobs.get_run.call_args_list)
+
+def test_wait_timeout(tracker):
+    tracker.adf_client.pipeline_runs.query_by_factory.return_value = adf_response(('run-1', 'InProgress'))
+    run = tracker.track_adf('run-1')
+
+    with pytest.raises(RunTimeoutError):
+        tracker.wait(run, timeout=0.1)
+
+def test_timed_out_run_is_no_longer_polled(tracker):
+    tracker.adf_client.pipeline_runs.query_by_factory.return_value = adf_response(('run-1', 'InProgress'))
+    run = tracker.track_adf('run-1')
+
+    with pytest.raises(RunTimeoutError):
+        tracker.wait(run, timeout=0.1)
+
+    assert not tracker._runs
+
+def test_fatal_poll_error_fails_waiters(tracker):
+    tracker.adf_client.pipeline_runs.query_by_factory.side_effect = FakeHttpError(403)
+    run = tracker.track_adf('run-1')
+
+    with pytest.raises(RunPollError):
+        tracker.wait(run, timeout=2)
+    assert tracker.adf_client.pipeline_runs.query_by_factory.call_count == 1
+
+def test_repeated_transient_poll_errors_fail_waiters():
+    tracker = RunTracker(adf_client=Mock(), resource_group='rg', factory_name='factory',
+                         min_interval=0.01, max_interval=0.02, max_poll_failures=3)
+    query = tracker.adf_client.pipeline_runs.query_by_factory
+    query.side_effect = [FakeHttpError(503), FakeHttpError(503), adf_response(('run-1', 'InProgress'))] + \
+        [FakeHttpError(503)] * 3
+    run = tracker.track_adf('run-1')
+
+    with pytest.raises(RunPollError):
+        tracker.wait(run, timeout=2)
+    # A successful poll resets the count
+    assert query.call_count == 6
+
+def test_deleted_databricks_run_fails_only_its_waiter(tracker):
+    jobs = tracker.databricks_client.jobs
+    jobs.list_runs.return_value = []
+
+    def get_run(run_id):
+        if run_id == 1:
+            raise FakeHttpError(404)
+        return databricks_run('TERMINATED', 'SUCCESS')
+
+    jobs.get_run.side_effect = get_run
+    deleted = tracker.track_databricks(1)
+    healthy = tracker.track_databricks(2)
+
+    with pytest.raises(RunPollError):
+        tracker.wait(deleted, timeout=2)
+    assert tracker.wait(healthy, timeout=2).succeeded
+
+def test_interval_grows_with_age_without_history():
+    tracker = RunTracker(min_interval=1, max_interval=100, poll_fraction=0.1)
+    run = Mock(stage='copy', elapsed=500)
+
+    assert tracker.next_interval(run) == 50
+
+def test_interval_uses_stage_history():
+    tracker = RunTracker(min_interval=1, max_interval=1000)
+    tracker.record_duration('copy', 600)
+
+    # Early in the run the tracker sleeps through most of the expected duration
+    assert tracker.next_interval(Mock(stage='copy', elapsed=0)) == 300
+    # Past the expected duration it falls back to tight polling
+    assert tracker.next_interval(Mock(stage='copy', elapsed=610)) == 61
+
+def test_record_duration_is_smoothed():
+    tracker = RunTracker(smoothing=0.5)
+    tracker.record_duration('copy', 100)
+    tracker.record_duration('copy', 200)
+
+    assert tracker.expected_durations['copy'] == 150
@@ -0,0 +1,116 @@
+import os
+import threading
+import pytest
+import yaml
+from datetime import datetime, timezone
+from unittest.mock import Mock
+from orchestrator.scheduler import CronSchedule, PipelineScheduler, ScheduleError
+
+def test_cron_next_after():
+    schedule = CronSchedule('15 */6 * * *')
+
+    assert schedule.next_after(datetime(2024, 1, 1, 0, 15)) == datetime(2024, 1, 1, 6, 15)
+    assert schedule.next_after(datetime(2024, 1, 1, 23, 59)) == datetime(2024, 1, 2, 0, 15)
+
+def test_cron_day_of_month_or_day_of_week():
+    # 1st of the month or any Monday, as in cron
+    schedule = CronSchedule('0 9 1 * 1')
+
+    assert schedule.next_after(datetime(2024, 1, 2, 12, 0)) == datetime(2024, 1, 8, 9, 0)
+    assert schedule.next_after(datetime(2024, 1, 29, 12, 0)) == datetime(2024, 2, 1, 9, 0)
+
+def test_cron_aliases_and_sunday_as_seven():
+    assert CronSchedule('@daily').next_after(datetime(2024, 3, 5, 10, 0)) == datetime(2024, 3, 6, 0, 0)
+    assert CronSchedule('0 0 * * 7').next_after(datetime(2024, 1, 1)) == datetime(2024, 1, 7, 0, 0)
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '*/0 * * * *', 'a * * * *', '0 0 31 2 *'])
+def test_invalid_cron_rejected(expression):
+    with pytest.raises(ScheduleError):
+        CronSchedule(expression).next_after(datetime(2024, 1, 1))
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def make_scheduler(tmp_path, jobs, clock):
+    config_path = tmp_path / 'pipeline_config.yaml'
+    config_path.write_text(yaml.safe_dump({'scheduler': {'reload_interval': 0, 'jobs': jobs}}))
+
+    def factory(path):
+        orchestrator = Mock(cluster_pool=None)
+        orchestrator.config = yaml.safe_load(open(path))
+        return orchestrator
+
+    return PipelineScheduler(str(config_path), orchestrator_factory=factory, clock=clock)
+
+def test_overlapping_run_is_skipped(tmp_path):
+    clock = Clock(datetime(2024, 1, 1, 0, 0, 30).timestamp())
+    scheduler = make_scheduler(tmp_path, [{'name': 'every_minute', 'cron': '* * * * *'}], clock)
+    release = threading.Event()
+    started = threading.Event()
+
+    def execute_pipeline():
+        started.set()
+        release.wait(5)
+    scheduler.orchestrator.execute_pipeline.side_effect = execute_pipeline
+
+    clock.now += 60
+    assert scheduler.tick() == ['every_minute']
+    assert started.wait(5)
+    clock.now += 60
+    assert scheduler.tick() == []
+    release.set()
+    scheduler.close()
+
+    job = scheduler.jobs['every_minute']
+    assert (job.runs, job.skipped) == (1, 1)
+    scheduler.orchestrator.execute_pipeline.assert_called_once()
+    scheduler.orchestrator.close.assert_called_once()
+
+def test_batch_job_uses_configured_pipelines(tmp_path):
+    clock = Clock(1000.0)
+    scheduler = make_scheduler(tmp_path, [{'name': 'batch', 'interval': 10, 'action': 'batch',
+                                           'pipelines': ['a', 'b']}], clock)
+
+    clock.now += 10
+    assert scheduler.tick() == ['batch']
+    scheduler.close()
+
+    scheduler.orchestrator.trigger_adf_pipelines.assert_called_once_with(['a', 'b'])
+
+def test_config_change_reloads_jobs(tmp_path):
+    clock = Clock(1000.0)
+    scheduler = make_scheduler(tmp_path, [{'name': 'first', 'interval': 60}], clock)
+    assert not scheduler.maybe_reload()
+
+    new_config = {'scheduler': {'jobs': [{'name': 'second', 'interval': 30}]}}
+    with open(scheduler.config_path, 'w') as f:
+        yaml.safe_dump(new_config, f)
+    os.utime(scheduler.config_path, (2000, 2000))
+
+    def reload_config():
+        scheduler.orchestrator.config = new_config
+        return {'scheduler'}
+    scheduler.orchestrator.reload_config.side_effect = reload_config
+
+    assert scheduler.maybe_reload()
+    assert list(scheduler.jobs) == ['second']
+    scheduler.close()
+
+def test_clusters_prewarmed_once_before_pipeline_job(tmp_path):
+    clock = Clock(datetime(2024, 1, 1, 1, 45, tzinfo=timezone.utc).timestamp())
+    scheduler = make_scheduler(tmp_path, [{'name': 'nightly', 'cron': '0 2 * * *'}], clock)
+    pool = scheduler.orchestrator.cluster_pool = Mock(prewarm_lead=600)
+
+    scheduler.maintain_clusters()
+    pool.prewarm_for.assert_not_called()
+    clock.now += 600
+    scheduler.maintain_clusters()
+    scheduler.maintain_clusters()
+    scheduler.close()
+
+    pool.prewarm_for.assert_called_once_with(scheduler.jobs['nightly'].next_run)
+    assert pool.terminate_idle.call_count == 3
@@ -0,0 +1,72 @@
+import json
+import pytest
+from pathlib import Path
+from orchestrator.clock import SystemClock, get_clock
+from orchestrator.simulator import PipelineSimulator, main
+
+CONFIG = str(Path(__file__).resolve().parent.parent / 'pipelines' / 'pipeline_config.yaml')
+
+STAGES = [
+    {'name': 'ingest_a', 'type': 'adf', 'pipeline_name': 'a'},
+    {'name': 'ingest_b', 'type': 'adf', 'pipeline_name': 'b'},
+    {'name': 'transform', 'type': 'databricks', 'depends_on': ['ingest_a', 'ingest_b']},
+]
+
+def simulator(adf=None, databricks=None, **overrides):
+    instant = {'latency': 0, 'jitter': 0}
+    return PipelineSimulator.from_file(
+        CONFIG,
+        services={'adf': {**instant, **(adf or {})}, 'databricks': {**instant, **(databricks or {})}},
+        overrides={'stages': STAGES, **overrides}
+    )
+
+def test_parallel_stages_take_the_critical_path():
+    result = simulator(adf={'run_duration': 300}, databricks={'run_duration': 600}).run(seed=1)
+
+    assert result['succeeded']
+    # Both ingests overlap, so 300s + 600s plus polling granularity rather than 1200s
+    assert 900 <= result['makespan'] < 1000
+    assert result['api_calls']['pipelines.create_run'] == 2
+    assert result['real_seconds'] < 10
+
+def test_one_worker_runs_stages_back_to_back():
+    result = simulator(execution={'max_concurrency': 1, 'fail_fast': True}).run(seed=1)
+
+    assert result['makespan'] >= 1200
+
+def test_counts_retries_and_alerts_on_failure():
+    result = simulator(adf={'error_rate': 0.3}, databricks={'failure_rate': 1.0}).run(seed=3)
+
+    assert not result['succeeded']
+    assert 'transform' in result['error']
+    assert result['retries'] >= 1
+    # One failure alert, sent to both email and Slack
+    assert result['alerts_raised'] >= 1 and result['alerts_delivered'] >= 2
+
+def test_same_seed_gives_same_result():
+    sim = simulator(adf={'error_rate': 0.3, 'run_jitter': 100}, databricks={'failure_rate': 0.5})
+
+    first, second = sim.run(seed=4), sim.run(seed=4)
+    first.pop('real_seconds'), second.pop('real_seconds')
+
+    assert first == second
+
+def test_run_many_summarises_trials_and_restores_clock():
+    summary = simulator(adf={'run_jitter': 120}).run_many(trials=5, seed=0)
+
+    assert summary['trials'] == 5 and summary['success_rate'] == 1.0
+    assert summary['makespan']['p50'] <= summary['makespan']['p95'] <= summary['makespan']['max']
+    assert isinstance(get_clock(), SystemClock)
+
+def test_unknown_service_rejected():
+    with pytest.raises(ValueError):
+        PipelineSimulator({}, services={'snowflake': {}})
+
+def test_cli_prints_summary_as_json(capsys):
+    main([CONFIG, '--trials', '2', '--adf', 'run_duration=60',
+          '--set', 'execution.max_concurrency=1', '--json'])
+
+    out = capsys.readouterr().out
+    # Loggers bound by earlier tests may still print events ahead of the summary
+    summary = json.loads(out[out.index('{\n'):])
+    assert summary['trials'] == 2 and summary['success_rate'] == 1.0
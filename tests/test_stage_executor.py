@@ -0,0 +1,146 @@
+import pytest
+import threading
+import time
+from unittest.mock import Mock
+from orchestrator.stage_executor import (
+    Stage, StageDefinitionError, StageExecutionError, StageExecutor
+)
+from orchestrator.retry_logic import deadline, remaining_time
+
+def test_runs_stages_in_dependency_order():
+    order = []
+    stages = [
+        Stage('load', lambda: order.append('load') or 'loaded', depends_on=['extract']),
+        Stage('extract', lambda: order.append('extract') or 'extracted'),
+    ]
+
+    results = StageExecutor(stages).run()
+
+    assert order == ['extract', 'load']
+    assert results == {'extract': 'extracted', 'load': 'loaded'}
+
+def test_independent_stages_overlap():
+    def slow():
+        time.sleep(0.2)
+        return 'done'
+
+    stages = [Stage(f'branch_{i}', slow) for i in range(4)]
+
+    start = time.monotonic()
+    StageExecutor(stages, max_workers=4).run()
+
+    assert time.monotonic() - start < 0.6
+
+def test_concurrency_is_bounded():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def track():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    StageExecutor([Stage(f's{i}', track) for i in range(6)], max_workers=2).run()
+
+    assert max(peak) <= 2
+
+def test_stage_params_are_passed_to_handler():
+    handler = Mock(return_value='run-1')
+
+    StageExecutor([Stage('copy', handler, params={'pipeline_name': 'p1'})]).run()
+
+    handler.assert_called_once_with(pipeline_name='p1')
+
+def test_failure_skips_dependents_but_not_independent_branches():
+    independent = Mock(return_value='ok')
+    dependent = Mock()
+    on_failure = Mock()
+    on_skipped = Mock()
+    stages = [
+        Stage('broken', Mock(side_effect=ValueError('boom'))),
+        Stage('after_broken', dependent, depends_on=['broken']),
+        Stage('leaf', Mock(), depends_on=['after_broken']),
+        Stage('independent', independent),
+    ]
+
+    with pytest.raises(StageExecutionError) as exc_info:
+        StageExecutor(stages, fail_fast=False, on_stage_failure=on_failure, on_stage_skipped=on_skipped).run()
+
+    assert set(exc_info.value.failures) == {'broken'}
+    assert sorted(exc_info.value.skipped) == ['after_broken', 'leaf']
+    assert exc_info.value.results == {'independent': 'ok'}
+    assert isinstance(exc_info.value.__cause__, ValueError)
+    dependent.assert_not_called()
+    on_failure.assert_called_once()
+    assert [call.args[1] for call in on_skipped.call_args_list] == ['upstream_failed', 'upstream_failed']
+
+def test_fail_fast_reports_stages_it_skips():
+    on_skipped = Mock()
+    stages = [
+        Stage('broken', Mock(side_effect=ValueError('boom'))),
+        Stage('independent', Mock()),
+    ]
+
+    with pytest.raises(StageExecutionError) as exc_info:
+        StageExecutor(stages, max_workers=1, on_stage_skipped=on_skipped).run()
+
+    assert exc_info.value.skipped == ['independent']
+    on_skipped.assert_called_once_with(stages[1], 'fail_fast')
+
+def test_unknown_dependency_rejected():
+    with pytest.raises(StageDefinitionError):
+        StageExecutor([Stage('a', Mock(), depends_on=['missing'])])
+
+def test_cycle_rejected():
+    with pytest.raises(StageDefinitionError):
+        StageExecutor([
+            Stage('a', Mock(), depends_on=['b']),
+            Stage('b', Mock(), depends_on=['a']),
+        ])
+
+def test_coroutine_stage_with_deadline():
+    seen = {}
+
+    async def handler():
+        seen['remaining'] = remaining_time()
+        return 'async-result'
+
+    results = StageExecutor([Stage('a', handler, timeout=30)]).run()
+
+    assert results == {'a': 'async-result'}
+    assert 0 < seen['remaining'] <= 30
+
+def test_enclosing_deadline_reaches_stage_threads():
+    seen = {}
+
+    def handler():
+        seen['remaining'] = remaining_time()
+
+    with deadline(5):
+        StageExecutor([Stage('a', handler)]).run()
+
+    assert 0 < seen['remaining'] <= 5
+
+def test_virtual_clock_schedules_stages_on_the_critical_path():
+    from orchestrator.clock import VirtualClock, use_clock
+
+    def takes(seconds):
+        return lambda: clock.sleep(seconds) or seconds
+
+    clock = VirtualClock()
+    stages = [
+        Stage('extract', takes(10)),
+        Stage('lookup', takes(30)),
+        Stage('join', takes(5), depends_on=['extract', 'lookup']),
+        Stage('audit', takes(50)),
+    ]
+
+    with use_clock(clock):
+        StageExecutor(stages, max_workers=2).run()
+
+    # audit waits for a free worker after extract (10s), so it ends last at 60s
+    assert clock.monotonic() == 60
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+from orchestrator.state_store import FAILED, SUCCEEDED, TRIGGERED, RunStateStore
+
+def test_records_stage_runs(tmp_path):
+    store = RunStateStore(tmp_path / 'state.db')
+    execution_id, resumed = store.start_execution('pipeline-a')
+
+    store.record_stage(execution_id, 'copy', TRIGGERED, service='adf', run_id='run-1')
+    store.record_stage(execution_id, 'copy', FAILED, error='Activity failed')
+    store.record_stage(execution_id, 'copy', TRIGGERED, run_id='run-2')
+
+    state = store.stage_states(execution_id)['copy']
+    assert not resumed
+    assert (state['status'], state['run_id'], state['service'], state['attempts']) == (TRIGGERED, 'run-2', 'adf', 2)
+
+def test_resumes_latest_unfinished_execution_within_window(tmp_path):
+    store = RunStateStore(tmp_path / 'state.db')
+    failed_id, _ = store.start_execution('pipeline-a')
+    store.finish_execution(failed_id, FAILED)
+
+    assert store.start_execution('pipeline-a', resume_window=3600) == (failed_id, True)
+    assert store.start_execution('pipeline-b', resume_window=3600)[1] is False
+    # Without a window (resume disabled) a new execution always starts
+    assert store.start_execution('pipeline-a')[0] != failed_id
+
+def test_succeeded_or_expired_executions_are_not_resumed(tmp_path, monkeypatch):
+    store = RunStateStore(tmp_path / 'state.db')
+    done_id, _ = store.start_execution('pipeline-a')
+    store.finish_execution(done_id, SUCCEEDED)
+    assert store.start_execution('pipeline-a', resume_window=3600)[1] is False
+
+    stale_id, _ = store.start_execution('pipeline-b')
+    store.finish_execution(stale_id, FAILED)
+    later = time.time() + 7200
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert store.start_execution('pipeline-b', resume_window=3600)[1] is False
+
+def test_state_survives_reopen(tmp_path):
+    store = RunStateStore(tmp_path / 'state.db')
+    execution_id, _ = store.start_execution('pipeline-a')
+    store.record_stage(execution_id, 'notebook', SUCCEEDED, service='databricks', run_id=42)
+    store.close()
+
+    reopened = RunStateStore(tmp_path / 'state.db')
+    assert reopened.stage_states(execution_id)['notebook']['run_id'] == '42'
+
+def test_running_execution_is_only_resumed_once_its_process_is_gone(tmp_path, monkeypatch):
+    store = RunStateStore(tmp_path / 'state.db')
+    live_id, _ = store.start_execution('pipeline-a')
+
+    # Started by this (live) process, e.g. an overlapping cron run: not adopted
+    execution_id, resumed = store.start_execution('pipeline-a', resume_window=3600)
+    assert not resumed and execution_id != live_id
+
+    crashed_id, _ = store.start_execution('pipeline-b')
+    store._execute("UPDATE executions SET owner_pid = ? WHERE execution_id = ?", (2 ** 22 + 1, crashed_id))
+    monkeypatch.setattr('orchestrator.state_store._process_alive', lambda pid: False)
+    assert store.start_execution('pipeline-b', resume_window=3600) == (crashed_id, True)
+
+def test_adds_owner_columns_to_existing_files(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'state.db')
+    conn.execute("CREATE TABLE executions (execution_id TEXT PRIMARY KEY, pipeline_key TEXT NOT NULL, "
+                 "status TEXT NOT NULL, started_at REAL NOT NULL, finished_at REAL)")
+    conn.close()
+
+    store = RunStateStore(tmp_path / 'state.db')
+
+    assert store.start_execution('pipeline-a')[1] is False
@@ -0,0 +1,91 @@
+import json
+import pytest
+from unittest.mock import Mock
+from orchestrator.retry_logic import RetryPolicy
+from orchestrator.stage_executor import Stage, StageExecutor
+from orchestrator.telemetry import NoopTelemetry, Telemetry, get_telemetry, setup_telemetry
+
+@pytest.fixture
+def telemetry(tmp_path):
+    instance = setup_telemetry({'telemetry': {
+        'enabled': True,
+        'prometheus_file': str(tmp_path / 'datamove.prom'),
+        'otlp_file': str(tmp_path / 'spans.jsonl'),
+    }})
+    yield instance
+    setup_telemetry({})
+
+def test_disabled_by_default():
+    setup_telemetry({})
+    telemetry = get_telemetry()
+
+    assert isinstance(telemetry, NoopTelemetry)
+    with telemetry.span('anything') as span:
+        span.set_attribute('ignored', True)
+    telemetry.observe('latency', 1.0)
+
+def test_spans_record_parent_and_errors():
+    telemetry = Telemetry()
+
+    with pytest.raises(RuntimeError):
+        with telemetry.span('pipeline') as parent:
+            with telemetry.span('stage', stage='ingest') as child:
+                pass
+            raise RuntimeError("boom")
+
+    assert child.parent_id == parent.span_id
+    assert child.trace_id == parent.trace_id
+    assert parent.parent_id is None
+    assert parent.status == 'ERROR' and child.status == 'OK'
+    assert telemetry.current_span() is None
+
+def test_span_parent_follows_stage_threads(telemetry):
+    seen = {}
+
+    def handler():
+        with telemetry.span('work') as span:
+            seen['parent'] = span.parent_id
+
+    with telemetry.span('pipeline') as root:
+        StageExecutor([Stage('a', handler)]).run()
+
+    assert seen['parent'] == root.span_id
+
+def test_prometheus_text_histogram_is_cumulative():
+    telemetry = Telemetry(buckets=(0.1, 1))
+    telemetry.observe('latency_seconds', 0.05, service='adf')
+    telemetry.observe('latency_seconds', 0.5, service='adf')
+    telemetry.increment('retries_total', 2, service='adf')
+    telemetry.gauge_add('in_flight', 1, type='adf')
+
+    text = telemetry.prometheus_text()
+
+    assert 'latency_seconds_bucket{service="adf",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{service="adf",le="1"} 2' in text
+    assert 'latency_seconds_bucket{service="adf",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{service="adf"} 2' in text
+    assert 'retries_total{service="adf"} 2' in text
+    assert 'in_flight{type="adf"} 1' in text
+
+def test_retry_policy_records_retries_and_spans(telemetry, tmp_path):
+    policy = RetryPolicy(max_attempts=3, initial_delay=0.01)
+    func = Mock(side_effect=[ConnectionError("reset"), "ok"], __name__='create_run')
+
+    assert policy.call('adf', func) == "ok"
+    telemetry.export()
+
+    text = (tmp_path / 'datamove.prom').read_text()
+    assert 'datamove_retries_total{function="create_run",service="adf"} 1' in text
+    assert 'datamove_call_failures_total{error_class="transient",service="adf"} 1' in text
+    payload = json.loads((tmp_path / 'spans.jsonl').read_text().splitlines()[0])
+    span = payload['resourceSpans'][0]['scopeSpans'][0]['spans'][0]
+    assert span['name'] == 'adf.create_run'
+    assert {'key': 'attempts', 'value': {'intValue': '2'}} in span['attributes']
+
+def test_export_drains_spans(telemetry, tmp_path):
+    with telemetry.span('one'):
+        pass
+    telemetry.export()
+    telemetry.export()
+
+    assert len((tmp_path / 'spans.jsonl').read_text().splitlines()) == 1
@@ -0,0 +1,75 @@
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, mock_open, patch
+from orchestrator.transport import SharedTransport, shared_transport
+from orchestrator.trigger_pipeline import PipelineOrchestrator
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+def test_sessions_share_keep_alive_connections(server_url):
+    transport = SharedTransport(pool_maxsize=4)
+    first, second = transport.session(), transport.session()
+
+    for session in (first, second, first):
+        assert session.get(server_url).text == 'ok'
+
+    stats = transport.stats()
+    assert (stats['connections_opened'], stats['requests']) == (1, 3)
+    host = next(iter(stats['hosts'].values()))
+    assert (host['idle'], host['in_use'], host['max_size']) == (1, 0, 4)
+    transport.close()
+
+def test_shared_transport_is_per_pool_settings():
+    assert shared_transport({}) is shared_transport({'http': {'pool_maxsize': 32}})
+    assert shared_transport({'http': {'pool_maxsize': 8}}) is not shared_transport({})
+
+def test_sdk_clients_use_shared_pools():
+    config = {
+        'adf': {'subscription_id': 'sub', 'resource_group': 'rg', 'factory_name': 'factory'},
+        'databricks': {'workspace_url': 'https://test.invalid', 'cluster_id': 'cluster', 'token': 'token'},
+        'retry': {'max_attempts': 1, 'initial_delay': 0, 'max_delay': 0, 'exponential_base': 2},
+        'alerts': {'email': {'enabled': False}, 'slack': {'enabled': False}},
+        'logging': {'level': 'WARNING', 'output_file': 'logs/test.log'},
+    }
+    with patch('builtins.open', mock_open()), patch('yaml.safe_load', return_value=config):
+        orchestrator = PipelineOrchestrator('test_config.yaml')
+    orchestrator.credential = Mock()
+
+    adapter = orchestrator.transport.adapter
+    adf_session = orchestrator.adf_client._client._pipeline._transport.session
+    assert adf_session.get_adapter('https://management.azure.com/') is adapter
+    assert orchestrator.databricks_client.api_client._session.get_adapter('https://test.invalid/') is adapter
+
+def test_databricks_client_without_session_is_still_built():
+    config = {
+        'adf': {'subscription_id': 'sub', 'resource_group': 'rg', 'factory_name': 'factory'},
+        'databricks': {'workspace_url': 'https://test.invalid', 'cluster_id': 'cluster', 'token': 'token'},
+        'retry': {'max_attempts': 1, 'initial_delay': 0, 'max_delay': 0, 'exponential_base': 2},
+        'alerts': {'email': {'enabled': False}, 'slack': {'enabled': False}},
+        'logging': {'level': 'WARNING', 'output_file': 'logs/test.log'},
+    }
+    with patch('builtins.open', mock_open()), patch('yaml.safe_load', return_value=config):
+        orchestrator = PipelineOrchestrator('test_config.yaml')
+
+    # Newer databricks-sdk releases restructured ApiClient
+    with patch('databricks.sdk.WorkspaceClient', return_value=Mock(api_client=object())) as workspace:
+        assert orchestrator.databricks_client is workspace.return_value